@@ -0,0 +1,332 @@
+"""
+HTTP API for the ranking pipeline, for ATS integrations.
+
+Runs as its own process next to (or instead of) the Streamlit UI and uses
+the same app/ functions, database and worker pool settings:
+
+    uvicorn api.server:api --host 0.0.0.0 --port 8000 --workers 2
+
+Every worker process runs its own ranking runner; a job only ever runs on
+the runner that claimed it, so workers and UI processes can share a database.
+
+Authenticate with POST /sessions, then send `Authorization: Bearer <token>`.
+Tokens are the UI's signed session tokens, so set the same SESSION_SECRET
+for every API and UI process.
+"""
+import asyncio
+import base64
+import json
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import Depends, FastAPI, File, Header, HTTPException, Query, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+from app.auth import hash_password, issue_session_token, verify_session_token
+from app.backend_layer import (
+    QUIZ_BASE_URL,
+    get_candidate_by_token,
+    get_recruiter,
+    get_resume_pool,
+    get_uploaded_files,
+    list_shortlisted_candidates,
+    save_uploaded_files,
+)
+from app.db import ping
+from app.jobs import get_ranking_job, get_ranking_runner, get_run_timings
+from app.outbox import enqueue_email, enqueue_shortlist_invites, get_email_statuses, get_outbox
+from app.frontend_layer import render_second_round_emails
+from app.repository import CANDIDATE_STATUSES, DB_BACKEND, get_repository
+from app.workers import PoolSaturated
+
+EVENT_POLL_SECONDS = 1.0
+MAX_PAGE_SIZE = 100
+
+
+class SessionRequest(BaseModel):
+    email: str
+    password: str
+
+
+class RoleSpec(BaseModel):
+    title: str = Field(min_length=1)
+    job_description: str = Field(min_length=1)
+    job_id: Optional[str] = None
+    min_candidates: Optional[int] = Field(None, ge=1, le=50)
+
+
+class RankingRequest(BaseModel):
+    """
+    Rank against one job_description, or against several `roles` with one
+    extraction pass. With a job_id the resumes join that job's pool; `rerank`
+    rescores the whole pool and needs no upload_id.
+    """
+    upload_id: Optional[str] = None
+    job_description: Optional[str] = Field(None, min_length=1)
+    roles: Optional[List[RoleSpec]] = None
+    min_candidates: int = Field(3, ge=1, le=50)
+    job_id: Optional[str] = None
+    rerank: bool = False
+
+
+@asynccontextmanager
+async def lifespan(_):
+    await run_in_threadpool(get_repository().ensure_indexes)
+    # Starts this process's ranking runner, which also takes over jobs whose
+    # runner (in any process) stopped heartbeating; jobs held by live runners are left alone
+    await run_in_threadpool(get_ranking_runner)
+    # Drains mail left queued or retrying by a previous run without waiting for a new enqueue
+    await run_in_threadpool(get_outbox)
+    yield
+
+
+api = FastAPI(title="AI Recruiter API", lifespan=lifespan)
+
+
+def current_recruiter(authorization: str = Header("")):
+    """Recruiter email from a Bearer session token; verified in memory"""
+    scheme, _, token = authorization.partition(" ")
+    email = verify_session_token(token) if scheme.lower() == "bearer" else None
+    if not email:
+        raise HTTPException(status_code=401, detail="Missing, invalid or expired session token")
+    return email
+
+
+def _job_view(job):
+    return {
+        "id": str(job["_id"]),
+        "status": job["status"],
+        "stage": job.get("stage"),
+        "progress": job.get("progress", 0.0),
+        "shortlisted": job.get("shortlisted"),
+        "shortlist": [
+            {**c, "quiz_link": f"{QUIZ_BASE_URL}{c['quiz_token']}"} for c in job.get("shortlist", [])
+        ],
+        "error": job.get("error"),
+        # Multi-role runs: role titles and the candidate x role score matrix
+        "roles": [role["title"] for role in job.get("roles") or []] or None,
+        "matrix": job.get("matrix"),
+        # Pooled runs: pool size and how many resumes were read, reused and scored
+        "pool": job.get("pool"),
+    }
+
+
+def _parse_job_id(job_id):
+    # Memory-backend ids are ints, Mongo ones ObjectIds
+    if DB_BACKEND == "memory":
+        return int(job_id) if job_id.isdigit() else None
+    from bson import ObjectId
+    return ObjectId(job_id) if ObjectId.is_valid(job_id) else None
+
+
+async def _owned_job(job_id, recruiter_email):
+    parsed = _parse_job_id(job_id)
+    job = await run_in_threadpool(get_ranking_job, parsed) if parsed is not None else None
+    if job is None or job["recruiter_email"] != recruiter_email:
+        raise HTTPException(status_code=404, detail="Unknown ranking job")
+    return job
+
+
+def _encode_cursor(cursor):
+    if cursor is None:
+        return None
+    value, last_id = cursor
+    kind = "int" if isinstance(last_id, int) else "oid"
+    return base64.urlsafe_b64encode(json.dumps([value, str(last_id), kind]).encode()).decode()
+
+
+def _decode_cursor(text):
+    if not text:
+        return None
+    try:
+        value, last_id, kind = json.loads(base64.urlsafe_b64decode(text.encode()))
+        if kind == "int":
+            return value, int(last_id)
+        from bson import ObjectId
+        return value, ObjectId(last_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Malformed cursor")
+
+
+# -------------------------
+# Endpoints
+# -------------------------
+@api.get("/health")
+async def health():
+    if DB_BACKEND == "memory":
+        return {"ok": True, "backend": "memory"}
+    ok, latency_ms, error = await run_in_threadpool(ping)
+    return JSONResponse({"ok": ok, "latency_ms": latency_ms, "error": error}, status_code=200 if ok else 503)
+
+
+@api.post("/sessions")
+async def create_session(body: SessionRequest):
+    email = body.email.strip().lower()
+    user = await run_in_threadpool(get_recruiter, email)
+    if not user or user["password"] != hash_password(body.password):
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    return {"token": issue_session_token(email)}
+
+
+@api.post("/uploads", status_code=201)
+async def upload_resumes(files: List[UploadFile] = File(...), recruiter_email: str = Depends(current_recruiter)):
+    """Store PDF resumes for a later ranking run; returns the upload_id to rank"""
+    blobs = []
+    for upload in files:
+        if not (upload.filename or "").lower().endswith(".pdf"):
+            raise HTTPException(status_code=400, detail=f"{upload.filename} is not a PDF")
+        blobs.append((upload.filename, await upload.read()))
+    upload_id, paths = await run_in_threadpool(save_uploaded_files, blobs)
+    return {"upload_id": upload_id, "files": len(paths)}
+
+
+@api.post("/rankings", status_code=202)
+async def create_ranking(body: RankingRequest, stream: bool = False,
+                         recruiter_email: str = Depends(current_recruiter)):
+    """
+    Queue a ranking run on the shared worker pool. With ?stream=true the
+    response is an NDJSON stream of progress events ending in the shortlist;
+    otherwise poll GET /rankings/{id}.
+    """
+    if (body.job_description is None) == (body.roles is None):
+        raise HTTPException(status_code=422, detail="Send either job_description or roles")
+    files = []
+    if body.upload_id is not None or not body.rerank:
+        files = await run_in_threadpool(get_uploaded_files, body.upload_id)
+        if not files:
+            raise HTTPException(status_code=404, detail="Unknown upload_id")
+    try:
+        job_id = await run_in_threadpool(
+            get_ranking_runner().submit,
+            recruiter_email, body.job_description, files, body.min_candidates, body.job_id,
+            roles=[role.model_dump() for role in body.roles] if body.roles is not None else None,
+            rerank=body.rerank
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except PoolSaturated as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, round(e.wait_seconds)))}
+        )
+    if stream:
+        return StreamingResponse(_job_events(job_id), media_type="application/x-ndjson")
+    return {"id": str(job_id), "status": "queued"}
+
+
+@api.get("/rankings/{job_id}")
+async def get_ranking(job_id: str, recruiter_email: str = Depends(current_recruiter)):
+    return _job_view(await _owned_job(job_id, recruiter_email))
+
+
+@api.get("/rankings/{job_id}/timings")
+async def get_ranking_timings(job_id: str, recruiter_email: str = Depends(current_recruiter)):
+    """Per-stage timings of a finished (or failed) run"""
+    job = await _owned_job(job_id, recruiter_email)
+    run = await run_in_threadpool(get_run_timings, job["_id"])
+    if run is None:
+        raise HTTPException(status_code=404, detail="No timings recorded for this run yet")
+    return {key: run[key] for key in ("status", "files", "pages", "total_ms", "stages", "extraction")}
+
+
+@api.get("/rankings/{job_id}/events")
+async def stream_ranking(job_id: str, recruiter_email: str = Depends(current_recruiter)):
+    job = await _owned_job(job_id, recruiter_email)
+    return StreamingResponse(_job_events(job["_id"]), media_type="application/x-ndjson")
+
+
+async def _job_events(job_id):
+    """One NDJSON line per stage/progress change until the job finishes"""
+    last = None
+    while True:
+        job = await run_in_threadpool(get_ranking_job, job_id)
+        if job is None:
+            return
+        view = _job_view(job)
+        state = (view["status"], view["stage"], view["progress"])
+        if state != last:
+            last = state
+            yield json.dumps(view) + "\n"
+        if view["status"] in ("done", "failed"):
+            return
+        await asyncio.sleep(EVENT_POLL_SECONDS)
+
+
+@api.get("/pools/{job_id}")
+async def get_pool(job_id: str, recruiter_email: str = Depends(current_recruiter)):
+    """The job's pooled resumes with their cached scores, best first"""
+    pool = await run_in_threadpool(get_resume_pool, recruiter_email, job_id)
+    return {
+        "job_id": job_id,
+        "size": len(pool),
+        "resumes": [
+            {key: entry.get(key) for key in ("candidate", "email", "score", "file", "pages", "added_at", "scored_at")}
+            for entry in pool
+        ],
+    }
+
+
+@api.get("/shortlists")
+async def get_shortlist(
+    status: List[str] = Query(["SHORTLISTED"]),
+    min_score: Optional[int] = None,
+    search: Optional[str] = None,
+    descending: bool = True,
+    page_size: int = Query(25, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    recruiter_email: str = Depends(current_recruiter),
+):
+    """Keyset page of the recruiter's candidates; pass next_cursor back as `cursor`"""
+    unknown = set(status) - set(CANDIDATE_STATUSES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown status: {', '.join(sorted(unknown))}")
+    page, next_cursor = await run_in_threadpool(
+        list_shortlisted_candidates,
+        recruiter_email,
+        page_size=page_size,
+        after=_decode_cursor(cursor),
+        statuses=tuple(status),
+        min_score=min_score,
+        search=search,
+        descending=descending,
+    )
+    statuses = await run_in_threadpool(get_email_statuses, [c["quiz_token"] for c in page])
+    return {
+        "candidates": [
+            {
+                "candidate": c.get("candidate"),
+                "email": c.get("email"),
+                "score": c.get("score"),
+                "status": c.get("status"),
+                "quiz_token": c["quiz_token"],
+                "quiz_link": f"{QUIZ_BASE_URL}{c['quiz_token']}",
+                "invite_status": statuses[c["quiz_token"]]["status"] if c["quiz_token"] in statuses else None,
+            }
+            for c in page
+        ],
+        "next_cursor": _encode_cursor(next_cursor),
+    }
+
+
+@api.post("/invites", status_code=202)
+async def invite_shortlist(recruiter_email: str = Depends(current_recruiter)):
+    """Queue the second-round invite for every SHORTLISTED candidate; already queued ones are skipped"""
+    queued = await run_in_threadpool(enqueue_shortlist_invites, recruiter_email)
+    return {"queued": queued}
+
+
+@api.post("/candidates/{token}/invite", status_code=202)
+async def invite_candidate(token: str, recruiter_email: str = Depends(current_recruiter)):
+    candidate = await run_in_threadpool(get_candidate_by_token, token)
+    if candidate is None or candidate.get("recruiter_email") != recruiter_email:
+        raise HTTPException(status_code=404, detail="Unknown candidate")
+    candidate["quiz_link"] = f"{QUIZ_BASE_URL}{token}"
+    # Resolving the recruiter's template override may read the database
+    rendered = (await run_in_threadpool(render_second_round_emails, [candidate], recruiter_email))[0]
+    queued = await run_in_threadpool(
+        enqueue_email, candidate, "shortlist_invite", rendered.subject, rendered.text, recruiter_email, rendered.html
+    )
+    return {"queued": queued}
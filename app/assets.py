@@ -0,0 +1,147 @@
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+
+from app.logs import get_logger, log_event
+from app.repository import get_repository
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it only the original files are exported
+    Image = None
+
+logger = get_logger("assets")
+
+# -------------------------
+# Static Asset Export
+# -------------------------
+# Streamlit serves <main script dir>/static at /app/static when
+# server.enableStaticServing is on. Files are named by content hash so a
+# CDN or reverse proxy in front of ASSET_BASE_URL can cache them forever.
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STATIC_DIR = os.path.join(PROJECT_ROOT, "ui", "static")
+MANIFEST_PATH = os.path.join(STATIC_DIR, "manifest.json")
+ASSET_BASE_URL = os.getenv("ASSET_BASE_URL", "app/static").rstrip("/")
+
+ASSET_NAMES = ("logo", "login_avatar", "dashboard_illustration")
+# Largest width each asset is displayed at (2x for retina)
+VARIANT_WIDTHS = {
+    "logo": 96,
+    "login_avatar": 1100,
+    "dashboard_illustration": 1400,
+    "analytics": 1400,
+}
+
+_SIGNATURES = (
+    (b"\x89PNG", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF8", "gif"),
+    (b"RIFF", "webp"),
+)
+
+
+def _extension(data):
+    for signature, ext in _SIGNATURES:
+        if data.startswith(signature):
+            return ext
+    return "png"
+
+
+def _write_hashed(name, data, ext):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    filename = f"{name}.{digest}.{ext}"
+    path = os.path.join(STATIC_DIR, filename)
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(data)
+    return filename
+
+
+def _webp_variant(data, max_width):
+    image = Image.open(io.BytesIO(data))
+    if image.width > max_width:
+        height = round(image.height * max_width / image.width)
+        image = image.resize((max_width, height), Image.LANCZOS)
+    out = io.BytesIO()
+    image.save(out, format="WEBP", quality=82, method=6)
+    return out.getvalue()
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def export_asset(name, data, manifest):
+    """Write one asset (plus a resized WebP variant when Pillow is available)"""
+    entry = {"file": _write_hashed(name, data, _extension(data))}
+    if Image is not None:
+        try:
+            entry["webp"] = _write_hashed(name, _webp_variant(data, VARIANT_WIDTHS.get(name, 1400)), "webp")
+        except Exception as e:
+            log_event(logger, "assets.webp_skipped", level=logging.WARNING, asset=name, error=str(e))
+    manifest[name] = entry
+    return entry
+
+
+def export_assets(names=ASSET_NAMES):
+    """
+    Export assets from the database to STATIC_DIR once.
+    Assets already listed in the manifest with their files on disk are not refetched.
+    """
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    manifest = load_manifest()
+    changed = False
+
+    for name in names:
+        entry = manifest.get(name)
+        if entry and all(os.path.exists(os.path.join(STATIC_DIR, f)) for f in entry.values()):
+            continue
+        asset = get_repository().get_asset(name)
+        if not asset:
+            continue
+        export_asset(name, bytes(asset["data"]), manifest)
+        changed = True
+
+    if changed:
+        with open(MANIFEST_PATH, "w") as f:
+            json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def asset_urls(manifest):
+    """{name: url}, preferring the WebP variant"""
+    return {
+        name: f"{ASSET_BASE_URL}/{entry.get('webp', entry['file'])}"
+        for name, entry in manifest.items()
+    }
+
+
+def import_base64_file(path, name):
+    """Decode a base64 text dump (UTF-8 or UTF-16) and store it as a named asset"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    text = raw.decode("utf-16") if raw[:2] in (b"\xff\xfe", b"\xfe\xff") else raw.decode("utf-8")
+    data = base64.b64decode("".join(text.split()))
+    get_repository().save_asset(name, data)
+    return len(data)
+
+
+if __name__ == "__main__":
+    # python -m app.assets export
+    # python -m app.assets import-b64 analytics_b64.txt analytics
+    command = sys.argv[1] if len(sys.argv) > 1 else "export"
+    if command == "import-b64":
+        size = import_base64_file(sys.argv[2], sys.argv[3])
+        print(f"✅ Stored {sys.argv[3]} ({size} bytes)")
+        export_assets([sys.argv[3]])
+    else:
+        for asset_name, url in asset_urls(export_assets(sys.argv[2:] or ASSET_NAMES)).items():
+            print(f"{asset_name}: {url}")
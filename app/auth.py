@@ -0,0 +1,66 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import secrets
+import time
+
+from app.logs import get_logger, log_event
+
+logger = get_logger("auth")
+
+# -------------------------
+# Signed Session Tokens
+# -------------------------
+# "<base64url(email|expires_at)>.<hmac-sha256>" carried in the URL so a
+# refresh restores the recruiter session. Verification is pure CPU: no
+# database read, and forged or expired tokens are rejected.
+SESSION_SECRET = os.getenv("SESSION_SECRET", "")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(12 * 3600)))
+
+if not SESSION_SECRET:
+    # Still safe, but every restart signs everyone out
+    SESSION_SECRET = secrets.token_hex(32)
+    log_event(logger, "auth.ephemeral_secret", hint="set SESSION_SECRET to keep sessions across restarts")
+
+_KEY = SESSION_SECRET.encode()
+
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload):
+    return _b64encode(hmac.new(_KEY, payload.encode(), hashlib.sha256).digest())
+
+
+def issue_session_token(email, ttl=SESSION_TTL_SECONDS):
+    payload = _b64encode(f"{email}|{int(time.time() + ttl)}".encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_session_token(token):
+    """Email the token was issued to, or None if it is malformed, forged or expired"""
+    if not token or "." not in token:
+        return None
+    payload, signature = token.rsplit(".", 1)
+    # Bytes, since compare_digest rejects non-ASCII str (tokens come straight from URLs and headers)
+    if not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+        return None
+    try:
+        email, expires_at = _b64decode(payload).decode().rsplit("|", 1)
+        expires_at = int(expires_at)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if expires_at < time.time():
+        return None
+    return email
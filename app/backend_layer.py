@@ -1,17 +1,71 @@
+import hashlib
 import json
+import os
 import re
 import secrets
 import string
-from app.db import candidates_collection
+from app.repository import get_repository
 
 # QUIZ_BASE_URL = "https://ai-recruiter-859z6bd6jfqfxufktu79e9.streamlit.app/?token="
 QUIZ_BASE_URL = "http://localhost:8501/?token="
 EMAIL_REGEX = r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+"
 
+PAGE_SIZE = 12
+UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads", "resumes")
+
 
 # -------------------------
 # Resume Processing
 # -------------------------
+def save_uploaded_files(files):
+    """
+    Write (filename, bytes) pairs into a fresh per-upload folder so equally
+    named files from different runs never collide. Returns (upload_id, paths).
+    """
+    upload_id = secrets.token_hex(8)
+    upload_dir = os.path.join(UPLOAD_DIR, upload_id)
+    os.makedirs(upload_dir, exist_ok=True)
+    paths = []
+    for name, data in files:
+        path = os.path.join(upload_dir, os.path.basename(name))
+        with open(path, "wb") as f:
+            f.write(data)
+        paths.append(path)
+    return upload_id, paths
+
+
+def get_uploaded_files(upload_id):
+    """Paths saved under an upload_id, or None if there is no such upload"""
+    if not re.fullmatch(r"[0-9a-f]{16}", upload_id or ""):
+        return None
+    upload_dir = os.path.join(UPLOAD_DIR, upload_id)
+    if not os.path.isdir(upload_dir):
+        return None
+    return sorted(os.path.join(upload_dir, name) for name in os.listdir(upload_dir))
+
+
+def read_pdf(file_path: str):
+    """(text, page_count) of a PDF resume"""
+    import pdfplumber
+
+    with pdfplumber.open(file_path) as pdf:
+        pages = [page.extract_text() for page in pdf.pages]
+    return "".join(page_text + "\n" for page_text in pages if page_text), len(pages)
+
+
+def extract_text_from_pdf(file_path: str) -> str:
+    return read_pdf(file_path)[0]
+
+
+def content_hash(file_path: str) -> str:
+    """sha256 of a file's bytes; identifies a resume in a job's pool whatever its file name"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def extract_email_from_resume(resume_text: str):
     matches = re.findall(EMAIL_REGEX, resume_text)
     return matches[0].lower() if matches else None
@@ -30,18 +84,73 @@ def process_uploaded_resumes(resume_texts):
 # -------------------------
 # Selection Logic (LLM safe)
 # -------------------------
-def select_top_candidates(ai_output: str, min_candidates: int):
+def parse_llm_json(ai_output: str):
     try:
-        candidates = json.loads(ai_output)
+        return json.loads(ai_output)
     except json.JSONDecodeError:
         start = ai_output.find("[")
         end = ai_output.rfind("]") + 1
-        candidates = json.loads(ai_output[start:end])
+        return json.loads(ai_output[start:end])
 
+
+def select_top_candidates(ai_output: str, min_candidates: int):
+    candidates = parse_llm_json(ai_output)
     candidates.sort(key=lambda x: x.get("score", 0), reverse=True)
     return candidates[:min_candidates]
 
 
+def build_score_matrix(ai_outputs, batches):
+    """
+    Merge the outputs of score_resumes_for_roles (one per role batch) into
+    candidate x role rows: [{"candidate", "email", "scores": {title: score}}].
+    A role the model skipped for a candidate scores 0.
+    """
+    titles = [role["title"] for batch in batches for role in batch]
+    rows = {}
+    for ai_output, batch in zip(ai_outputs, batches):
+        for c in parse_llm_json(ai_output):
+            row = rows.setdefault(c["email"], {
+                "candidate": c.get("candidate"),
+                "email": c["email"],
+                "scores": dict.fromkeys(titles, 0),
+            })
+            scores = c.get("scores") or {}
+            for role in batch:
+                row["scores"][role["title"]] = scores.get(role["key"], 0)
+    return list(rows.values())
+
+
+def select_from_pool(pool, min_candidates, already_shortlisted):
+    """
+    The members of the whole pool's top min_candidates by cached score (best
+    resume per email) who are not shortlisted for the job yet. An unchanged
+    pool therefore shortlists nobody new.
+    """
+    best = {}
+    for entry in pool:
+        email = entry.get("email")
+        if email and (email not in best or (entry.get("score") or 0) > (best[email].get("score") or 0)):
+            best[email] = entry
+    ranked = sorted(best.values(), key=lambda e: e.get("score") or 0, reverse=True)[:min_candidates]
+    return [
+        {"candidate": e.get("candidate") or e["email"], "email": e["email"], "score": e.get("score") or 0,
+         "content_hash": e["content_hash"]}
+        for e in ranked if e["email"] not in already_shortlisted
+    ]
+
+
+def select_top_candidates_per_role(matrix, roles):
+    """Per-role shortlist {title: [candidate]} of each role's min_candidates best scores"""
+    shortlists = {}
+    for role in roles:
+        ranked = sorted(matrix, key=lambda row: row["scores"].get(role["title"], 0), reverse=True)
+        shortlists[role["title"]] = [
+            {"candidate": row["candidate"], "email": row["email"], "score": row["scores"].get(role["title"], 0)}
+            for row in ranked[:role["min_candidates"]]
+        ]
+    return shortlists
+
+
 # -------------------------
 # Credentials & MongoDB
 # -------------------------
@@ -54,14 +163,14 @@ def generate_token():
     return secrets.token_urlsafe(16)
 
 
-def store_shortlisted_candidates(candidates, recruiter_email=None):
+def store_shortlisted_candidates(candidates, recruiter_email=None, job_id=None, role=None):
     stored = []
 
     for c in candidates:
         password = generate_password()
         token = generate_token()
 
-        record = {
+        stored.append({
             "candidate": c["candidate"],
             "email": c["email"],
             "score": c["score"],
@@ -69,23 +178,76 @@ def store_shortlisted_candidates(candidates, recruiter_email=None):
             "quiz_token": token,
             "quiz_link": f"{QUIZ_BASE_URL}{token}",
             "status": "SHORTLISTED",
-            "recruiter_email": recruiter_email
-        }
-
-        candidates_collection.insert_one(record)
-        stored.append(record)
+            "recruiter_email": recruiter_email,
+            # Selects the question bank the candidate's quiz is drawn from
+            "job_id": job_id,
+            # Role title when shortlisted by a multi-role run
+            "role": role,
+            # Pooled resume the candidate came from; stored at most once per job
+            "content_hash": c.get("content_hash")
+        })
 
-    return stored
+    return get_repository().store_shortlist(stored)
 
 
 def validate_candidate_login(email, password):
-    return candidates_collection.find_one({
+    return get_repository().find_by_login(email, password)
+
+
+def get_candidate_by_token(token):
+    return get_repository().find_by_token(token)
+
+
+def get_candidate_credentials(tokens):
+    """Password per quiz token for a page of already listed candidates"""
+    return get_repository().get_passwords(tokens)
+
+
+def record_quiz_result(token, quiz_score, passed):
+    """
+    Record the quiz score and move SHORTLISTED -> SELECTED/REJECTED in one round trip.
+    Returns (candidate, won); won is False when the result was already recorded,
+    e.g. by a double submit, and the caller must not send the offer again.
+    """
+    status = "SELECTED" if passed else "REJECTED"
+    candidate = get_repository().transition_status(token, status, quiz_score=quiz_score)
+    return candidate, candidate is not None
+
+
+# -------------------------
+# Dashboard Listings (keyset pagination)
+# -------------------------
+# Filters (descending, min_score, search and, for a recruiter's list, statuses)
+# are applied by the store, so each call reads at most one page.
+def list_selected_candidates(page_size=PAGE_SIZE, after=None, **filters):
+    return get_repository().list_leaderboard(page_size, after, **filters)
+
+
+def list_shortlisted_candidates(recruiter_email, page_size=PAGE_SIZE, after=None, **filters):
+    return get_repository().recover_session(recruiter_email, page_size, after, **filters)
+
+
+def get_resume_pool(recruiter_email, job_id):
+    """A job's pooled resumes (without their text), best cached score first"""
+    pool = get_repository().get_pool(recruiter_email, job_id, include_text=False)
+    return sorted(pool, key=lambda e: e.get("score") or 0, reverse=True)
+
+
+# -------------------------
+# Recruiters & Assets
+# -------------------------
+def get_recruiter(email):
+    return get_repository().find_recruiter(email)
+
+
+def register_recruiter(name, email, password_hash):
+    return get_repository().create_recruiter({
+        "name": name,
         "email": email,
-        "password": password
+        "password": password_hash,
+        "role": "recruiter"
     })
 
 
-def get_candidate_by_token(token):
-    return candidates_collection.find_one({
-        "quiz_token": token
-    })
\ No newline at end of file
+def get_asset(name):
+    return get_repository().get_asset(name)
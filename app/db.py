@@ -1,17 +1,163 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
+from functools import lru_cache
 import os
+import threading
+import time
 from dotenv import load_dotenv
 import certifi
 
+from app import metrics
+
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("MONGO_DB")
 
-# Add tlsCAFile=certifi.where() to fix SSL handshake errors
-client = MongoClient(MONGO_URI, tlsCAFile=certifi.where())
-db = client[DB_NAME]
 
-candidates_collection = db["candidates"]
-assets_collection = db["assets"]
-recruiters_collection = db["recruiters"]
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+# -------------------------
+# Pool & timeout settings
+# -------------------------
+# Streamlit runs one script thread per session, so every rerun of every
+# session checks a socket out of this pool.
+MONGO_MAX_POOL_SIZE = _env_int("MONGO_MAX_POOL_SIZE", 50)
+MONGO_MIN_POOL_SIZE = _env_int("MONGO_MIN_POOL_SIZE", 5)
+MONGO_MAX_IDLE_TIME_MS = _env_int("MONGO_MAX_IDLE_TIME_MS", 300000)
+MONGO_WAIT_QUEUE_TIMEOUT_MS = _env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000)
+MONGO_SERVER_SELECTION_TIMEOUT_MS = _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)
+MONGO_CONNECT_TIMEOUT_MS = _env_int("MONGO_CONNECT_TIMEOUT_MS", 5000)
+MONGO_SOCKET_TIMEOUT_MS = _env_int("MONGO_SOCKET_TIMEOUT_MS", 20000)
+
+
+# -------------------------
+# Monitoring listeners
+# -------------------------
+class _CommandLatencyListener(monitoring.CommandListener):
+    """Records server round-trip latency per command name"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        metrics.observe(f"mongo.op.{event.command_name}", event.duration_micros / 1000)
+
+    def failed(self, event):
+        metrics.incr(f"mongo.op_failed.{event.command_name}")
+        metrics.observe(f"mongo.op.{event.command_name}", event.duration_micros / 1000)
+
+
+class _PoolListener(monitoring.ConnectionPoolListener):
+    """Records how long threads wait to check a connection out of the pool"""
+
+    _local = threading.local()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        metrics.incr("mongo.pool.cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        metrics.incr("mongo.pool.connections_created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        metrics.incr("mongo.pool.connections_closed")
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        metrics.incr("mongo.pool.checkout_failed")
+        self._record_wait()
+
+    def connection_checked_out(self, event):
+        metrics.incr("mongo.pool.checked_out")
+        self._record_wait()
+
+    def connection_checked_in(self, event):
+        metrics.incr("mongo.pool.checked_in")
+
+    def _record_wait(self):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            metrics.observe("mongo.pool.checkout_wait", (time.perf_counter() - started) * 1000)
+            self._local.started = None
+
+
+# -------------------------
+# Shared client accessor
+# -------------------------
+@lru_cache(maxsize=None)
+def get_client():
+    """Process-wide MongoClient with an explicitly tuned connection pool"""
+    return MongoClient(
+        MONGO_URI,
+        # Add tlsCAFile=certifi.where() to fix SSL handshake errors
+        tlsCAFile=certifi.where(),
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        retryReads=True,
+        retryWrites=True,
+        event_listeners=[_CommandLatencyListener(), _PoolListener()],
+    )
+
+
+def get_database():
+    return get_client()[DB_NAME]
+
+
+def ping():
+    """Round-trip a ping to the cluster; returns (ok, latency_ms, error)"""
+    started = time.perf_counter()
+    try:
+        get_client().admin.command("ping")
+        return True, round((time.perf_counter() - started) * 1000, 3), None
+    except Exception as e:
+        return False, round((time.perf_counter() - started) * 1000, 3), str(e)
+
+
+def get_db_stats():
+    """Pool settings, checkout wait and per-operation latency for the admin view"""
+    stats = metrics.snapshot("mongo.")
+    counters = stats["counters"]
+    return {
+        "pool": {
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "min_pool_size": MONGO_MIN_POOL_SIZE,
+            "in_use": counters.get("mongo.pool.checked_out", 0) - counters.get("mongo.pool.checked_in", 0),
+            "open": counters.get("mongo.pool.connections_created", 0) - counters.get("mongo.pool.connections_closed", 0),
+            "checkout_failed": counters.get("mongo.pool.checkout_failed", 0),
+            "checkout_wait": stats["histograms"].get("mongo.pool.checkout_wait", {}),
+        },
+        "operations": {
+            name[len("mongo.op."):]: summary
+            for name, summary in stats["histograms"].items()
+            if name.startswith("mongo.op.")
+        },
+        "failures": {
+            name[len("mongo.op_failed."):]: count
+            for name, count in counters.items()
+            if name.startswith("mongo.op_failed.")
+        },
+    }
+
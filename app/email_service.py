@@ -1,11 +1,22 @@
 import smtplib
+import hashlib
+import logging
+import queue
+import threading
+import time
+from functools import lru_cache
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
 from dotenv import load_dotenv
 
+from app import metrics
+from app.logs import get_logger, log_event
+
 load_dotenv(override=True)
 
+logger = get_logger("email")
+
 SMTP_SERVER = os.getenv("SMTP_SERVER")
 SMTP_PORT_STR = os.getenv("SMTP_PORT")
 SMTP_EMAIL = os.getenv("SMTP_EMAIL")
@@ -16,13 +27,187 @@ try:
 except ValueError:
     SMTP_PORT = None
 
-def send_email(to_email: str, subject: str, body: str):
+# ssl | starttls | none (plain SMTP, only for local stand-ins such as bench/smtp_sink.py)
+SMTP_SECURITY = os.getenv("SMTP_SECURITY", "ssl" if SMTP_PORT == 465 else "starttls").lower()
+
+SMTP_TIMEOUT = 30
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+# Recycle a session after this many messages (providers cap messages per connection)
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+# Sessions idle longer than this are probed with NOOP before reuse
+SMTP_IDLE_CHECK_SECONDS = 30
+
+
+# -------------------------
+# SMTP Connection Pool
+# -------------------------
+class SMTPConnectionPool:
+    """
+    Keeps up to `size` authenticated SMTP sessions alive and shares them
+    across threads. A session dropped by the server is replaced transparently.
+    """
+
+    def __init__(self, server, port, username, password, size=SMTP_POOL_SIZE, timeout=SMTP_TIMEOUT, security=None):
+        self.server = server
+        self.port = port
+        self.security = security or SMTP_SECURITY
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(size)
+        # LIFO keeps the most recently used (warmest) session in play
+        self._idle = queue.LifoQueue()
+
+    def _connect(self, timings):
+        started = time.perf_counter()
+        # ✅ PORT 465 → SMTP_SSL (NO starttls)
+        if self.security == "ssl":
+            conn = smtplib.SMTP_SSL(self.server, self.port, timeout=self.timeout)
+        # ✅ PORT 587 → STARTTLS
+        else:
+            conn = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+            if self.security == "starttls":
+                conn.starttls()
+        connected = time.perf_counter()
+        try:
+            conn.login(self.username, self.password)
+        except Exception:
+            _close_quietly(conn)
+            raise
+        finally:
+            _record(timings, "connect", connected - started)
+        _record(timings, "login", time.perf_counter() - connected)
+        return {"conn": conn, "sent": 0, "last_used": time.monotonic()}
+
+    def _checkout(self, timings):
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                timings["reused"] = False
+                return self._connect(timings)
+            timings["reused"] = True
+
+            if time.monotonic() - session["last_used"] < SMTP_IDLE_CHECK_SECONDS:
+                return session
+            try:
+                if session["conn"].noop()[0] == 250:
+                    return session
+            except (smtplib.SMTPException, OSError):
+                pass
+            _close_quietly(session["conn"])
+
+    def _checkin(self, session):
+        session["last_used"] = time.monotonic()
+        if session["sent"] >= SMTP_MAX_MESSAGES_PER_CONNECTION:
+            _close_quietly(session["conn"], quit=True)
+        else:
+            self._idle.put(session)
+
+    def send_message(self, msg, timings=None):
+        """Send through a pooled session; connect/login/send durations land in `timings`"""
+        timings = {} if timings is None else timings
+        started = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.timeout)
+        _record(timings, "pool_wait", time.perf_counter() - started)
+        if not acquired:
+            raise TimeoutError("Timed out waiting for a free SMTP connection")
+        try:
+            # One retry on a fresh session if the pooled one was dropped server-side
+            for attempt in (1, 2):
+                session = self._checkout(timings)
+                sending = time.perf_counter()
+                try:
+                    session["conn"].send_message(msg)
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    _close_quietly(session["conn"])
+                    metrics.incr("email.reconnects")
+                    if attempt == 2:
+                        raise
+                    continue
+                except smtplib.SMTPResponseException as e:
+                    if e.smtp_code == 421:
+                        # Server is closing the session (e.g. per-connection message cap)
+                        _close_quietly(session["conn"])
+                        metrics.incr("email.reconnects")
+                        if attempt == 2:
+                            raise
+                        continue
+                    # Server rejected this message but the session is still usable
+                    self._checkin(session)
+                    raise
+                except smtplib.SMTPRecipientsRefused:
+                    self._checkin(session)
+                    raise
+                except Exception:
+                    _close_quietly(session["conn"])
+                    raise
+                _record(timings, "send", time.perf_counter() - sending)
+                session["sent"] += 1
+                self._checkin(session)
+                return timings
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            _close_quietly(session["conn"], quit=True)
+
+
+def _record(timings, phase, seconds):
+    """Accumulate a phase duration (ms) for this message and feed the process histogram"""
+    ms = seconds * 1000
+    timings[f"{phase}_ms"] = round(timings.get(f"{phase}_ms", 0.0) + ms, 3)
+    metrics.observe(f"email.{phase}", ms)
+
+
+def _close_quietly(conn, quit=False):
+    try:
+        if quit:
+            conn.quit()
+        else:
+            conn.close()
+    except Exception:
+        pass
+
+
+@lru_cache(maxsize=None)
+def get_smtp_pool():
+    """Process-wide pool shared by every Streamlit session"""
+    return SMTPConnectionPool(SMTP_SERVER, SMTP_PORT, SMTP_EMAIL, SMTP_PASSWORD, size=SMTP_POOL_SIZE)
+
+
+def configure_smtp(server, port, email, password, security=None):
+    """Point the send path at another server (benchmarks, load tests) and reset the pool"""
+    global SMTP_SERVER, SMTP_PORT, SMTP_EMAIL, SMTP_PASSWORD, SMTP_SECURITY
+    if get_smtp_pool.cache_info().currsize:
+        get_smtp_pool().close()
+    get_smtp_pool.cache_clear()
+    SMTP_SERVER, SMTP_PORT, SMTP_EMAIL, SMTP_PASSWORD = server, int(port), email, password
+    SMTP_SECURITY = security or ("ssl" if SMTP_PORT == 465 else "starttls")
+
+def recipient_hash(email):
+    """Stable pseudonymous id so logs can correlate recipients without storing addresses"""
+    return hashlib.sha256(email.strip().lower().encode()).hexdigest()[:12]
+
+
+def get_email_stats():
+    """Counters and connect/login/send/total latency histograms for the admin view"""
+    return metrics.snapshot("email.")
+
+
+def send_email(to_email: str, subject: str, body: str, html_body: str = None):
     """
     Sends email using SMTP (supports port 465 SSL).
+    With html_body the message is multipart/alternative (plain text + HTML).
     Returns (success: bool, error_message: str)
     """
     
-    if not SMTP_SERVER or not SMTP_PORT_STR or not SMTP_EMAIL or not SMTP_PASSWORD:
+    if not SMTP_SERVER or not SMTP_PORT or not SMTP_EMAIL or not SMTP_PASSWORD:
 
         missing = []
         if not SMTP_SERVER: missing.append("SMTP_SERVER")
@@ -31,52 +216,56 @@ def send_email(to_email: str, subject: str, body: str):
         if not SMTP_PASSWORD: missing.append("SMTP_PASSWORD")
         
         error = f"❌ SMTP configuration error. Missing or Invalid: {', '.join(missing)}"
-        print(error) # Prints to terminal
-        print(f"DEBUG: Found SERVER={SMTP_SERVER}, PORT={SMTP_PORT}, EMAIL={SMTP_EMAIL}")
+        metrics.incr("email.failed")
+        metrics.incr("email.error.ConfigurationError")
+        log_event(logger, "email.config_error", level=logging.ERROR, missing=missing)
         return False, error
 
     from email.utils import formatdate, make_msgid
 
-    msg = MIMEMultipart()
+    msg = MIMEMultipart("alternative" if html_body else "mixed")
     msg["From"] = SMTP_EMAIL
     msg["To"] = to_email
     msg["Subject"] = subject
     msg["Date"] = formatdate(localtime=True)
     msg["Message-ID"] = make_msgid()
     msg.attach(MIMEText(body, "plain"))
+    if html_body:
+        msg.attach(MIMEText(html_body, "html"))
 
+    timings = {}
+    started = time.perf_counter()
     try:
-        print(f"📧 Attempting to send email to: {to_email}")
-        print(f"📡 Using SMTP: {SMTP_SERVER}:{SMTP_PORT}")
-        
-        # ✅ PORT 465 → SMTP_SSL (NO starttls)
-        if SMTP_PORT == 465:
-            with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, timeout=30) as server:
-                server.login(SMTP_EMAIL, SMTP_PASSWORD)
-                server.send_message(msg)
-                print(f"✅ Email sent successfully to {to_email}")
-
-        # ✅ PORT 587 → STARTTLS
-        else:
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30) as server:
-                server.starttls()
-                server.login(SMTP_EMAIL, SMTP_PASSWORD)
-                server.send_message(msg)
-                print(f"✅ Email sent successfully to {to_email}")
-
-        return True, "Email sent successfully"
+        get_smtp_pool().send_message(msg, timings)
+        outcome, error, error_class = "sent", None, None
 
     except smtplib.SMTPAuthenticationError as e:
-        error = f"❌ Authentication failed: {str(e)}"
-        print(error)
-        return False, error
-    
+        outcome, error, error_class = "failed", f"❌ Authentication failed: {str(e)}", type(e).__name__
+
     except smtplib.SMTPRecipientsRefused as e:
-        error = f"❌ Recipient email rejected: {str(e)}"
-        print(error)
-        return False, error
-    
+        outcome, error, error_class = "failed", f"❌ Recipient email rejected: {str(e)}", type(e).__name__
+
     except Exception as e:
-        error = f"❌ Email sending failed: {str(e)}"
-        print(error)
+        outcome, error, error_class = "failed", f"❌ Email sending failed: {str(e)}", type(e).__name__
+
+    total_ms = (time.perf_counter() - started) * 1000
+    metrics.observe("email.total", total_ms)
+    metrics.incr(f"email.{outcome}")
+    if error_class:
+        metrics.incr(f"email.error.{error_class}")
+
+    log_event(
+        logger,
+        "email.dispatch",
+        level=logging.INFO if outcome == "sent" else logging.WARNING,
+        recipient=recipient_hash(to_email),
+        server=f"{SMTP_SERVER}:{SMTP_PORT}",
+        outcome=outcome,
+        error_class=error_class,
+        total_ms=round(total_ms, 3),
+        **timings
+    )
+
+    if error:
         return False, error
+    return True, "Email sent successfully"
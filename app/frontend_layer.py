@@ -1,42 +1,109 @@
-def show_second_round_email(candidate):
-    subject = "Shortlisted for Next Interview Round"
+from app.backend_layer import QUIZ_BASE_URL
+from app.templates import get_template_registry
 
-    body = f"""
-Dear {candidate['candidate']},
 
-Congratulations! You have been shortlisted for the next round.
+def _invite_context(candidate):
+    return {
+        "candidate_name": candidate["candidate"],
+        "email": candidate["email"],
+        "password": candidate["password"],
+        "quiz_link": candidate["quiz_link"],
+    }
 
-Login Credentials:
-Email: {candidate['email']}
-Password: {candidate['password']}
 
-Quiz Link:
-{candidate['quiz_link']}
+def show_second_round_email(candidate, recruiter_email=None):
+    rendered = get_template_registry().render("shortlist_invite", _invite_context(candidate), recruiter_email)
+    return rendered.subject, rendered.text
 
-Please complete the quiz within the given time.
 
-Best regards,
-HR Team
-"""
+def render_second_round_emails(candidates, recruiter_email=None):
+    """RenderedEmail (subject, text, html) per candidate, in one pass over the compiled template"""
+    return get_template_registry().render_batch(
+        "shortlist_invite",
+        [_invite_context(c) for c in candidates],
+        recruiter_email
+    )
 
-    return subject, body
 
+def render_offer_letter(candidate_name, pass_mark, recruiter_email=None):
+    """`pass_mark` is the percentage required by the candidate's question bank"""
+    return get_template_registry().render(
+        "offer", {"candidate_name": candidate_name, "pass_mark": pass_mark}, recruiter_email
+    )
 
-def generate_offer_letter(candidate_name):
-    subject = "🎉 Offer Letter: Congratulations!"
 
-    body = f"""
-Dear {candidate_name},
+class CandidateRecord:
+    """
+    What the shortlist keeps per candidate in session state: the fields the
+    rows render and nothing else. No _id, credentials or recruiter data;
+    passwords are hydrated per visible row and links derived from the token.
+    """
 
-We are pleased to offer you the position at our company! 
+    __slots__ = ("quiz_token", "candidate", "email", "score", "status")
 
-Your performance in the technical quiz was outstanding (>70%).
+    def __init__(self, quiz_token, candidate, email, score, status="SHORTLISTED"):
+        self.quiz_token = quiz_token
+        self.candidate = candidate
+        self.email = email
+        self.score = score
+        self.status = status
 
-Please reply to this email to accept the offer.
-We look forward to working with you.
+    @classmethod
+    def from_doc(cls, doc):
+        return cls(doc["quiz_token"], doc.get("candidate"), doc.get("email"), doc.get("score"),
+                   doc.get("status", "SHORTLISTED"))
 
-Best regards,
-HR Manager
-AI Recruiter System
-"""
-    return subject, body
\ No newline at end of file
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+
+def compact_records(docs):
+    return [CandidateRecord.from_doc(doc) for doc in docs]
+
+
+class CandidateView:
+    """
+    Read-only view over a stored candidate with an optional email override.
+    Wraps the record instead of copying it; lookups fall through to it.
+    The password is hydrated separately, only for rows that are shown.
+    """
+
+    __slots__ = ("record", "override_email", "password")
+
+    def __init__(self, record, override_email=None, password=None):
+        self.record = record
+        self.override_email = override_email
+        self.password = password
+
+    def __getitem__(self, key):
+        if key == "email" and self.override_email:
+            return self.override_email
+        if key == "password":
+            return self.password if self.password is not None else self.record.get("password", "")
+        if key == "quiz_link":
+            return f"{QUIZ_BASE_URL}{self.record['quiz_token']}"
+        return self.record[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    @property
+    def original_email(self):
+        return self.record["email"]
+
+    @property
+    def preview_key(self):
+        return (self.record["quiz_token"], self["email"])
+
+
+def candidate_views(records, override_email=None, passwords=None):
+    passwords = passwords or {}
+    return [CandidateView(r, override_email, passwords.get(r["quiz_token"])) for r in records]
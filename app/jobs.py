@@ -0,0 +1,460 @@
+import cProfile
+import hashlib
+import io
+import logging
+import os
+import pstats
+import socket
+import threading
+import uuid
+from datetime import timedelta
+from functools import lru_cache
+
+from app.backend_layer import (
+    build_score_matrix,
+    content_hash,
+    extract_email_from_resume,
+    parse_llm_json,
+    read_pdf,
+    process_uploaded_resumes,
+    select_from_pool,
+    select_top_candidates,
+    select_top_candidates_per_role,
+    store_shortlisted_candidates,
+)
+from app.logs import get_logger, log_event
+from app.metrics import RunTimer
+from app.repository import get_repository, utcnow
+from app.workers import WorkerPool
+
+logger = get_logger("jobs")
+
+# -------------------------
+# Ranking Job Settings
+# -------------------------
+# extract -> rank -> store runs here, off the Streamlit script thread, so a
+# closed tab or dropped websocket does not lose the run. Job state lives in
+# the `ranking_jobs` collection; the UI only polls it.
+RANKING_WORKERS = int(os.getenv("RANKING_WORKERS", "2"))
+
+# Every UI and API process runs its own runner against the shared collection.
+# A runner only executes jobs it owns and claims each one atomically; it
+# heartbeats the jobs it holds, and jobs whose owner stopped heartbeating
+# (a crashed or restarted process) are taken over by whichever runner sweeps first.
+RANKING_HEARTBEAT_SECONDS = 30.0
+RANKING_STALE_AFTER = timedelta(minutes=2)
+# A run's final status update is retried this often before giving up
+FINAL_UPDATE_ATTEMPTS = 5
+FINAL_UPDATE_RETRY_SECONDS = 5.0
+
+# Multi-role runs extract the resumes once and score them against every role
+MAX_ROLES_PER_RUN = int(os.getenv("MAX_ROLES_PER_RUN", "10"))
+
+# Runs with a Job ID keep every resume in that job's `resume_pool` with its
+# parsed text and a score cached per job description, so adding resumes only
+# reads and scores the newcomers and a re-rank never re-reads a PDF
+
+# Every run's stage timings go to the `runs` collection; admins may also ask
+# for a cProfile capture, kept as the top functions by cumulative time
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "40"))
+
+# Only one profiler can be active per process; a second profiled run goes unprofiled
+_profile_lock = threading.Lock()
+
+
+# -------------------------
+# Background Runner
+# -------------------------
+class RankingJobRunner:
+    """Ranking jobs on the shared WorkerPool; job state is persisted, the queue is in-process"""
+
+    def __init__(self, workers=RANKING_WORKERS):
+        self.pool = WorkerPool("ranking-worker", workers)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._held = set()
+        self._held_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self):
+        self.pool.start()
+        self.resume_stale()
+        threading.Thread(target=self._heartbeat, name="ranking-heartbeat", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self.pool.stop()
+
+    def resume_stale(self):
+        """Take over jobs whose runner died; they run again from the top, ahead of admission limits"""
+        jobs = get_repository().take_over_stale_ranking_jobs(utcnow() - RANKING_STALE_AFTER, self.owner)
+        for job in jobs:
+            log_event(logger, "ranking_job.resumed", job=str(job["_id"]), owner=self.owner)
+            self._queue(job["recruiter_email"], job["_id"])
+        return len(jobs)
+
+    def _queue(self, recruiter_email, job_id):
+        with self._held_lock:
+            self._held.add(job_id)
+        self.pool.submit(recruiter_email, job_id, self._execute, job_id, admit=False)
+
+    def _heartbeat(self):
+        repo = get_repository()
+        while not self._stopped.wait(RANKING_HEARTBEAT_SECONDS):
+            try:
+                with self._held_lock:
+                    held = list(self._held)
+                repo.heartbeat_ranking_jobs(held, self.owner)
+                self.resume_stale()
+            except Exception as e:
+                log_event(logger, "ranking_job.heartbeat_failed", owner=self.owner, error=str(e))
+
+    def submit(self, recruiter_email, job_description, files, min_candidates, job_id=None,
+               upload_ms=None, profile=False, roles=None, rerank=False):
+        """
+        Persist a job and queue it; returns the job's _id immediately.
+        Raises PoolSaturated (with an estimated wait) when the pool is full.
+        `upload_ms` is the caller's time to save the files, recorded with the run's timings.
+        With `roles` ([{title, job_description, job_id?, min_candidates?}]) the
+        pool is scored against every role instead of job_description.
+        `rerank` rescores the whole pool of job_id; files may then be empty.
+        Raises ValueError for a request that cannot run.
+        """
+        if roles is not None:
+            roles = normalize_roles(roles, min_candidates)
+        if rerank and (roles or not job_id):
+            raise ValueError("Re-ranking needs a single role with a Job ID")
+        if not files and not rerank:
+            raise ValueError("Upload at least one resume")
+        self.pool.admit(recruiter_email)
+        now = utcnow()
+        job = get_repository().create_ranking_job({
+            "recruiter_email": recruiter_email,
+            "job_description": job_description,
+            "files": list(files),
+            "min_candidates": min_candidates,
+            "job_id": job_id,
+            "roles": roles,
+            "rerank": rerank,
+            "upload_ms": upload_ms,
+            "profile": profile,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0.0,
+            "owner": self.owner,
+            "heartbeat_at": now,
+            "created_at": now,
+            "updated_at": now,
+        })
+        self._queue(recruiter_email, job["_id"])
+        return job["_id"]
+
+    def check_capacity(self, recruiter_email):
+        """Raise PoolSaturated before the caller does any work for a job that would be refused"""
+        self.pool.admit(recruiter_email)
+
+    def queue_position(self, recruiter_email, job_id):
+        return self.pool.queue_position(recruiter_email, job_id)
+
+    def _execute(self, job_id):
+        try:
+            self._run(job_id)
+        finally:
+            with self._held_lock:
+                self._held.discard(job_id)
+
+    def _run(self, job_id):
+        repo = get_repository()
+        # None when another runner took the job over (e.g. after this one stalled)
+        job = repo.claim_ranking_job(job_id, self.owner)
+        if job is None:
+            return
+
+        timer = RunTimer()
+        if job.get("upload_ms") is not None:
+            timer.add("upload", job["upload_ms"])
+        profiler = cProfile.Profile() if job.get("profile") and _profile_lock.acquire(blocking=False) else None
+        report = lambda stage, progress: repo.update_ranking_job(job_id, stage=stage, progress=round(progress, 3))
+        try:
+            try:
+                if profiler:
+                    stored, results = profiler.runcall(run_ranking_job, job, report, timer)
+                else:
+                    stored, results = run_ranking_job(job, report, timer)
+                outcome = dict(
+                    status="done",
+                    stage="done",
+                    progress=1.0,
+                    shortlisted=len(stored),
+                    # Compact copy of this run's shortlist for API clients polling the job
+                    shortlist=[
+                        {"candidate": c["candidate"], "email": c["email"], "score": c["score"],
+                         "quiz_token": c["quiz_token"], "role": c["role"]}
+                        for c in stored
+                    ],
+                    finished_at=utcnow(),
+                    **results
+                )
+            except Exception as e:
+                log_event(logger, "ranking_job.failed", job=str(job_id), error=str(e))
+                stored, outcome = [], dict(status="failed", error=str(e), finished_at=utcnow())
+
+            self._record_outcome(job_id, outcome)
+            run = save_run_timings(job, timer, outcome["status"], profiler)
+        finally:
+            if profiler:
+                _profile_lock.release()
+
+        if outcome["status"] == "done":
+            log_event(
+                logger, "ranking_job.done", job=str(job_id), files=len(job["files"]), pages=run["pages"],
+                shortlisted=len(stored), total_ms=run["total_ms"]
+            )
+
+    def _record_outcome(self, job_id, outcome):
+        """
+        Write the job's final state, retrying through short database outages.
+        The job stays held (and heartbeated) meanwhile, so no other runner
+        takes it over and stores its shortlist a second time.
+        """
+        for attempt in range(1, FINAL_UPDATE_ATTEMPTS + 1):
+            try:
+                get_repository().update_ranking_job(job_id, **outcome)
+                return
+            except Exception as e:
+                log_event(
+                    logger, "ranking_job.final_update_failed", level=logging.WARNING,
+                    job=str(job_id), attempt=attempt, error=str(e)
+                )
+                if attempt < FINAL_UPDATE_ATTEMPTS:
+                    self._stopped.wait(FINAL_UPDATE_RETRY_SECONDS)
+
+
+def run_ranking_job(job, report, timer=None):
+    """
+    The extract -> rank -> store pipeline for one job; `report(stage, progress)`
+    tracks it and `timer` records how long each stage took.
+    Returns (stored candidates, extra result fields for the job record).
+    """
+    from app.llm_layer import rank_resumes
+
+    timer = timer or RunTimer()
+    if job.get("roles"):
+        return _run_multi_role(job, _extract_resumes(job["files"], report, timer), report, timer)
+    if job.get("job_id"):
+        return _run_pooled(job, report, timer)
+
+    processed_resumes = _extract_resumes(job["files"], report, timer)
+
+    report("ranking", 0.5)
+    with timer.stage("ranking"):
+        ai_output = rank_resumes(job_description=job["job_description"], candidates=processed_resumes)
+
+    report("selecting", 0.85)
+    with timer.stage("selection"):
+        shortlisted = select_top_candidates(ai_output=ai_output, min_candidates=job["min_candidates"])
+
+    report("storing", 0.9)
+    with timer.stage("store"):
+        return store_shortlisted_candidates(shortlisted, job["recruiter_email"], job_id=job.get("job_id")), {}
+
+
+def _extract_resumes(files, report, timer):
+    resume_texts = []
+    for i, path in enumerate(files):
+        report("extracting", 0.5 * i / len(files))
+        with timer.stage("extraction", file=os.path.basename(path)) as tags:
+            text, tags["pages"] = read_pdf(path)
+        resume_texts.append(text)
+
+    with timer.stage("email_extraction"):
+        return process_uploaded_resumes(resume_texts)
+
+
+def _run_pooled(job, report, timer):
+    """
+    Rank a job's whole resume pool. Only files not pooled yet are read, and
+    only entries without a cached score for this job description (every
+    entry with `rerank`) are sent to the LLM. The pool's top min_candidates
+    are then shortlisted, minus people already shortlisted for the job, so
+    newcomers only get in by outscoring the current top.
+    """
+    from app.llm_layer import rank_resumes
+
+    repo = get_repository()
+    recruiter_email, job_id = job["recruiter_email"], job["job_id"]
+
+    with timer.stage("pool_lookup"):
+        pooled = repo.pool_hashes(recruiter_email, job_id)
+        fresh = {}
+        for path in job["files"]:
+            digest = content_hash(path)
+            if digest not in pooled:
+                fresh.setdefault(digest, path)
+
+    entries = []
+    for i, (digest, path) in enumerate(fresh.items()):
+        report("extracting", 0.5 * i / len(fresh))
+        with timer.stage("extraction", file=os.path.basename(path)) as tags:
+            text, tags["pages"] = read_pdf(path)
+        entries.append({
+            "recruiter_email": recruiter_email,
+            "job_id": job_id,
+            "content_hash": digest,
+            "file": os.path.basename(path),
+            "pages": tags["pages"],
+            "resume_text": text,
+            "score": None,
+            "jd_hash": None,
+            "added_at": utcnow(),
+        })
+    with timer.stage("email_extraction"):
+        for entry in entries:
+            entry["email"] = extract_email_from_resume(entry["resume_text"])
+
+    with timer.stage("pool_store"):
+        repo.add_to_pool(entries)
+        pool = repo.get_pool(recruiter_email, job_id)
+
+    jd_hash = hashlib.sha256(job["job_description"].encode()).hexdigest()
+    stale = [e for e in pool if job.get("rerank") or e.get("jd_hash") != jd_hash]
+    if stale:
+        report("ranking", 0.5)
+        with timer.stage("ranking"):
+            ai_output = rank_resumes(job_description=job["job_description"], candidates=stale)
+        with timer.stage("selection"):
+            ranked = {c.get("email"): c for c in parse_llm_json(ai_output)}
+            updates = {}
+            for entry in stale:
+                scored = ranked.get(entry.get("email"), {})
+                updates[entry["_id"]] = {
+                    "score": scored.get("score", 0),
+                    "candidate": scored.get("candidate") or entry.get("candidate"),
+                    "jd_hash": jd_hash,
+                    "scored_at": utcnow(),
+                }
+                entry.update(updates[entry["_id"]])
+        with timer.stage("pool_store"):
+            repo.update_pool_scores(updates)
+
+    report("selecting", 0.85)
+    with timer.stage("selection"):
+        shortlisted = select_from_pool(pool, job["min_candidates"], repo.shortlisted_emails(recruiter_email, job_id))
+
+    report("storing", 0.9)
+    with timer.stage("store"):
+        stored = store_shortlisted_candidates(shortlisted, recruiter_email, job_id=job_id)
+    return stored, {"pool": {
+        "size": len(pool),
+        "extracted": len(entries),
+        "reused": len(job["files"]) - len(entries),
+        "scored": len(stale),
+    }}
+
+
+def _run_multi_role(job, processed_resumes, report, timer):
+    """
+    Score one extracted pool against every role: the candidate block of the
+    prompt is built once and each LLM call covers ROLES_PER_CALL roles.
+    """
+    from app.llm_layer import format_candidates, role_batches, score_resumes_for_roles
+
+    roles = job["roles"]
+    with timer.stage("prompt"):
+        formatted_candidates = format_candidates(processed_resumes)
+        batches = role_batches(roles)
+
+    ai_outputs = []
+    for i, batch in enumerate(batches):
+        report("ranking", 0.5 + 0.35 * i / len(batches))
+        with timer.stage("ranking"):
+            ai_outputs.append(score_resumes_for_roles(batch, formatted_candidates))
+
+    report("selecting", 0.85)
+    with timer.stage("selection"):
+        matrix = build_score_matrix(ai_outputs, batches)
+        shortlists = select_top_candidates_per_role(matrix, roles)
+
+    report("storing", 0.9)
+    stored = []
+    with timer.stage("store"):
+        for role in roles:
+            stored.extend(store_shortlisted_candidates(
+                shortlists[role["title"]], job["recruiter_email"], job_id=role["job_id"], role=role["title"]
+            ))
+    return stored, {"matrix": matrix}
+
+
+def normalize_roles(roles, min_candidates):
+    """Validated copy of a multi-role spec; raises ValueError with a message for the recruiter"""
+    cleaned = []
+    for i, role in enumerate(roles, start=1):
+        title = (role.get("title") or "").strip() or f"Role {i}"
+        job_description = (role.get("job_description") or "").strip()
+        if not job_description:
+            raise ValueError(f"{title} needs a job description")
+        cleaned.append({
+            "title": title,
+            "job_description": job_description,
+            "job_id": (role.get("job_id") or "").strip() or None,
+            "min_candidates": int(role.get("min_candidates") or min_candidates),
+        })
+    if not cleaned:
+        raise ValueError("At least one role is required")
+    if len(cleaned) > MAX_ROLES_PER_RUN:
+        raise ValueError(f"At most {MAX_ROLES_PER_RUN} roles per run")
+    if len({role["title"] for role in cleaned}) != len(cleaned):
+        raise ValueError("Role titles must be unique")
+    return cleaned
+
+
+def save_run_timings(job, timer, status, profiler=None):
+    """Persist one run's stage timings, tagged with recruiter, file count and total pages"""
+    files = [item for item in timer.items if item["stage"] == "extraction"]
+    run = {
+        "ranking_job_id": job["_id"],
+        "recruiter_email": job["recruiter_email"],
+        "status": status,
+        "files": len(job["files"]),
+        "pages": sum(item.get("pages", 0) for item in files),
+        "stages": timer.summary(),
+        "extraction": [{k: v for k, v in item.items() if k != "stage"} for item in files],
+        "total_ms": timer.total_ms() + (job.get("upload_ms") or 0),
+        "profile": _profile_report(profiler) if profiler else None,
+        "profile_skipped": bool(job.get("profile")) and profiler is None,
+        "created_at": utcnow(),
+    }
+    return get_repository().save_run(run)
+
+
+def _profile_report(profiler):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).strip_dirs().sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+@lru_cache(maxsize=None)
+def get_ranking_runner():
+    """Process-wide runner shared by every session, started on first use"""
+    return RankingJobRunner().start()
+
+
+def submit_ranking_job(recruiter_email, job_description, files, min_candidates, job_id=None,
+                       upload_ms=None, profile=False, roles=None, rerank=False):
+    return get_ranking_runner().submit(
+        recruiter_email, job_description, files, min_candidates, job_id,
+        upload_ms=upload_ms, profile=profile, roles=roles, rerank=rerank
+    )
+
+
+def get_ranking_job(job_id):
+    return get_repository().get_ranking_job(job_id)
+
+
+def get_run_timings(job_id):
+    return get_repository().get_run(job_id)
+
+
+def latest_ranking_job(recruiter_email):
+    jobs = get_repository().list_ranking_jobs(recruiter_email, limit=1)
+    return jobs[0] if jobs else None
@@ -1,29 +1,42 @@
 import os
-from langchain_groq import ChatGroq
+from functools import lru_cache
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Initialize Groq LLM
-llm = ChatGroq(
-    temperature=0.2,
-    model_name="llama-3.3-70b-versatile", # High-performance model for ranking
-    groq_api_key=os.getenv("GROQ_API_KEY")
-)
+# Roles scored per LLM call in multi-role runs; the resumes are sent once per call
+ROLES_PER_CALL = int(os.getenv("ROLES_PER_CALL", "4"))
 
-def rank_resumes(job_description: str, candidates: list[dict]) -> str:
-    """
-    ranks candidates based on job description using Groq LLM
-    """
+@lru_cache(maxsize=None)
+def get_llm():
+    """Groq LLM, created on first use so importing this module needs no API key or network"""
+    from langchain_groq import ChatGroq
 
-    formatted_candidates = ""
-    for idx, c in enumerate(candidates, start=1):
-        formatted_candidates += f"""
+    return ChatGroq(
+        temperature=0.2,
+        model_name="llama-3.3-70b-versatile", # High-performance model for ranking
+        groq_api_key=os.getenv("GROQ_API_KEY")
+    )
+
+def format_candidates(candidates: list[dict]) -> str:
+    """The candidate block of the ranking prompts"""
+    return "".join(
+        f"""
 Candidate {idx}:
 Email: {c['email']}
 Resume:
 {c['resume_text']}
 """
+        for idx, c in enumerate(candidates, start=1)
+    )
+
+def rank_resumes(job_description: str, candidates: list[dict], llm=None) -> str:
+    """
+    ranks candidates based on job description using Groq LLM
+    (or `llm`, any object with .invoke(prompt) -> message with .content)
+    """
+
+    formatted_candidates = format_candidates(candidates)
 
     prompt = f"""
 You are an expert technical recruiter.
@@ -56,5 +69,56 @@ Instructions:
 Do NOT add any explanations, markdown formatting, or text outside the JSON array.
 """
 
-    response = llm.invoke(prompt)
+    response = (llm or get_llm()).invoke(prompt)
+    return response.content
+
+def role_batches(roles: list[dict]) -> list[list[dict]]:
+    """Roles grouped ROLES_PER_CALL at a time, each tagged with its prompt key (R1, R2, ...)"""
+    keyed = [{**role, "key": f"R{i}"} for i, role in enumerate(roles, start=1)]
+    return [keyed[i:i + ROLES_PER_CALL] for i in range(0, len(keyed), ROLES_PER_CALL)]
+
+def score_resumes_for_roles(roles: list[dict], formatted_candidates: str, llm=None) -> str:
+    """
+    scores every candidate against several roles in one LLM call;
+    `roles` is one batch from role_batches(), `formatted_candidates` comes from format_candidates()
+    """
+
+    formatted_roles = "".join(
+        f"""
+Role {role['key']} ({role['title']}):
+{role['job_description']}
+"""
+        for role in roles
+    )
+    keys = ", ".join(f'"{role["key"]}": 80' for role in roles)
+
+    prompt = f"""
+You are an expert technical recruiter hiring for several roles at once.
+
+Roles:
+{formatted_roles}
+
+Below are candidate profiles with their EMAIL as unique identifier.
+
+{formatted_candidates}
+
+Instructions:
+- Score EVERY candidate against EVERY role above, out of 100, on job fit for that role
+- Return the EXACT email address provided for each candidate
+- Return candidate name (extract from resume if available)
+- Respond ONLY with a valid JSON array in this exact format, one object per candidate:
+
+[
+  {{
+    "candidate": "John Doe",
+    "email": "john.doe@gmail.com",
+    "scores": {{{keys}}}
+  }},
+  ...
+]
+
+Do NOT add reasons, explanations, markdown formatting, or text outside the JSON array.
+"""
+
+    response = (llm or get_llm()).invoke(prompt)
     return response.content
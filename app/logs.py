@@ -0,0 +1,50 @@
+import json
+import logging
+import os
+import sys
+import time
+
+# -------------------------
+# Structured Logging
+# -------------------------
+# LOG_FORMAT=json emits one JSON object per line for log aggregation;
+# anything else keeps a human-readable "event key=value" line.
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class KeyValueFormatter(logging.Formatter):
+    def format(self, record):
+        fields = " ".join(f"{k}={v}" for k, v in getattr(record, "fields", {}).items())
+        stamp = time.strftime("%H:%M:%S", time.localtime(record.created))
+        return f"{stamp} {record.levelname} {record.name} {record.getMessage()} {fields}".rstrip()
+
+
+def get_logger(name):
+    """Logger under the `ai_recruiter` namespace, configured on first use"""
+    root = logging.getLogger("ai_recruiter")
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else KeyValueFormatter())
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+    return root.getChild(name)
+
+
+def log_event(logger, event, level=logging.INFO, **fields):
+    logger.log(level, event, extra={"fields": fields})
@@ -0,0 +1,171 @@
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# -------------------------
+# In-process counters & latency histograms
+# -------------------------
+HISTOGRAM_WINDOW = 2048
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+
+class Histogram:
+    """Latency samples (ms) over a bounded window plus lifetime count/sum"""
+
+    def __init__(self, window=HISTOGRAM_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": percentile(ordered, 50),
+            "p95_ms": percentile(ordered, 95),
+            "p99_ms": percentile(ordered, 99),
+            "max_ms": round(self.max, 3),
+        }
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return round(ordered[rank], 3)
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def observe(name, value_ms):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.observe(value_ms)
+
+
+def snapshot(prefix=""):
+    """Counters and histogram summaries whose name starts with prefix"""
+    with _lock:
+        counters = {k: v for k, v in _counters.items() if k.startswith(prefix)}
+        histograms = {k: h.summary() for k, h in _histograms.items() if k.startswith(prefix)}
+    return {"counters": counters, "histograms": histograms}
+
+
+def reset(prefix=""):
+    with _lock:
+        for store in (_counters, _histograms):
+            for key in [k for k in store if k.startswith(prefix)]:
+                del store[key]
+
+
+# -------------------------
+# Memory accounting
+# -------------------------
+def deep_sizeof(obj, seen=None):
+    """
+    Approximate retained size in bytes of obj and everything it references
+    (containers, __dict__ and __slots__ attributes), counting shared objects once.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return size + sum(deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    for slot in getattr(type(obj), "__slots__", ()):
+        if hasattr(obj, slot):
+            size += deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+
+# Latest measured session-state size per UI session, for capacity planning
+SESSION_SIZE_MAX_AGE_SECONDS = 1800
+_session_sizes = {}
+
+
+def record_session_size(session_id, size_bytes):
+    with _lock:
+        _session_sizes[session_id] = (time.monotonic(), size_bytes)
+
+
+def session_size_summary():
+    """Sessions measured in the last SESSION_SIZE_MAX_AGE_SECONDS and their state sizes (KiB)"""
+    cutoff = time.monotonic() - SESSION_SIZE_MAX_AGE_SECONDS
+    with _lock:
+        for session_id in [s for s, (seen, _) in _session_sizes.items() if seen < cutoff]:
+            del _session_sizes[session_id]
+        sizes = [size for _, size in _session_sizes.values()]
+    return {
+        "sessions": len(sizes),
+        "total_kib": round(sum(sizes) / 1024, 1),
+        "mean_kib": round(sum(sizes) / len(sizes) / 1024, 1) if sizes else 0.0,
+        "max_kib": round(max(sizes) / 1024, 1) if sizes else 0.0,
+    }
+
+
+# -------------------------
+# Per-run stage timings
+# -------------------------
+class RunTimer:
+    """
+    Wall-clock time per stage of one ranking run. A stage may be timed more
+    than once (one extraction per file, one call per LLM request); each
+    sample is also fed to the process-wide `run.<stage>` histogram.
+    """
+
+    def __init__(self):
+        self.samples = {}
+        self.items = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, **tags):
+        started = time.perf_counter()
+        try:
+            yield tags
+        finally:
+            self.add(name, (time.perf_counter() - started) * 1000, **tags)
+
+    def add(self, name, elapsed_ms, **tags):
+        self.samples.setdefault(name, []).append(elapsed_ms)
+        if tags:
+            self.items.append({"stage": name, "ms": round(elapsed_ms, 3), **tags})
+        observe(f"run.{name}", elapsed_ms)
+
+    def summary(self):
+        return {
+            name: {"calls": len(samples), "total_ms": round(sum(samples), 3), "max_ms": round(max(samples), 3)}
+            for name, samples in self.samples.items()
+        }
+
+    def total_ms(self):
+        return round((time.perf_counter() - self.started) * 1000, 3)
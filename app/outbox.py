@@ -0,0 +1,252 @@
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+from datetime import timedelta
+from functools import lru_cache
+
+from app import email_service
+from app.backend_layer import QUIZ_BASE_URL
+from app.email_service import send_email
+from app.frontend_layer import render_second_round_emails
+from app.logs import get_logger, log_event
+from app.repository import get_repository, utcnow
+
+logger = get_logger("outbox")
+
+# -------------------------
+# Outbox Settings
+# -------------------------
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "2"))
+# Per SMTP provider; most providers throttle or flag bursts from one sender
+OUTBOX_RATE_PER_MINUTE = float(os.getenv("OUTBOX_RATE_PER_MINUTE", "60"))
+OUTBOX_POLL_SECONDS = 2.0
+# A message left in `sending` this long belongs to a worker that died (or
+# hit a database error mid-update); workers sweep for them every minute
+OUTBOX_STALE_AFTER = timedelta(minutes=5)
+OUTBOX_SWEEP_SECONDS = 60.0
+# Failed sends are retried after 30s, 1m, 2m, 4m ... then dead-lettered
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_RETRY_BASE_SECONDS = 30
+OUTBOX_RETRY_MAX_SECONDS = 3600
+INVITE_BATCH_SIZE = 200
+
+
+class RateLimiter:
+    """Token bucket allowing `rate_per_minute` sends with bursts up to `burst`"""
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst or max(1.0, self.rate * 5)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# -------------------------
+# Background Workers
+# -------------------------
+class OutboxWorkerPool:
+    """Daemon threads that drain the persistent outbox through send_email"""
+
+    def __init__(self, workers=OUTBOX_WORKERS, rate_per_minute=OUTBOX_RATE_PER_MINUTE):
+        self.workers = workers
+        self.rate_per_minute = rate_per_minute
+        self._limiters = {}
+        self._limiters_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._sweep_lock = threading.Lock()
+        self._swept_at = float("-inf")
+
+    def start(self):
+        self._sweep()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"outbox-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def notify(self):
+        """Wake idle workers right after an enqueue instead of waiting for the next poll"""
+        self._wakeup.set()
+
+    def _limiter(self, provider):
+        with self._limiters_lock:
+            if provider not in self._limiters:
+                self._limiters[provider] = RateLimiter(self.rate_per_minute)
+            return self._limiters[provider]
+
+    def _sweep(self):
+        """Requeue stale `sending` messages, at most once per OUTBOX_SWEEP_SECONDS across workers"""
+        with self._sweep_lock:
+            if time.monotonic() - self._swept_at < OUTBOX_SWEEP_SECONDS:
+                return
+            self._swept_at = time.monotonic()
+        requeued = get_repository().requeue_stale_emails(utcnow() - OUTBOX_STALE_AFTER)
+        if requeued:
+            log_event(logger, "outbox.requeued_stale", count=requeued)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            # A database error (e.g. during a failover) must not kill the worker for good
+            try:
+                self._sweep()
+                self._process_next()
+            except Exception as e:
+                log_event(logger, "outbox.worker_error", level=logging.WARNING, error=str(e))
+                self._stopped.wait(OUTBOX_POLL_SECONDS)
+
+    def _process_next(self):
+        repo = get_repository()
+        message = repo.claim_email()
+        if message is None:
+            self._wakeup.wait(OUTBOX_POLL_SECONDS)
+            self._wakeup.clear()
+            return
+
+        # Read per send: configure_smtp() may switch providers at runtime
+        self._limiter(email_service.SMTP_SERVER).acquire()
+        try:
+            success, error = send_email(
+                message["to_email"], message["subject"], message["body"], message.get("html")
+            )
+        except Exception as e:
+            success, error = False, str(e)
+
+        if success:
+            repo.update_email(message["_id"], "sent", sent_at=utcnow(), error=None)
+        elif message["attempts"] >= OUTBOX_MAX_ATTEMPTS:
+            repo.update_email(message["_id"], "dead", error=error)
+        else:
+            repo.update_email(
+                message["_id"],
+                "failed",
+                error=error,
+                next_attempt_at=utcnow() + retry_delay(message["attempts"])
+            )
+
+def retry_delay(attempts):
+    """Exponential backoff with +/-10% jitter so a failed batch does not retry in lockstep"""
+    seconds = min(OUTBOX_RETRY_MAX_SECONDS, OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=seconds * random.uniform(0.9, 1.1))
+
+
+@lru_cache(maxsize=None)
+def get_outbox():
+    """
+    Process-wide worker pool. UI and API processes start it at boot so messages
+    left queued, retrying or stuck in `sending` by a restart are picked up
+    without waiting for the next enqueue.
+    """
+    return OutboxWorkerPool().start()
+
+
+# -------------------------
+# Enqueue API
+# -------------------------
+def idempotency_key(token, kind, override_email=None):
+    """
+    One message of each kind per candidate, however many times it is enqueued.
+    Test sends to an override address are keyed by that address too, so they
+    never use up the key of the candidate's real message.
+    """
+    scope = f"{token}:{kind}:override:{override_email}" if override_email else f"{token}:{kind}"
+    return hashlib.sha256(scope.encode()).hexdigest()
+
+
+def _message(candidate, kind, subject, body, recruiter_email=None, html=None, override_email=None):
+    now = utcnow()
+    return {
+        "idempotency_key": idempotency_key(candidate["quiz_token"], kind, override_email),
+        "candidate_token": candidate["quiz_token"],
+        "to_email": override_email or candidate["email"],
+        "kind": kind,
+        "subject": subject,
+        "body": body,
+        "html": html,
+        "recruiter_email": recruiter_email,
+        "status": "queued",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def enqueue_email(candidate, kind, subject, body, recruiter_email=None, html=None, override_email=None):
+    """
+    Queue one message and return immediately; delivery happens on a worker thread.
+    Returns False if this candidate already has a message of this kind
+    (for override_email, one sent to that address).
+    """
+    queued = get_repository().enqueue_emails(
+        [_message(candidate, kind, subject, body, recruiter_email, html, override_email)]
+    )
+    get_outbox().notify()
+    return queued == 1
+
+
+def enqueue_shortlist_invites(recruiter_email, override_email=None):
+    """
+    Queue the second-round invite for every SHORTLISTED candidate of a recruiter.
+    Safe to re-run after a crash: already queued invites are skipped.
+    """
+    repo = get_repository()
+    queued = 0
+    after = None
+    while True:
+        page, after = repo.recover_session(recruiter_email, INVITE_BATCH_SIZE, after)
+        passwords = repo.get_passwords(c["quiz_token"] for c in page)
+        for c in page:
+            c["password"] = passwords.get(c["quiz_token"], "")
+            c["quiz_link"] = f"{QUIZ_BASE_URL}{c['quiz_token']}"
+            if override_email:
+                c["email"] = override_email
+        # Render the whole page up front in one pass over the compiled template
+        rendered = render_second_round_emails(page, recruiter_email)
+        queued += repo.enqueue_emails([
+            _message(c, "shortlist_invite", r.subject, r.text, recruiter_email, r.html, override_email)
+            for c, r in zip(page, rendered)
+        ])
+        if after is None:
+            break
+    get_outbox().notify()
+    return queued
+
+
+def get_email_statuses(tokens):
+    return get_repository().latest_email_status(tokens)
+
+
+def get_outbox_counts():
+    return get_repository().outbox_counts()
+
+
+def get_dead_emails(limit=50):
+    return get_repository().list_dead_emails(limit)
+
+
+def replay_dead_emails(message_ids=None):
+    replayed = get_repository().replay_dead_emails(message_ids)
+    get_outbox().notify()
+    return replayed
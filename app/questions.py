@@ -0,0 +1,147 @@
+import json
+import operator
+import os
+import random
+import sys
+import threading
+import time
+from functools import lru_cache
+
+from app.repository import get_repository
+
+# -------------------------
+# Question Bank
+# -------------------------
+# Quizzes live in the `question_banks` collection, one document per
+# (job_id, version): {job_id, version, pass_mark, questions: [{id, text,
+# options, answer}]}. Saving a bank inserts the next version; readers
+# always use the latest. Jobs without a bank use the "default" job's bank,
+# and app/question_banks/default.json when the database has none.
+QUESTION_BANK_DIR = os.path.join(os.path.dirname(__file__), "question_banks")
+DEFAULT_JOB_ID = "default"
+DEFAULT_PASS_MARK = 70
+VERSION_CHECK_SECONDS = 60
+# Option index recorded for a question left unanswered; never matches the key
+UNANSWERED = 255
+
+
+class QuestionBank:
+    """One version of a job's quiz with its answer key packed into a byte array"""
+
+    def __init__(self, job_id, version, questions, pass_mark=DEFAULT_PASS_MARK):
+        self.job_id = job_id
+        self.version = version
+        self.pass_mark = pass_mark
+        # What the quiz page renders; answers never leave this object
+        self.questions = [
+            {"id": q["id"], "text": q["text"], "options": list(q["options"])}
+            for q in questions
+        ]
+        self.ids = [q["id"] for q in questions]
+        self.answer_key = bytes(_answer_index(q) for q in questions)
+
+    def for_candidate(self, token):
+        """Question order shuffled per candidate; stable across reruns of the same session"""
+        ordered = list(self.questions)
+        random.Random(f"{self.job_id}:{self.version}:{token}").shuffle(ordered)
+        return ordered
+
+    def grade(self, answers):
+        """
+        Percentage score for {question_id: option index}. The submission is
+        packed like the key and compared in one pass of map(operator.eq).
+        """
+        if not self.ids:
+            return 0.0
+        submitted = bytes(
+            answers[qid] if isinstance(answers.get(qid), int) and 0 <= answers[qid] < UNANSWERED else UNANSWERED
+            for qid in self.ids
+        )
+        correct = sum(map(operator.eq, self.answer_key, submitted))
+        return round(correct / len(self.ids) * 100, 1)
+
+    def passed(self, score):
+        return score >= self.pass_mark
+
+
+def _answer_index(question):
+    answer = question["answer"]
+    if isinstance(answer, int):
+        return answer
+    return question["options"].index(answer)
+
+
+class QuestionBankRegistry:
+    """
+    Compiled banks cached per job. The cached version is re-checked with a
+    version-only query at most every VERSION_CHECK_SECONDS, and the full
+    bank is only re-read when that version has moved.
+    """
+
+    def __init__(self, default_path=os.path.join(QUESTION_BANK_DIR, "default.json")):
+        self._lock = threading.Lock()
+        self._banks = {}
+        with open(default_path, encoding="utf-8") as f:
+            default = json.load(f)
+        self._fallback = QuestionBank(
+            DEFAULT_JOB_ID, 0, default["questions"], default.get("pass_mark", DEFAULT_PASS_MARK)
+        )
+
+    def get(self, job_id=None):
+        job_id = job_id or DEFAULT_JOB_ID
+        now = time.monotonic()
+        with self._lock:
+            cached = self._banks.get(job_id)
+            if cached and now - cached[0] < VERSION_CHECK_SECONDS:
+                return cached[1]
+
+        repo = get_repository()
+        version = repo.question_bank_version(job_id)
+        if version is None:
+            bank = self.get(DEFAULT_JOB_ID) if job_id != DEFAULT_JOB_ID else self._fallback
+        elif cached and cached[1].job_id == job_id and cached[1].version == version:
+            bank = cached[1]
+        else:
+            doc = repo.get_question_bank(job_id)
+            bank = QuestionBank(job_id, doc["version"], doc["questions"], doc.get("pass_mark", DEFAULT_PASS_MARK))
+
+        with self._lock:
+            self._banks[job_id] = (now, bank)
+        return bank
+
+    def invalidate(self, job_id=None):
+        with self._lock:
+            if job_id is None:
+                self._banks.clear()
+            else:
+                self._banks.pop(job_id, None)
+
+
+@lru_cache(maxsize=None)
+def get_question_registry():
+    return QuestionBankRegistry()
+
+
+def get_question_bank(job_id=None):
+    return get_question_registry().get(job_id)
+
+
+def save_question_bank(job_id, questions, pass_mark=DEFAULT_PASS_MARK):
+    """Validate and store a new version of a job's bank; returns the version number"""
+    for q in questions:
+        if not {"id", "text", "options", "answer"} <= q.keys():
+            raise ValueError(f"Question {q.get('id')!r} needs id, text, options and answer")
+        _answer_index(q)  # raises if the answer is not one of the options
+    version = get_repository().save_question_bank(job_id, questions, pass_mark)
+    get_question_registry().invalidate(job_id)
+    return version
+
+
+if __name__ == "__main__":
+    # python -m app.questions import <job_id> questions.json
+    if len(sys.argv) != 4 or sys.argv[1] != "import":
+        sys.exit("usage: python -m app.questions import <job_id> <file.json>")
+    with open(sys.argv[3], encoding="utf-8") as f:
+        bank_file = json.load(f)
+    saved = save_question_bank(sys.argv[2], bank_file["questions"], bank_file.get("pass_mark", DEFAULT_PASS_MARK))
+    print(f"✅ Stored {len(bank_file['questions'])} questions for {sys.argv[2]} as version {saved}")
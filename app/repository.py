@@ -0,0 +1,849 @@
+import copy
+import itertools
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from functools import lru_cache
+
+# -------------------------
+# Repository Interface
+# -------------------------
+# All candidate / recruiter / asset persistence goes through one of these.
+# DB_BACKEND=memory swaps Atlas for a process-local store with the same
+# query semantics, so the pipeline can be exercised and profiled offline.
+DB_BACKEND = os.getenv("DB_BACKEND", "mongo").lower()
+
+
+class Repository:
+    def ensure_indexes(self):
+        pass
+
+    # ---- candidates ----
+    def store_shortlist(self, records):
+        """
+        Insert shortlisted candidate records; returns the stored ones with their _id set.
+        A record with a content_hash is skipped if that resume is already
+        shortlisted for the same recruiter and job (e.g. by a concurrent pooled run).
+        """
+        raise NotImplementedError
+
+    def find_by_token(self, token, projection=None):
+        raise NotImplementedError
+
+    def find_by_login(self, email, password):
+        raise NotImplementedError
+
+    def get_passwords(self, tokens):
+        """{quiz_token: password} for the given tokens"""
+        raise NotImplementedError
+
+    def transition_status(self, token, new_status, from_status="SHORTLISTED", **fields):
+        """
+        Atomically move a candidate from `from_status` to `new_status` (plus extra fields).
+        Returns the updated candidate, or None if another request already moved it.
+        """
+        raise NotImplementedError
+
+    def list_candidates(self, page_size, after=None, statuses=("SHORTLISTED",), recruiter_email=None,
+                        sort_field="score", descending=True, min_score=None, search=None, projection=None):
+        """
+        Keyset page of candidates ordered by (sort_field, _id), filtered in the
+        store by status, recruiter, a minimum sort_field value and a
+        case-insensitive name/email search. Returns (docs, next_cursor).
+        """
+        raise NotImplementedError
+
+    def list_leaderboard(self, page_size, after=None, **filters):
+        """Keyset page of SELECTED candidates by (quiz_score, _id), descending by default"""
+        return self.list_candidates(
+            page_size, after, statuses=("SELECTED",), sort_field="quiz_score",
+            projection=LEADERBOARD_PROJECTION, **filters
+        )
+
+    def recover_session(self, recruiter_email, page_size, after=None, **filters):
+        """Keyset page of a recruiter's candidates (SHORTLISTED by default) by (score, _id)"""
+        return self.list_candidates(
+            page_size, after, recruiter_email=recruiter_email, sort_field="score",
+            projection=SHORTLIST_PROJECTION, **filters
+        )
+
+    # ---- recruiters ----
+    def find_recruiter(self, email):
+        raise NotImplementedError
+
+    def create_recruiter(self, record):
+        raise NotImplementedError
+
+    # ---- assets ----
+    def get_asset(self, name):
+        raise NotImplementedError
+
+    def save_asset(self, name, data):
+        raise NotImplementedError
+
+    # ---- question banks ----
+    def question_bank_version(self, job_id):
+        """Latest bank version for a job, or None if it has no bank"""
+        raise NotImplementedError
+
+    def get_question_bank(self, job_id):
+        """Latest bank document for a job"""
+        raise NotImplementedError
+
+    def save_question_bank(self, job_id, questions, pass_mark):
+        """Insert the next version of a job's bank and return its version number"""
+        raise NotImplementedError
+
+    # ---- ranking jobs ----
+    def create_ranking_job(self, record):
+        """Insert a ranking job record; returns it with its _id set"""
+        raise NotImplementedError
+
+    def get_ranking_job(self, job_id):
+        raise NotImplementedError
+
+    def update_ranking_job(self, job_id, **fields):
+        raise NotImplementedError
+
+    def list_ranking_jobs(self, recruiter_email, limit=5):
+        """A recruiter's most recent ranking jobs, newest first"""
+        raise NotImplementedError
+
+    def claim_ranking_job(self, job_id, owner):
+        """Atomically move a `queued` job owned by `owner` to `running` and return it; None if gone or taken"""
+        raise NotImplementedError
+
+    def heartbeat_ranking_jobs(self, job_ids, owner):
+        """Mark the given jobs as still held by `owner`"""
+        raise NotImplementedError
+
+    def take_over_stale_ranking_jobs(self, older_than, owner):
+        """
+        Requeue, under `owner`, every `queued` or `running` job whose owner last
+        sent a heartbeat before older_than (i.e. died); returns them oldest first.
+        Each job is taken by one caller only.
+        """
+        raise NotImplementedError
+
+    # ---- run timings ----
+    def save_run(self, record):
+        """Insert the stage timings of one ranking run"""
+        raise NotImplementedError
+
+    def get_run(self, ranking_job_id):
+        """Latest timings recorded for a ranking job, or None"""
+        raise NotImplementedError
+
+    # ---- resume pools ----
+    def pool_hashes(self, recruiter_email, job_id):
+        """Content hashes of the resumes already in a job's pool"""
+        raise NotImplementedError
+
+    def add_to_pool(self, entries):
+        """Insert pool entries, skipping any whose content_hash is already pooled; returns how many were added"""
+        raise NotImplementedError
+
+    def get_pool(self, recruiter_email, job_id, include_text=True):
+        """A job's pooled resumes, with their parsed text unless include_text is False"""
+        raise NotImplementedError
+
+    def update_pool_scores(self, updates):
+        """Set cached score fields on pool entries, given {entry _id: fields}"""
+        raise NotImplementedError
+
+    def shortlisted_emails(self, recruiter_email, job_id):
+        """Emails already stored as candidates for a recruiter's job"""
+        raise NotImplementedError
+
+    # ---- email outbox ----
+    def enqueue_emails(self, messages):
+        """
+        Persist outgoing messages in the `queued` state, skipping any whose
+        idempotency_key already exists. Returns the number newly queued.
+        """
+        raise NotImplementedError
+
+    def claim_email(self):
+        """Atomically move the next due queued/failed message to `sending` and return it"""
+        raise NotImplementedError
+
+    def update_email(self, message_id, status, **fields):
+        raise NotImplementedError
+
+    def requeue_stale_emails(self, older_than):
+        """Return messages stuck in `sending` (e.g. after a crash) to the queue"""
+        raise NotImplementedError
+
+    def latest_email_status(self, tokens):
+        """{quiz_token: most recent outbox message} for the given candidates"""
+        raise NotImplementedError
+
+    def outbox_counts(self):
+        raise NotImplementedError
+
+    def list_dead_emails(self, limit=50):
+        raise NotImplementedError
+
+    def replay_dead_emails(self, message_ids=None):
+        """Requeue dead-lettered messages (all, or just message_ids) with a fresh retry budget"""
+        raise NotImplementedError
+
+
+SHORTLIST_PROJECTION = {"candidate": 1, "email": 1, "score": 1, "quiz_token": 1, "status": 1}
+CANDIDATE_STATUSES = ("SHORTLISTED", "SELECTED", "REJECTED")
+LEADERBOARD_PROJECTION = {"candidate": 1, "email": 1, "quiz_score": 1, "quiz_token": 1}
+# Left out of ranking job listings, which only need status and progress
+RANKING_JOB_BULKY_FIELDS = ("job_description", "files", "roles", "matrix", "shortlist")
+
+
+# -------------------------
+# MongoDB Implementation
+# -------------------------
+class MongoRepository(Repository):
+    def __init__(self, database):
+        self.candidates = database["candidates"]
+        self.recruiters = database["recruiters"]
+        self.assets = database["assets"]
+        self.outbox = database["email_outbox"]
+        self.question_banks = database["question_banks"]
+        self.ranking_jobs = database["ranking_jobs"]
+        self.runs = database["runs"]
+        self.resume_pool = database["resume_pool"]
+
+    def ensure_indexes(self):
+        self.candidates.create_index("quiz_token")
+        self.candidates.create_index([("status", 1), ("quiz_score", -1), ("_id", -1)])
+        self.candidates.create_index([("recruiter_email", 1), ("status", 1), ("score", -1), ("_id", -1)])
+        self.recruiters.create_index("email")
+        self.assets.create_index("name")
+        self.question_banks.create_index([("job_id", 1), ("version", -1)], unique=True)
+        self.ranking_jobs.create_index([("recruiter_email", 1), ("created_at", -1)])
+        self.ranking_jobs.create_index([("status", 1), ("heartbeat_at", 1)])
+        self.runs.create_index([("ranking_job_id", 1), ("created_at", -1)])
+        self.runs.create_index([("recruiter_email", 1), ("created_at", -1)])
+        self.resume_pool.create_index([("recruiter_email", 1), ("job_id", 1), ("content_hash", 1)], unique=True)
+        self.candidates.create_index([("recruiter_email", 1), ("job_id", 1)])
+        self.candidates.create_index(
+            [("recruiter_email", 1), ("job_id", 1), ("content_hash", 1)],
+            unique=True,
+            partialFilterExpression={"content_hash": {"$type": "string"}}
+        )
+        self.outbox.create_index("idempotency_key", unique=True)
+        self.outbox.create_index([("status", 1), ("next_attempt_at", 1)])
+        self.outbox.create_index([("candidate_token", 1), ("created_at", -1)])
+
+    def store_shortlist(self, records):
+        from pymongo import UpdateOne
+
+        plain = [r for r in records if not r.get("content_hash")]
+        pooled = [r for r in records if r.get("content_hash")]
+        if plain:
+            # insert_many sets _id on each record in place
+            self.candidates.insert_many(plain)
+        if pooled:
+            # Upserts on the unique (recruiter_email, job_id, content_hash) index: one writer wins per resume
+            result = self.candidates.bulk_write([
+                UpdateOne(
+                    {"recruiter_email": r["recruiter_email"], "job_id": r["job_id"], "content_hash": r["content_hash"]},
+                    {"$setOnInsert": r},
+                    upsert=True
+                )
+                for r in pooled
+            ], ordered=False)
+            for index, _id in result.upserted_ids.items():
+                pooled[index]["_id"] = _id
+        return [r for r in records if "_id" in r]
+
+    def find_by_token(self, token, projection=None):
+        return self.candidates.find_one({"quiz_token": token}, projection)
+
+    def find_by_login(self, email, password):
+        return self.candidates.find_one({"email": email, "password": password})
+
+    def get_passwords(self, tokens):
+        cursor = self.candidates.find(
+            {"quiz_token": {"$in": list(tokens)}},
+            {"_id": 0, "quiz_token": 1, "password": 1}
+        )
+        return {doc["quiz_token"]: doc["password"] for doc in cursor}
+
+    def transition_status(self, token, new_status, from_status="SHORTLISTED", **fields):
+        from pymongo import ReturnDocument
+
+        return self.candidates.find_one_and_update(
+            {"quiz_token": token, "status": from_status},
+            {"$set": {"status": new_status, **fields}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def list_candidates(self, page_size, after=None, statuses=("SHORTLISTED",), recruiter_email=None,
+                        sort_field="score", descending=True, min_score=None, search=None, projection=None):
+        query = {"status": {"$in": list(statuses)}}
+        if recruiter_email is not None:
+            query["recruiter_email"] = recruiter_email
+        if min_score is not None:
+            query[sort_field] = {"$gte": min_score}
+        if search and search.strip():
+            # Unanchored, so it scans the (recruiter, status) index range rather than seeking
+            pattern = {"$regex": re.escape(search.strip()), "$options": "i"}
+            query["$or"] = [{"candidate": pattern}, {"email": pattern}]
+        return self._keyset_page(query, sort_field, projection, page_size, after, descending)
+
+    def _keyset_page(self, query, sort_field, projection, page_size, after=None, descending=True):
+        """
+        One page ordered by (sort_field, _id), descending unless told otherwise.
+        `after` is the (value, _id) cursor returned for the previous page.
+        Returns (docs, next_cursor); next_cursor is None on the last page.
+        """
+        op, direction = ("$lt", -1) if descending else ("$gt", 1)
+        if after is not None:
+            value, last_id = after
+            query = {"$and": [query, {"$or": [
+                {sort_field: {op: value}},
+                {sort_field: value, "_id": {op: last_id}}
+            ]}]}
+
+        docs = list(
+            self.candidates.find(query, projection)
+            .sort([(sort_field, direction), ("_id", direction)])
+            .limit(page_size + 1)
+        )
+        return _split_page(docs, sort_field, page_size)
+
+    def find_recruiter(self, email):
+        return self.recruiters.find_one({"email": email})
+
+    def create_recruiter(self, record):
+        self.recruiters.insert_one(record)
+        return record
+
+    def get_asset(self, name):
+        return self.assets.find_one({"name": name})
+
+    def save_asset(self, name, data):
+        self.assets.update_one({"name": name}, {"$set": {"data": data}}, upsert=True)
+
+    def question_bank_version(self, job_id):
+        doc = self.question_banks.find_one({"job_id": job_id}, {"_id": 0, "version": 1}, sort=[("version", -1)])
+        return doc["version"] if doc else None
+
+    def get_question_bank(self, job_id):
+        return self.question_banks.find_one({"job_id": job_id}, sort=[("version", -1)])
+
+    def save_question_bank(self, job_id, questions, pass_mark):
+        # The unique (job_id, version) index turns a concurrent save into an error
+        version = (self.question_bank_version(job_id) or 0) + 1
+        self.question_banks.insert_one({
+            "job_id": job_id,
+            "version": version,
+            "pass_mark": pass_mark,
+            "questions": questions,
+            "created_at": utcnow(),
+        })
+        return version
+
+    def create_ranking_job(self, record):
+        self.ranking_jobs.insert_one(record)
+        return record
+
+    def get_ranking_job(self, job_id):
+        return self.ranking_jobs.find_one({"_id": job_id})
+
+    def update_ranking_job(self, job_id, **fields):
+        self.ranking_jobs.update_one({"_id": job_id}, {"$set": {"updated_at": utcnow(), **fields}})
+
+    def list_ranking_jobs(self, recruiter_email, limit=5):
+        return list(
+            self.ranking_jobs.find({"recruiter_email": recruiter_email}, {k: 0 for k in RANKING_JOB_BULKY_FIELDS})
+            .sort("created_at", -1)
+            .limit(limit)
+        )
+
+    def claim_ranking_job(self, job_id, owner):
+        from pymongo import ReturnDocument
+
+        now = utcnow()
+        return self.ranking_jobs.find_one_and_update(
+            {"_id": job_id, "status": "queued", "owner": owner},
+            {"$set": {"status": "running", "started_at": now, "heartbeat_at": now, "updated_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def heartbeat_ranking_jobs(self, job_ids, owner):
+        if job_ids:
+            self.ranking_jobs.update_many(
+                {"_id": {"$in": list(job_ids)}, "owner": owner}, {"$set": {"heartbeat_at": utcnow()}}
+            )
+
+    def take_over_stale_ranking_jobs(self, older_than, owner):
+        from pymongo import ReturnDocument
+
+        taken = []
+        while True:
+            now = utcnow()
+            # heartbeat_at: None also matches jobs created before heartbeats existed
+            job = self.ranking_jobs.find_one_and_update(
+                {"status": {"$in": ["queued", "running"]},
+                 "$or": [{"heartbeat_at": {"$lt": older_than}}, {"heartbeat_at": None}]},
+                {"$set": {"status": "queued", "stage": "queued", "owner": owner, "heartbeat_at": now,
+                          "updated_at": now}},
+                sort=[("created_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if job is None:
+                return taken
+            taken.append(job)
+
+    def save_run(self, record):
+        self.runs.insert_one(record)
+        return record
+
+    def get_run(self, ranking_job_id):
+        return self.runs.find_one({"ranking_job_id": ranking_job_id}, sort=[("created_at", -1)])
+
+    def pool_hashes(self, recruiter_email, job_id):
+        cursor = self.resume_pool.find(
+            {"recruiter_email": recruiter_email, "job_id": job_id}, {"_id": 0, "content_hash": 1}
+        )
+        return {doc["content_hash"] for doc in cursor}
+
+    def add_to_pool(self, entries):
+        from pymongo import UpdateOne
+
+        if not entries:
+            return 0
+        result = self.resume_pool.bulk_write([
+            UpdateOne(
+                {"recruiter_email": e["recruiter_email"], "job_id": e["job_id"], "content_hash": e["content_hash"]},
+                {"$setOnInsert": e},
+                upsert=True
+            )
+            for e in entries
+        ], ordered=False)
+        return result.upserted_count
+
+    def get_pool(self, recruiter_email, job_id, include_text=True):
+        projection = None if include_text else {"resume_text": 0}
+        return list(self.resume_pool.find({"recruiter_email": recruiter_email, "job_id": job_id}, projection))
+
+    def update_pool_scores(self, updates):
+        from pymongo import UpdateOne
+
+        if updates:
+            self.resume_pool.bulk_write(
+                [UpdateOne({"_id": entry_id}, {"$set": fields}) for entry_id, fields in updates.items()],
+                ordered=False
+            )
+
+    def shortlisted_emails(self, recruiter_email, job_id):
+        return set(self.candidates.distinct("email", {"recruiter_email": recruiter_email, "job_id": job_id}))
+
+    def enqueue_emails(self, messages):
+        from pymongo import UpdateOne
+
+        if not messages:
+            return 0
+        result = self.outbox.bulk_write([
+            UpdateOne({"idempotency_key": m["idempotency_key"]}, {"$setOnInsert": m}, upsert=True)
+            for m in messages
+        ], ordered=False)
+        return result.upserted_count
+
+    def claim_email(self):
+        from pymongo import ReturnDocument
+
+        now = utcnow()
+        return self.outbox.find_one_and_update(
+            {"status": {"$in": ["queued", "failed"]}, "next_attempt_at": {"$lte": now}},
+            {"$set": {"status": "sending", "updated_at": now}, "$inc": {"attempts": 1}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def update_email(self, message_id, status, **fields):
+        self.outbox.update_one(
+            {"_id": message_id},
+            {"$set": {"status": status, "updated_at": utcnow(), **fields}}
+        )
+
+    def requeue_stale_emails(self, older_than):
+        result = self.outbox.update_many(
+            {"status": "sending", "updated_at": {"$lt": older_than}},
+            {"$set": {"status": "queued", "updated_at": utcnow()}}
+        )
+        return result.modified_count
+
+    def latest_email_status(self, tokens):
+        cursor = self.outbox.find(
+            {"candidate_token": {"$in": list(tokens)}},
+            {"candidate_token": 1, "kind": 1, "status": 1, "error": 1, "attempts": 1, "next_attempt_at": 1, "updated_at": 1}
+        ).sort("created_at", -1)
+        latest = {}
+        for doc in cursor:
+            latest.setdefault(doc["candidate_token"], doc)
+        return latest
+
+    def outbox_counts(self):
+        pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        return {doc["_id"]: doc["count"] for doc in self.outbox.aggregate(pipeline)}
+
+    def list_dead_emails(self, limit=50):
+        return list(
+            self.outbox.find({"status": "dead"}, {"body": 0})
+            .sort("updated_at", -1)
+            .limit(limit)
+        )
+
+    def replay_dead_emails(self, message_ids=None):
+        query = {"status": "dead"}
+        if message_ids is not None:
+            query["_id"] = {"$in": list(message_ids)}
+        now = utcnow()
+        result = self.outbox.update_many(
+            query,
+            {"$set": {"status": "queued", "attempts": 0, "next_attempt_at": now, "updated_at": now}}
+        )
+        return result.modified_count
+
+
+# -------------------------
+# In-Memory Implementation
+# -------------------------
+class InMemoryRepository(Repository):
+    """Thread-safe process-local store mirroring the MongoRepository queries"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._tables = {"candidates": {}, "recruiters": {}, "assets": {}, "email_outbox": {}, "question_banks": {},
+                        "ranking_jobs": {}, "runs": {}, "resume_pool": {}}
+
+    def _insert(self, table, record):
+        with self._lock:
+            record["_id"] = next(self._ids)
+            self._tables[table][record["_id"]] = copy.deepcopy(record)
+        return record
+
+    def _find(self, table, predicate):
+        with self._lock:
+            return [doc for doc in self._tables[table].values() if predicate(doc)]
+
+    def _find_one(self, table, predicate, projection=None):
+        with self._lock:
+            for doc in self._tables[table].values():
+                if predicate(doc):
+                    return _project(doc, projection)
+        return None
+
+    def store_shortlist(self, records):
+        stored = []
+        with self._lock:
+            for record in records:
+                key = (record.get("recruiter_email"), record.get("job_id"), record.get("content_hash"))
+                if record.get("content_hash") and self._find_one(
+                    "candidates",
+                    lambda d: (d.get("recruiter_email"), d.get("job_id"), d.get("content_hash")) == key
+                ):
+                    continue
+                stored.append(self._insert("candidates", record))
+        return stored
+
+    def find_by_token(self, token, projection=None):
+        return self._find_one("candidates", lambda d: d.get("quiz_token") == token, projection)
+
+    def find_by_login(self, email, password):
+        return self._find_one("candidates", lambda d: d.get("email") == email and d.get("password") == password)
+
+    def get_passwords(self, tokens):
+        tokens = set(tokens)
+        docs = self._find("candidates", lambda d: d.get("quiz_token") in tokens)
+        return {doc["quiz_token"]: doc["password"] for doc in docs}
+
+    def transition_status(self, token, new_status, from_status="SHORTLISTED", **fields):
+        with self._lock:
+            for doc in self._tables["candidates"].values():
+                if doc.get("quiz_token") == token and doc.get("status") == from_status:
+                    doc.update(status=new_status, **fields)
+                    return copy.deepcopy(doc)
+        return None
+
+    def list_candidates(self, page_size, after=None, statuses=("SHORTLISTED",), recruiter_email=None,
+                        sort_field="score", descending=True, min_score=None, search=None, projection=None):
+        statuses = set(statuses)
+        needle = search.strip().lower() if search else ""
+
+        def matches(doc):
+            if doc.get("status") not in statuses:
+                return False
+            if recruiter_email is not None and doc.get("recruiter_email") != recruiter_email:
+                return False
+            if min_score is not None and (doc.get(sort_field) is None or doc[sort_field] < min_score):
+                return False
+            if needle:
+                return needle in str(doc.get("candidate", "")).lower() or needle in str(doc.get("email", "")).lower()
+            return True
+
+        docs = self._find("candidates", matches)
+        return self._keyset_page(docs, sort_field, projection, page_size, after, descending)
+
+    def _keyset_page(self, docs, sort_field, projection, page_size, after=None, descending=True):
+        # Mongo orders missing/null values below any number
+        def key(doc):
+            value = doc.get(sort_field)
+            return (value is not None, value if value is not None else 0, doc["_id"])
+
+        ordered = sorted(docs, key=key, reverse=descending)
+        if after is not None:
+            value, last_id = after
+            cursor_key = key({sort_field: value, "_id": last_id})
+            if descending:
+                ordered = [doc for doc in ordered if key(doc) < cursor_key]
+            else:
+                ordered = [doc for doc in ordered if key(doc) > cursor_key]
+
+        page = [_project(doc, projection) for doc in ordered[:page_size + 1]]
+        return _split_page(page, sort_field, page_size)
+
+    def find_recruiter(self, email):
+        return self._find_one("recruiters", lambda d: d.get("email") == email)
+
+    def create_recruiter(self, record):
+        return self._insert("recruiters", record)
+
+    def get_asset(self, name):
+        return self._find_one("assets", lambda d: d.get("name") == name)
+
+    def save_asset(self, name, data):
+        with self._lock:
+            for doc in self._tables["assets"].values():
+                if doc.get("name") == name:
+                    doc["data"] = data
+                    return
+            self._insert("assets", {"name": name, "data": data})
+
+    def question_bank_version(self, job_id):
+        doc = self._latest_bank(job_id)
+        return doc["version"] if doc else None
+
+    def get_question_bank(self, job_id):
+        doc = self._latest_bank(job_id)
+        return copy.deepcopy(doc) if doc else None
+
+    def _latest_bank(self, job_id):
+        banks = self._find("question_banks", lambda d: d.get("job_id") == job_id)
+        return max(banks, key=lambda d: d["version"]) if banks else None
+
+    def save_question_bank(self, job_id, questions, pass_mark):
+        with self._lock:
+            version = (self.question_bank_version(job_id) or 0) + 1
+            self._insert("question_banks", {
+                "job_id": job_id,
+                "version": version,
+                "pass_mark": pass_mark,
+                "questions": questions,
+                "created_at": utcnow(),
+            })
+        return version
+
+    def create_ranking_job(self, record):
+        return self._insert("ranking_jobs", record)
+
+    def get_ranking_job(self, job_id):
+        with self._lock:
+            doc = self._tables["ranking_jobs"].get(job_id)
+            return copy.deepcopy(doc) if doc else None
+
+    def update_ranking_job(self, job_id, **fields):
+        with self._lock:
+            doc = self._tables["ranking_jobs"].get(job_id)
+            if doc is not None:
+                doc.update(updated_at=utcnow(), **fields)
+
+    def list_ranking_jobs(self, recruiter_email, limit=5):
+        jobs = self._find("ranking_jobs", lambda d: d.get("recruiter_email") == recruiter_email)
+        jobs.sort(key=lambda d: (d["created_at"], d["_id"]), reverse=True)
+        return [
+            {k: v for k, v in copy.deepcopy(d).items() if k not in RANKING_JOB_BULKY_FIELDS}
+            for d in jobs[:limit]
+        ]
+
+    def claim_ranking_job(self, job_id, owner):
+        now = utcnow()
+        with self._lock:
+            doc = self._tables["ranking_jobs"].get(job_id)
+            if doc is None or doc.get("status") != "queued" or doc.get("owner") != owner:
+                return None
+            doc.update(status="running", started_at=now, heartbeat_at=now, updated_at=now)
+            return copy.deepcopy(doc)
+
+    def heartbeat_ranking_jobs(self, job_ids, owner):
+        now = utcnow()
+        with self._lock:
+            for job_id in job_ids:
+                doc = self._tables["ranking_jobs"].get(job_id)
+                if doc is not None and doc.get("owner") == owner:
+                    doc["heartbeat_at"] = now
+
+    def take_over_stale_ranking_jobs(self, older_than, owner):
+        now = utcnow()
+        with self._lock:
+            stale = self._find(
+                "ranking_jobs",
+                lambda d: d.get("status") in ("queued", "running")
+                and (d.get("heartbeat_at") is None or d["heartbeat_at"] < older_than)
+            )
+            stale.sort(key=lambda d: (d["created_at"], d["_id"]))
+            for doc in stale:
+                doc.update(status="queued", stage="queued", owner=owner, heartbeat_at=now, updated_at=now)
+            return [copy.deepcopy(d) for d in stale]
+
+    def save_run(self, record):
+        return self._insert("runs", record)
+
+    def get_run(self, ranking_job_id):
+        runs = self._find("runs", lambda d: d.get("ranking_job_id") == ranking_job_id)
+        return copy.deepcopy(max(runs, key=lambda d: (d["created_at"], d["_id"]))) if runs else None
+
+    def _pool(self, recruiter_email, job_id):
+        return self._find(
+            "resume_pool", lambda d: d.get("recruiter_email") == recruiter_email and d.get("job_id") == job_id
+        )
+
+    def pool_hashes(self, recruiter_email, job_id):
+        return {doc["content_hash"] for doc in self._pool(recruiter_email, job_id)}
+
+    def add_to_pool(self, entries):
+        added = 0
+        with self._lock:
+            pooled = {}
+            for entry in entries:
+                key = (entry["recruiter_email"], entry["job_id"])
+                if key not in pooled:
+                    pooled[key] = self.pool_hashes(*key)
+                if entry["content_hash"] not in pooled[key]:
+                    pooled[key].add(entry["content_hash"])
+                    self._insert("resume_pool", entry)
+                    added += 1
+        return added
+
+    def get_pool(self, recruiter_email, job_id, include_text=True):
+        return [
+            {k: v for k, v in copy.deepcopy(doc).items() if include_text or k != "resume_text"}
+            for doc in self._pool(recruiter_email, job_id)
+        ]
+
+    def update_pool_scores(self, updates):
+        with self._lock:
+            for entry_id, fields in updates.items():
+                doc = self._tables["resume_pool"].get(entry_id)
+                if doc is not None:
+                    doc.update(fields)
+
+    def shortlisted_emails(self, recruiter_email, job_id):
+        docs = self._find("candidates", lambda d: d.get("recruiter_email") == recruiter_email and d.get("job_id") == job_id)
+        return {doc["email"] for doc in docs}
+
+    def enqueue_emails(self, messages):
+        queued = 0
+        with self._lock:
+            keys = {d["idempotency_key"] for d in self._tables["email_outbox"].values()}
+            for message in messages:
+                if message["idempotency_key"] not in keys:
+                    self._insert("email_outbox", message)
+                    keys.add(message["idempotency_key"])
+                    queued += 1
+        return queued
+
+    def claim_email(self):
+        now = utcnow()
+        with self._lock:
+            due = self._find(
+                "email_outbox",
+                lambda d: d.get("status") in ("queued", "failed") and d["next_attempt_at"] <= now
+            )
+            if not due:
+                return None
+            doc = min(due, key=lambda d: (d["next_attempt_at"], d["_id"]))
+            doc.update(status="sending", updated_at=now, attempts=doc.get("attempts", 0) + 1)
+            return copy.deepcopy(doc)
+
+    def update_email(self, message_id, status, **fields):
+        with self._lock:
+            doc = self._tables["email_outbox"].get(message_id)
+            if doc is not None:
+                doc.update(status=status, updated_at=utcnow(), **fields)
+
+    def requeue_stale_emails(self, older_than):
+        with self._lock:
+            stale = self._find(
+                "email_outbox",
+                lambda d: d.get("status") == "sending" and d["updated_at"] < older_than
+            )
+            for doc in stale:
+                doc.update(status="queued", updated_at=utcnow())
+        return len(stale)
+
+    def latest_email_status(self, tokens):
+        tokens = set(tokens)
+        latest = {}
+        with self._lock:
+            docs = self._find("email_outbox", lambda d: d.get("candidate_token") in tokens)
+            for doc in sorted(docs, key=lambda d: (d["created_at"], d["_id"]), reverse=True):
+                latest.setdefault(doc["candidate_token"], copy.deepcopy(doc))
+        return latest
+
+    def outbox_counts(self):
+        counts = {}
+        for doc in self._find("email_outbox", lambda d: True):
+            counts[doc["status"]] = counts.get(doc["status"], 0) + 1
+        return counts
+
+    def list_dead_emails(self, limit=50):
+        dead = self._find("email_outbox", lambda d: d.get("status") == "dead")
+        dead.sort(key=lambda d: d["updated_at"], reverse=True)
+        return [{k: v for k, v in copy.deepcopy(d).items() if k != "body"} for d in dead[:limit]]
+
+    def replay_dead_emails(self, message_ids=None):
+        ids = set(message_ids) if message_ids is not None else None
+        now = utcnow()
+        with self._lock:
+            dead = self._find(
+                "email_outbox",
+                lambda d: d.get("status") == "dead" and (ids is None or d["_id"] in ids)
+            )
+            for doc in dead:
+                doc.update(status="queued", attempts=0, next_attempt_at=now, updated_at=now)
+        return len(dead)
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _split_page(docs, sort_field, page_size):
+    if len(docs) <= page_size:
+        return docs, None
+    docs = docs[:page_size]
+    return docs, (docs[-1].get(sort_field), docs[-1]["_id"])
+
+
+def _project(doc, projection=None):
+    """Apply a Mongo-style inclusion projection to a copy of doc"""
+    if not projection:
+        return copy.deepcopy(doc)
+    fields = [k for k, v in projection.items() if v and k != "_id"]
+    out = {k: copy.deepcopy(doc[k]) for k in fields if k in doc}
+    if projection.get("_id", 1):
+        out["_id"] = doc["_id"]
+    return out
+
+
+@lru_cache(maxsize=None)
+def get_repository():
+    """Process-wide repository selected by DB_BACKEND (mongo | memory)"""
+    if DB_BACKEND == "memory":
+        return InMemoryRepository()
+
+    from app.db import get_database
+    return MongoRepository(get_database())
@@ -0,0 +1,139 @@
+import html
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from app.repository import get_repository
+
+# -------------------------
+# Email Template Registry
+# -------------------------
+# Each template lives in app/email_templates/<name>/ as subject.txt,
+# body.txt and body.html with {{ field }} placeholders. Recruiters can
+# override any part through an `email_templates` map on their record.
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "email_templates")
+TEMPLATE_PARTS = {"subject": "subject.txt", "text": "body.txt", "html": "body.html"}
+OVERRIDE_TTL_SECONDS = 60
+
+_FIELD = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+RenderedEmail = namedtuple("RenderedEmail", ["subject", "text", "html"])
+
+
+class CompiledTemplate:
+    """Template pre-split into literal and field segments so rendering is a single join"""
+
+    def __init__(self, source, escape=False):
+        self.source = source
+        self.escape = escape
+        self.segments = []
+        position = 0
+        for match in _FIELD.finditer(source):
+            self.segments.append((False, source[position:match.start()]))
+            self.segments.append((True, match.group(1)))
+            position = match.end()
+        self.segments.append((False, source[position:]))
+        self.fields = {value for is_field, value in self.segments if is_field}
+
+    def render(self, context):
+        if self.escape:
+            return "".join(
+                html.escape(str(context.get(value, ""))) if is_field else value
+                for is_field, value in self.segments
+            )
+        return "".join(
+            str(context.get(value, "")) if is_field else value
+            for is_field, value in self.segments
+        )
+
+
+class TemplateRegistry:
+    def __init__(self, template_dir=TEMPLATE_DIR):
+        self._lock = threading.Lock()
+        self._defaults = {}
+        self._overrides = {}
+        for name in sorted(os.listdir(template_dir)):
+            folder = os.path.join(template_dir, name)
+            if os.path.isdir(folder):
+                self._defaults[name] = self._compile(_read_parts(folder))
+
+    @staticmethod
+    def _compile(parts):
+        return {
+            part: CompiledTemplate(source.strip() if part == "subject" else source, escape=part == "html")
+            for part, source in parts.items()
+        }
+
+    def names(self):
+        return list(self._defaults)
+
+    def _recruiter_templates(self, recruiter_email):
+        """Compiled per-recruiter overrides, refreshed at most every OVERRIDE_TTL_SECONDS"""
+        if not recruiter_email:
+            return {}
+        now = time.monotonic()
+        with self._lock:
+            cached = self._overrides.get(recruiter_email)
+            if cached and now - cached[0] < OVERRIDE_TTL_SECONDS:
+                return cached[1]
+
+        recruiter = get_repository().find_recruiter(recruiter_email) or {}
+        compiled = {
+            name: self._compile(parts)
+            for name, parts in (recruiter.get("email_templates") or {}).items()
+        }
+        with self._lock:
+            self._overrides[recruiter_email] = (now, compiled)
+        return compiled
+
+    def get(self, name, recruiter_email=None):
+        """{part: CompiledTemplate} with recruiter overrides layered over the defaults"""
+        template = dict(self._defaults[name])
+        override = self._recruiter_templates(recruiter_email).get(name, {})
+        if "text" in override and "html" not in override:
+            # A custom plain-text body must not go out next to the stock HTML one
+            template.pop("html", None)
+        template.update(override)
+        return template
+
+    def render(self, name, context, recruiter_email=None):
+        return self.render_batch(name, [context], recruiter_email)[0]
+
+    def render_batch(self, name, contexts, recruiter_email=None):
+        """Render one template for many contexts with a single override lookup"""
+        template = self.get(name, recruiter_email)
+        subject, text, body_html = template["subject"], template["text"], template.get("html")
+        return [
+            RenderedEmail(
+                subject.render(context),
+                text.render(context),
+                body_html.render(context) if body_html else None,
+            )
+            for context in contexts
+        ]
+
+    def invalidate(self, recruiter_email=None):
+        with self._lock:
+            if recruiter_email is None:
+                self._overrides.clear()
+            else:
+                self._overrides.pop(recruiter_email, None)
+
+
+def _read_parts(folder):
+    parts = {}
+    for part, filename in TEMPLATE_PARTS.items():
+        path = os.path.join(folder, filename)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                parts[part] = f.read()
+    return parts
+
+
+@lru_cache(maxsize=None)
+def get_template_registry():
+    """Templates are read and compiled once per process"""
+    return TemplateRegistry()
@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from app.logs import get_logger, log_event
+
+logger = get_logger("workers")
+
+# -------------------------
+# Worker Pool Settings
+# -------------------------
+# One bounded pool per process caps concurrent PDF parsing / LLM calls no
+# matter how many sessions submit work. Beyond the queue limits new work
+# is refused with an estimated wait instead of piling up.
+WORKER_QUEUE_LIMIT = int(os.getenv("WORKER_QUEUE_LIMIT", "20"))
+WORKER_QUEUE_LIMIT_PER_OWNER = int(os.getenv("WORKER_QUEUE_LIMIT_PER_OWNER", "3"))
+# Task duration assumed until real ones have been observed
+DEFAULT_TASK_SECONDS = 30.0
+
+
+class PoolSaturated(Exception):
+    def __init__(self, reason, wait_seconds):
+        super().__init__(f"{reason}; try again in about {round(wait_seconds)}s")
+        self.reason = reason
+        self.wait_seconds = wait_seconds
+
+
+class FairQueue:
+    """Per-owner FIFO queues served round-robin, so one recruiter's burst cannot starve the rest"""
+
+    def __init__(self):
+        self._queues = OrderedDict()
+        self._cond = threading.Condition()
+
+    def put(self, owner, item):
+        with self._cond:
+            self._queues.setdefault(owner, deque()).append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Next item from the owner at the head of the rotation, or None on timeout"""
+        with self._cond:
+            if not self._queues and not self._cond.wait_for(lambda: self._queues, timeout):
+                return None
+            owner, queue = next(iter(self._queues.items()))
+            item = queue.popleft()
+            if queue:
+                self._queues.move_to_end(owner)
+            else:
+                del self._queues[owner]
+            return item
+
+    def position(self, owner, item):
+        """Items that will be served before `item`, given round-robin order"""
+        with self._cond:
+            queue = self._queues.get(owner)
+            if queue is None or item not in queue:
+                return 0
+            index = list(queue).index(item)
+            ahead = index
+            # Before our turn, owners earlier in the rotation get index + 1 turns, later ones index
+            is_earlier = True
+            for other, other_queue in self._queues.items():
+                if other == owner:
+                    is_earlier = False
+                    continue
+                ahead += min(len(other_queue), index + is_earlier)
+            return ahead
+
+    def depth(self, owner=None):
+        with self._cond:
+            if owner is not None:
+                return len(self._queues.get(owner, ()))
+            return sum(len(q) for q in self._queues.values())
+
+    def depths(self):
+        with self._cond:
+            return {owner: len(q) for owner, q in self._queues.items()}
+
+
+class WorkerPool:
+    """
+    Fixed set of daemon threads draining a FairQueue of (key, fn, args).
+    submit() applies admission control; stats() feeds the admin panel.
+    """
+
+    def __init__(self, name, workers, queue_limit=WORKER_QUEUE_LIMIT,
+                 owner_limit=WORKER_QUEUE_LIMIT_PER_OWNER):
+        self.name = name
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.owner_limit = owner_limit
+        self.queue = FairQueue()
+        self._lock = threading.Lock()
+        self._queued = {}
+        self._running = {}
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._busy_seconds = 0.0
+        self._task_seconds = DEFAULT_TASK_SECONDS
+        self._started_at = time.monotonic()
+        self._threads = []
+        self._stopped = threading.Event()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def admit(self, owner):
+        """Raise PoolSaturated if `owner` may not queue more work right now"""
+        if self.queue.depth(owner) >= self.owner_limit:
+            reason = f"You already have {self.owner_limit} runs waiting"
+        elif self.queue.depth() >= self.queue_limit:
+            reason = "The server is at capacity"
+        else:
+            return
+        with self._lock:
+            self._rejected += 1
+        raise PoolSaturated(reason, self.estimated_wait())
+
+    def submit(self, owner, key, fn, *args, admit=True):
+        """Queue fn(*args) under `key`; admit=False skips the limits (e.g. resuming after a restart)"""
+        if admit:
+            self.admit(owner)
+        entry = (key, fn, args)
+        with self._lock:
+            self._queued[key] = entry
+        self.queue.put(owner, entry)
+
+    def queue_position(self, owner, key):
+        with self._lock:
+            entry = self._queued.get(key)
+        return self.queue.position(owner, entry) if entry else 0
+
+    def estimated_wait(self, ahead=None):
+        """Seconds until a newly queued task would start, from the recent mean task duration"""
+        if ahead is None:
+            ahead = self.queue.depth()
+        with self._lock:
+            running, task_seconds = len(self._running), self._task_seconds
+        if running < self.workers and not ahead:
+            return 0.0
+        # With every worker busy the queue drains `workers` tasks per mean task duration
+        return task_seconds * (ahead + 1) / self.workers
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            running = len(self._running)
+            busy = self._busy_seconds + sum(now - started for started in self._running.values())
+            stats = {
+                "workers": self.workers,
+                "running": running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "mean_task_seconds": round(self._task_seconds, 2),
+                "utilization": round(running / self.workers, 3),
+                "lifetime_utilization": round(busy / (self.workers * max(now - self._started_at, 1e-9)), 3),
+            }
+        stats["queued"] = self.queue.depth()
+        stats["queued_by_owner"] = self.queue.depths()
+        stats["estimated_wait_seconds"] = round(self.estimated_wait(), 1)
+        return stats
+
+    def _run(self):
+        while not self._stopped.is_set():
+            entry = self.queue.get(timeout=1.0)
+            if entry is None:
+                continue
+            key, fn, args = entry
+            started = time.monotonic()
+            with self._lock:
+                self._queued.pop(key, None)
+                self._running[key] = started
+            try:
+                fn(*args)
+                failed = False
+            except Exception as e:
+                failed = True
+                log_event(logger, "worker.task_failed", pool=self.name, key=str(key), error=str(e))
+            elapsed = time.monotonic() - started
+            with self._lock:
+                del self._running[key]
+                self._busy_seconds += elapsed
+                self._failed += failed
+                self._completed += not failed
+                # Exponentially weighted so the estimate follows the current workload
+                self._task_seconds = 0.8 * self._task_seconds + 0.2 * elapsed
@@ -0,0 +1,106 @@
+"""
+Email dispatch throughput benchmark against the local SMTP sink.
+
+Drives app.email_service.send_email from N concurrent senders and reports
+messages/s and p50/p95/p99 latency.
+
+    python -m bench.email_throughput --messages 500 --concurrency 8 --pool-size 4 --latency-ms 20
+    python -m bench.email_throughput --fresh-connections   # one session per message (pre-pool behaviour)
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import email_service, metrics
+from bench.smtp_sink import SMTPSink
+
+
+def run(messages=200, concurrency=4, pool_size=4, fresh_connections=False, latency_ms=0.0,
+        auth_failure_rate=0.0, disconnect_rate=0.0, sink_address=None):
+    sink = None
+    if sink_address is None:
+        sink = SMTPSink(
+            latency_ms=latency_ms,
+            auth_failure_rate=auth_failure_rate,
+            disconnect_rate=disconnect_rate,
+        ).start()
+        sink_address = ("127.0.0.1", sink.port)
+
+    email_service.SMTP_POOL_SIZE = pool_size
+    email_service.SMTP_MAX_MESSAGES_PER_CONNECTION = 1 if fresh_connections else 100
+    email_service.configure_smtp(sink_address[0], sink_address[1], "bench@example.com", "secret", security="none")
+
+    metrics.reset("email.")
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+
+    def send(i):
+        started = time.perf_counter()
+        ok, error = email_service.send_email(f"candidate{i}@example.com", f"Benchmark {i}", "Hello " * 50)
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                failures.append(error)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(messages)))
+    wall = time.perf_counter() - started
+
+    email_service.get_smtp_pool().close()
+    ordered = sorted(latencies)
+    phases = email_service.get_email_stats()["histograms"]
+    result = {
+        "messages": messages,
+        "concurrency": concurrency,
+        "pool_size": pool_size,
+        "fresh_connections": fresh_connections,
+        "sink_latency_ms": latency_ms,
+        "wall_seconds": round(wall, 3),
+        "messages_per_second": round(messages / wall, 2) if wall else 0.0,
+        "p50_ms": metrics.percentile(ordered, 50),
+        "p95_ms": metrics.percentile(ordered, 95),
+        "p99_ms": metrics.percentile(ordered, 99),
+        "failures": len(failures),
+        "phase_p50_ms": {
+            name[len("email."):]: summary["p50_ms"]
+            for name, summary in phases.items()
+        },
+    }
+    if sink is not None:
+        result["sink"] = sink.state.stats()
+        sink.stop()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Email dispatch throughput benchmark")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--fresh-connections", action="store_true")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Injected sink latency per DATA/AUTH")
+    parser.add_argument("--auth-failure-rate", type=float, default=0.0)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--sink", default=None, help="host:port of an already running sink")
+    args = parser.parse_args()
+
+    address = None
+    if args.sink:
+        host, port = args.sink.rsplit(":", 1)
+        address = (host, int(port))
+
+    print(json.dumps(run(
+        messages=args.messages,
+        concurrency=args.concurrency,
+        pool_size=args.pool_size,
+        fresh_connections=args.fresh_connections,
+        latency_ms=args.latency_ms,
+        auth_failure_rate=args.auth_failure_rate,
+        disconnect_rate=args.disconnect_rate,
+        sink_address=address,
+    ), indent=2))
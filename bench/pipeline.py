@@ -0,0 +1,224 @@
+"""
+End-to-end pipeline benchmark with local stand-ins.
+
+Generates synthetic PDF resumes, then times each stage of a recruiter run:
+PDF extraction, email extraction, ranking (against a stub LLM), selection,
+storage (in-memory repository, or a local Mongo via MONGO_URI) and email
+dispatch (against the local SMTP sink). Reports per-stage throughput and
+latency percentiles, saves them as JSON and, given a baseline, exits
+non-zero when any stage regressed past the threshold. With --roles K it
+also compares K separate rankings with one multi-role run of the same pool.
+
+    python -m bench.pipeline --resumes 50 --pages 2
+    python -m bench.pipeline --roles 6
+    python -m bench.pipeline --baseline bench/results/baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from app import email_service, metrics, repository
+from app.backend_layer import (
+    build_score_matrix,
+    extract_email_from_resume,
+    extract_text_from_pdf,
+    process_uploaded_resumes,
+    select_top_candidates,
+    select_top_candidates_per_role,
+    store_shortlisted_candidates,
+)
+from app.llm_layer import format_candidates, rank_resumes, role_batches, score_resumes_for_roles
+from bench.smtp_sink import SMTPSink
+from bench.stub_llm import StubLLM
+from bench.synthetic import generate_resumes
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+JOB_DESCRIPTION = "Senior Backend Engineer with Python, MongoDB, Kafka and Kubernetes experience."
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {}
+        self.items = {}
+
+    def time(self, stage, fn, *args, items=1, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.samples.setdefault(stage, []).append((time.perf_counter() - started) * 1000)
+        self.items[stage] = self.items.get(stage, 0) + items
+        return result
+
+    def report(self):
+        stages = {}
+        for stage, samples in self.samples.items():
+            ordered = sorted(samples)
+            total_s = sum(samples) / 1000
+            stages[stage] = {
+                "calls": len(samples),
+                "items": self.items[stage],
+                "total_s": round(total_s, 4),
+                "items_per_s": round(self.items[stage] / total_s, 2) if total_s else 0.0,
+                "p50_ms": metrics.percentile(ordered, 50),
+                "p95_ms": metrics.percentile(ordered, 95),
+                "p99_ms": metrics.percentile(ordered, 99),
+                "max_ms": round(ordered[-1], 3),
+            }
+        return stages
+
+
+def run(resumes=50, pages=1, top=10, iterations=5, llm_latency_ms=0.0, smtp_latency_ms=0.0,
+        backend="memory", seed=42, roles=1):
+    if backend == "memory":
+        repository.DB_BACKEND = "memory"
+        repository.get_repository.cache_clear()
+    repository.get_repository().ensure_indexes()
+
+    timer = StageTimer()
+    llm = StubLLM(latency_ms=llm_latency_ms)
+    sink = SMTPSink(latency_ms=smtp_latency_ms).start()
+    email_service.configure_smtp("127.0.0.1", sink.port, "bench@example.com", "secret", security="none")
+
+    with tempfile.TemporaryDirectory(prefix="bench-resumes-") as workdir:
+        generated = generate_resumes(workdir, count=resumes, pages=pages, seed=seed)
+
+        texts = [timer.time("extract_pdf", extract_text_from_pdf, path, items=pages) for path, _ in generated]
+        found = [timer.time("extract_email", extract_email_from_resume, text) for text in texts]
+        missed = sum(1 for (_, expected), got in zip(generated, found) if got != expected)
+        processed = process_uploaded_resumes(texts)
+
+        for i in range(iterations):
+            ai_output = timer.time("rank", rank_resumes, JOB_DESCRIPTION, processed, items=len(processed), llm=llm)
+            shortlisted = timer.time("select", select_top_candidates, ai_output, top, items=len(processed))
+            stored = timer.time(
+                "store", store_shortlisted_candidates, shortlisted, f"bench-{i}@example.com", items=len(shortlisted)
+            )
+            for candidate in stored:
+                ok, error = timer.time(
+                    "dispatch", email_service.send_email, candidate["email"], "Benchmark invite", "Hello " * 80
+                )
+                if not ok:
+                    raise RuntimeError(f"Dispatch failed against the local sink: {error}")
+
+        multi_role = compare_multi_role(timer, processed, roles, top, iterations, llm_latency_ms) if roles > 1 else None
+
+    email_service.get_smtp_pool().close()
+    sink.stop()
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "resumes": resumes,
+            "pages": pages,
+            "top": top,
+            "iterations": iterations,
+            "llm_latency_ms": llm_latency_ms,
+            "smtp_latency_ms": smtp_latency_ms,
+            "backend": backend,
+            "email_misses": missed,
+            "prompt_chars_per_call": llm.prompt_chars // max(llm.calls, 1),
+            "multi_role": multi_role,
+        },
+        "stages": timer.report(),
+    }
+
+
+def compare_multi_role(timer, processed, roles, top, iterations, llm_latency_ms):
+    """Time K separate rankings against one shared multi-role run; returns LLM calls and prompt size of each"""
+    specs = [
+        {"title": f"Role {i}", "job_description": f"{JOB_DESCRIPTION} Team {i}.", "min_candidates": top}
+        for i in range(1, roles + 1)
+    ]
+    separate, shared = StubLLM(latency_ms=llm_latency_ms), StubLLM(latency_ms=llm_latency_ms)
+
+    def run_separate():
+        return [
+            select_top_candidates(rank_resumes(spec["job_description"], processed, llm=separate), top)
+            for spec in specs
+        ]
+
+    def run_shared():
+        formatted = format_candidates(processed)
+        batches = role_batches(specs)
+        outputs = [score_resumes_for_roles(batch, formatted, llm=shared) for batch in batches]
+        return select_top_candidates_per_role(build_score_matrix(outputs, batches), specs)
+
+    for _ in range(iterations):
+        timer.time("rank_roles_separate", run_separate, items=roles)
+        timer.time("rank_roles_shared", run_shared, items=roles)
+    return {
+        "roles": roles,
+        "separate": {"llm_calls": separate.calls // iterations, "prompt_chars": separate.prompt_chars // iterations},
+        "shared": {"llm_calls": shared.calls // iterations, "prompt_chars": shared.prompt_chars // iterations},
+    }
+
+
+def compare(result, baseline, threshold):
+    """Stages whose p50 latency or throughput is worse than baseline by more than `threshold`"""
+    regressions = []
+    for stage, current in result["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        if previous["p50_ms"] and current["p50_ms"] > previous["p50_ms"] * (1 + threshold):
+            regressions.append(f"{stage}: p50 {previous['p50_ms']}ms -> {current['p50_ms']}ms")
+        if previous["items_per_s"] and current["items_per_s"] < previous["items_per_s"] * (1 - threshold):
+            regressions.append(f"{stage}: {previous['items_per_s']}/s -> {current['items_per_s']}/s")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end recruiter pipeline benchmark")
+    parser.add_argument("--resumes", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=5, help="Rank/select/store/dispatch repetitions")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--smtp-latency-ms", type=float, default=0.0)
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--roles", type=int, default=1, help="Also compare K separate vs one multi-role ranking")
+    parser.add_argument("--output", default=None, help="Results file (default bench/results/pipeline-<time>.json)")
+    parser.add_argument("--baseline", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression, as a fraction")
+    args = parser.parse_args()
+
+    result = run(
+        resumes=args.resumes,
+        pages=args.pages,
+        top=args.top,
+        iterations=args.iterations,
+        llm_latency_ms=args.llm_latency_ms,
+        smtp_latency_ms=args.smtp_latency_ms,
+        backend=args.backend,
+        roles=args.roles,
+    )
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+    print(f"💾 Saved {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"✅ No stage regressed beyond {args.threshold:.0%}")
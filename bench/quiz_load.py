@@ -0,0 +1,364 @@
+"""
+Load test for the candidate quiz portal (the ?token= route).
+
+Starts one app instance (`streamlit run ui/streamlit_app.py`) in a child
+process with N seeded shortlisted candidates, the in-memory repository and
+the local SMTP sink, then drives every candidate through open -> login ->
+answer & submit over Streamlit's websocket protocol, `concurrency` sessions
+at a time, the way browsers would. Reports sessions/s, per-step latency
+percentiles, offer delivery and the server process's CPU and memory.
+
+    python -m bench.quiz_load --candidates 200 --concurrency 20 --pass-rate 0.5
+
+The client speaks the websocket protocol of current Streamlit releases
+(radio values are sent as option labels).
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from app import metrics
+from bench.smtp_sink import SMTPSink
+from bench.synthetic import FIRST_NAMES, LAST_NAMES
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(PROJECT_ROOT, "ui", "streamlit_app.py")
+STEPS = ("open", "login", "submit", "session")
+SERVER_START_TIMEOUT = 60
+
+
+# -------------------------
+# Server side (child process)
+# -------------------------
+def seed_candidates(count, seed):
+    """Shortlisted candidates with credentials, as a recruiter run would store them"""
+    from app.backend_layer import store_shortlisted_candidates
+
+    rng = random.Random(seed)
+    shortlisted = []
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        shortlisted.append({
+            "candidate": f"{first} {last}",
+            "email": f"{first}.{last}{i}@example.com".lower(),
+            "score": rng.randint(60, 99),
+        })
+    return store_shortlisted_candidates(shortlisted, "loadtest-recruiter@example.com")
+
+
+def serve(port, candidates, seed, seed_file):
+    """Seed this process's repository, write the credentials and answer key to seed_file, then run the app"""
+    from streamlit.web import cli
+
+    from app.questions import get_question_bank
+
+    seeded = seed_candidates(candidates, seed)
+    bank = get_question_bank(None)
+    answers = {
+        question["id"]: question["options"][correct]
+        for question, correct in zip(bank.questions, bank.answer_key)
+    }
+    with open(seed_file + ".tmp", "w") as f:
+        json.dump({
+            "candidates": [{k: c[k] for k in ("quiz_token", "email", "password")} for c in seeded],
+            "answers": answers,
+        }, f)
+    os.replace(seed_file + ".tmp", seed_file)
+
+    sys.argv = [
+        "streamlit", "run", APP_PATH,
+        "--server.port", str(port),
+        "--server.headless", "true",
+        "--server.fileWatcherType", "none",
+        "--browser.gatherUsageStats", "false",
+    ]
+    sys.exit(cli.main())
+
+
+# -------------------------
+# Client side
+# -------------------------
+class QuizSession:
+    """One browser tab: a websocket to the app that reruns the script with widget values"""
+
+    def __init__(self, base_url, query_string, timeout):
+        from websockets.sync.client import connect
+
+        self.query_string = query_string
+        self.timeout = timeout
+        self._connect = connect(base_url.replace("http", "ws", 1) + "/_stcore/stream", max_size=None,
+                                open_timeout=timeout)
+
+    def __enter__(self):
+        self.ws = self._connect.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._connect.__exit__(*exc_info)
+
+    def rerun(self, widgets=()):
+        """Send one rerun and return (type, element) for everything the final run rendered"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = self.query_string
+        message.rerun_script.widget_states.widgets.extend(widgets)
+        self.ws.send(message.SerializeToString())
+
+        elements = []
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self.ws.recv(timeout=self.timeout))
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                # st.rerun() on the server starts a fresh run; only the last one counts
+                elements = []
+            elif kind == "page_info_changed":
+                self.query_string = forward.page_info_changed.query_string
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type == "exception":
+                    raise RuntimeError(getattr(element, element_type).message)
+                elements.append((element_type, getattr(element, element_type)))
+            elif kind == "script_finished":
+                status = forward.script_finished
+                if status == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("app script failed to compile")
+                if status != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    return elements
+
+
+def _widget(elements, element_type, label):
+    for kind, element in elements:
+        if kind == element_type and element.label == label:
+            return element
+    raise RuntimeError(f"no {element_type} labelled {label!r} was rendered")
+
+
+def _markdown_contains(elements, text):
+    return any(kind == "markdown" and text in element.body for kind, element in elements)
+
+
+def candidate_session(base_url, candidate, answers, passes, timeout):
+    """One candidate's open -> login -> submit; returns ({step: ms}, error or None)"""
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+    timings = {}
+
+    def timed(name, action):
+        started = time.perf_counter()
+        result = action()
+        timings[name] = (time.perf_counter() - started) * 1000
+        return result
+
+    try:
+        started = time.perf_counter()
+        with QuizSession(base_url, f"token={candidate['quiz_token']}", timeout) as session:
+            elements = session.rerun()
+            timings["open"] = (time.perf_counter() - started) * 1000
+
+            elements = timed("login", lambda: session.rerun([
+                WidgetState(id=_widget(elements, "text_input", "Email Profile").id, string_value=candidate["email"]),
+                WidgetState(id=_widget(elements, "text_input", "Secure Access Key").id,
+                            string_value=candidate["password"]),
+                WidgetState(id=_widget(elements, "button", "Enter Dashboard").id, trigger_value=True),
+            ]))
+
+            radios = [element for kind, element in elements if kind == "radio"]
+            if not radios:
+                raise RuntimeError("login: quiz was not rendered")
+            chosen = []
+            for radio in radios:
+                # Widget ids end in the user key, here "q_<question id>"
+                correct = answers[radio.id.split("-", 2)[2][len("q_"):]]
+                wrong = next(option for option in radio.options if option != correct)
+                chosen.append(WidgetState(id=radio.id, string_value=correct if passes else wrong))
+            submit = _widget(elements, "button", "Complete & Submit Assessment")
+
+            elements = timed("submit", lambda: session.rerun(
+                chosen + [WidgetState(id=submit.id, trigger_value=True)]
+            ))
+            if not _markdown_contains(elements, "Assessment Results"):
+                raise RuntimeError("submit: result screen was not rendered")
+    except Exception as e:
+        return timings, f"{type(e).__name__}: {e}"
+    timings["session"] = sum(timings.values())
+    return timings, None
+
+
+# -------------------------
+# Server process accounting (Linux /proc)
+# -------------------------
+def process_usage(pid):
+    """CPU seconds, current and peak RSS (MiB) and thread count of a process, or {} without /proc"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return {}
+    ticks = os.sysconf("SC_CLK_TCK")
+    return {
+        # utime and stime are fields 14 and 15 of /proc/<pid>/stat
+        "cpu_seconds": (int(fields[11]) + int(fields[12])) / ticks,
+        "rss_mib": round(int(status["VmRSS"].split()[0]) / 1024, 1),
+        "peak_rss_mib": round(int(status["VmHWM"].split()[0]) / 1024, 1),
+        "threads": int(status["Threads"]),
+    }
+
+
+def wait_for_server(base_url, seed_file, server):
+    started = time.monotonic()
+    while time.monotonic() - started < SERVER_START_TIMEOUT:
+        if server.poll() is not None:
+            raise RuntimeError(f"App server exited with code {server.returncode}")
+        if os.path.exists(seed_file):
+            try:
+                with urllib.request.urlopen(f"{base_url}/_stcore/health", timeout=2) as response:
+                    if response.status == 200:
+                        return
+            except OSError:
+                pass
+        time.sleep(0.25)
+    raise RuntimeError(f"App server did not become healthy within {SERVER_START_TIMEOUT}s")
+
+
+def run(candidates=100, concurrency=10, pass_rate=0.5, smtp_latency_ms=0.0, port=8599, timeout=60, seed=7):
+    sink = SMTPSink(latency_ms=smtp_latency_ms).start()
+    workdir = tempfile.mkdtemp(prefix="quiz-load-")
+    seed_file = os.path.join(workdir, "seed.json")
+    env = dict(
+        os.environ,
+        DB_BACKEND=os.getenv("DB_BACKEND", "memory"),
+        SMTP_SERVER="127.0.0.1",
+        SMTP_PORT=str(sink.port),
+        SMTP_EMAIL="loadtest@example.com",
+        SMTP_PASSWORD="secret",
+        SMTP_SECURITY="none",
+        # The sink is local; the provider rate limit would only measure itself
+        OUTBOX_RATE_PER_MINUTE="1000000",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "bench.quiz_load", "serve", "--port", str(port),
+         "--candidates", str(candidates), "--seed", str(seed), "--seed-file", seed_file],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for_server(base_url, seed_file, server)
+        with open(seed_file) as f:
+            seeded = json.load(f)
+        rng = random.Random(seed)
+        passes = [rng.random() < pass_rate for _ in seeded["candidates"]]
+
+        # Untimed warm-up: the first run imports the app and compiles the script
+        with QuizSession(base_url, "token=warm-up", timeout) as warm_up:
+            warm_up.rerun()
+
+        samples = {name: [] for name in STEPS}
+        errors = []
+        lock = threading.Lock()
+
+        def simulate(i):
+            timings, error = candidate_session(base_url, seeded["candidates"][i], seeded["answers"], passes[i], timeout)
+            with lock:
+                for name, elapsed in timings.items():
+                    samples[name].append(elapsed)
+                if error:
+                    errors.append(error)
+
+        before = process_usage(server.pid)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(simulate, range(len(seeded["candidates"]))))
+        wall = time.perf_counter() - started
+        after = process_usage(server.pid)
+
+        # Offers are sent by the server's outbox workers after the submit returns
+        expected_offers = sum(passes)
+        drain_started = time.perf_counter()
+        while len(sink.state.messages) < expected_offers and time.perf_counter() - drain_started < timeout:
+            time.sleep(0.05)
+        drain = time.perf_counter() - drain_started
+        delivered = len(sink.state.messages)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        sink.stop()
+
+    completed = len(samples["session"])
+    cpu_seconds = after["cpu_seconds"] - before["cpu_seconds"] if before and after else None
+    return {
+        "candidates": candidates,
+        "concurrency": concurrency,
+        "pass_rate": pass_rate,
+        "smtp_latency_ms": smtp_latency_ms,
+        "wall_seconds": round(wall, 3),
+        "sessions_completed": completed,
+        "sessions_per_second": round(completed / wall, 2) if wall else 0.0,
+        "failures": len(errors),
+        "sample_errors": errors[:5],
+        "steps": {
+            name: {
+                "p50_ms": metrics.percentile(sorted(values), 50),
+                "p95_ms": metrics.percentile(sorted(values), 95),
+                "p99_ms": metrics.percentile(sorted(values), 99),
+                "max_ms": round(max(values), 3) if values else 0.0,
+            }
+            for name, values in samples.items()
+        },
+        "offers": {
+            "expected": expected_offers,
+            "delivered": delivered,
+            "drain_seconds_after_last_submit": round(drain, 3),
+        },
+        "server": {
+            "cpu_seconds": round(cpu_seconds, 3) if cpu_seconds is not None else None,
+            "cpu_cores_busy": round(cpu_seconds / wall, 2) if cpu_seconds is not None and wall else None,
+            "rss_mib_before": before.get("rss_mib"),
+            "rss_mib_after": after.get("rss_mib"),
+            "peak_rss_mib": after.get("peak_rss_mib"),
+            "threads_after": after.get("threads"),
+        },
+    }
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["serve"]:
+        parser = argparse.ArgumentParser(description="App instance seeded for the quiz load test")
+        parser.add_argument("serve")
+        parser.add_argument("--port", type=int, required=True)
+        parser.add_argument("--candidates", type=int, required=True)
+        parser.add_argument("--seed", type=int, default=7)
+        parser.add_argument("--seed-file", required=True)
+        args = parser.parse_args()
+        serve(args.port, args.candidates, args.seed, args.seed_file)
+
+    parser = argparse.ArgumentParser(description="Candidate quiz portal load test")
+    parser.add_argument("--candidates", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10, help="Candidate sessions in flight at once")
+    parser.add_argument("--pass-rate", type=float, default=0.5, help="Share of candidates answering correctly")
+    parser.add_argument("--smtp-latency-ms", type=float, default=0.0, help="Injected sink latency per DATA/AUTH")
+    parser.add_argument("--port", type=int, default=8599, help="Port for the app instance under test")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-step and offer delivery timeout (s)")
+    args = parser.parse_args()
+
+    print(json.dumps(run(
+        candidates=args.candidates,
+        concurrency=args.concurrency,
+        pass_rate=args.pass_rate,
+        smtp_latency_ms=args.smtp_latency_ms,
+        port=args.port,
+        timeout=args.timeout,
+    ), indent=2))
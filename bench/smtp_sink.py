@@ -0,0 +1,194 @@
+"""
+Local SMTP stand-in for benchmarks and load tests.
+
+Accepts and records messages over plain SMTP (no TLS), with optional
+injected latency, authentication failures and dropped connections.
+
+    python -m bench.smtp_sink --port 2525 --latency-ms 40 --disconnect-rate 0.02
+"""
+import argparse
+import base64
+import random
+import socketserver
+import threading
+import time
+
+
+class SinkState:
+    def __init__(self, latency_ms=0.0, auth_failure_rate=0.0, disconnect_rate=0.0,
+                 max_messages_per_connection=None):
+        self.latency_ms = latency_ms
+        self.auth_failure_rate = auth_failure_rate
+        self.disconnect_rate = disconnect_rate
+        self.max_messages_per_connection = max_messages_per_connection
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self.auth_failures = 0
+        self.disconnects = 0
+        self.lock = threading.Lock()
+
+    def record(self, mail_from, rcpt_to, data):
+        with self.lock:
+            self.messages.append({
+                "from": mail_from,
+                "to": list(rcpt_to),
+                "data": data,
+                "received_at": time.time(),
+            })
+
+    def stats(self):
+        with self.lock:
+            return {
+                "messages": len(self.messages),
+                "connections": self.connections,
+                "logins": self.logins,
+                "auth_failures": self.auth_failures,
+                "disconnects": self.disconnects,
+            }
+
+
+class _Disconnect(Exception):
+    pass
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.state = self.server.state
+        with self.state.lock:
+            self.state.connections += 1
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+        self.wfile.flush()
+
+    def readline(self):
+        line = self.rfile.readline()
+        if not line:
+            raise _Disconnect()
+        return line.decode("utf-8", "replace").rstrip("\r\n")
+
+    def pause(self):
+        if self.state.latency_ms:
+            time.sleep(self.state.latency_ms / 1000)
+
+    def handle(self):
+        mail_from, rcpt_to, sent = None, [], 0
+        self.reply("220 smtp-sink ready")
+        try:
+            while True:
+                line = self.readline()
+                verb = line.split(" ", 1)[0].upper()
+                arg = line[len(verb):].strip()
+
+                if verb in ("EHLO", "HELO"):
+                    self.wfile.write(b"250-smtp-sink\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+                    self.wfile.flush()
+                elif verb == "AUTH":
+                    self.auth(arg)
+                elif verb == "MAIL":
+                    mail_from, rcpt_to = arg.split(":", 1)[1].strip(" <>"), []
+                    self.reply("250 OK")
+                elif verb == "RCPT":
+                    rcpt_to.append(arg.split(":", 1)[1].strip(" <>"))
+                    self.reply("250 OK")
+                elif verb == "DATA":
+                    self.reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while True:
+                        data_line = self.readline()
+                        if data_line == ".":
+                            break
+                        lines.append(data_line[1:] if data_line.startswith("..") else data_line)
+                    self.pause()
+                    if random.random() < self.state.disconnect_rate:
+                        with self.state.lock:
+                            self.state.disconnects += 1
+                        return
+                    self.state.record(mail_from, rcpt_to, "\r\n".join(lines))
+                    sent += 1
+                    self.reply("250 OK queued")
+                    limit = self.state.max_messages_per_connection
+                    if limit and sent >= limit:
+                        self.reply("421 Too many messages on this connection")
+                        return
+                elif verb == "RSET":
+                    mail_from, rcpt_to = None, []
+                    self.reply("250 OK")
+                elif verb == "NOOP":
+                    self.reply("250 OK")
+                elif verb == "QUIT":
+                    self.reply("221 Bye")
+                    return
+                else:
+                    self.reply("502 Command not implemented")
+        except (_Disconnect, ConnectionError):
+            return
+
+    def auth(self, arg):
+        mechanism = arg.split(" ", 1)[0].upper()
+        if mechanism == "PLAIN" and " " not in arg:
+            self.reply("334 ")
+            self.readline()
+        elif mechanism == "LOGIN":
+            self.reply("334 " + base64.b64encode(b"Username:").decode())
+            self.readline()
+            self.reply("334 " + base64.b64encode(b"Password:").decode())
+            self.readline()
+        self.pause()
+        if random.random() < self.state.auth_failure_rate:
+            with self.state.lock:
+                self.state.auth_failures += 1
+            self.reply("535 Authentication credentials invalid")
+            return
+        with self.state.lock:
+            self.state.logins += 1
+        self.reply("235 Authentication successful")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, **options):
+        super().__init__((host, port), SMTPSinkHandler)
+        self.state = SinkState(**options)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name="smtp-sink", daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SMTP sink")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--auth-failure-rate", type=float, default=0.0)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--max-messages-per-connection", type=int, default=None)
+    args = parser.parse_args()
+
+    sink = SMTPSink(
+        args.host,
+        args.port,
+        latency_ms=args.latency_ms,
+        auth_failure_rate=args.auth_failure_rate,
+        disconnect_rate=args.disconnect_rate,
+        max_messages_per_connection=args.max_messages_per_connection,
+    )
+    print(f"📭 SMTP sink listening on {args.host}:{sink.port} (SMTP_SECURITY=none)")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        print(sink.state.stats())
@@ -0,0 +1,49 @@
+"""
+Stand-in for the Groq chat model in benchmarks and load tests.
+
+Answers the ranking prompts from app.llm_layer (rank_resumes and, for
+multi-role runs, score_resumes_for_roles) with a valid JSON array for the
+candidates they contain, with deterministic scores and optional injected
+latency.
+"""
+import hashlib
+import json
+import re
+import time
+from types import SimpleNamespace
+
+_CANDIDATE = re.compile(r"^Candidate (\d+):\nEmail: (.*)$", re.MULTILINE)
+_ROLE = re.compile(r"^Role (R\d+) \(", re.MULTILINE)
+
+
+def _score(*parts):
+    return 40 + hashlib.sha256("|".join(parts).encode()).digest()[0] % 60
+
+
+class StubLLM:
+    def __init__(self, latency_ms=0.0):
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        roles = _ROLE.findall(prompt)
+        ranked = []
+        for number, email in _CANDIDATE.findall(prompt):
+            email = email.strip()
+            entry = {
+                "candidate": email.split("@")[0].replace(".", " ").title() if "@" in email else f"Candidate {number}",
+                "email": email,
+            }
+            if roles:
+                entry["scores"] = {key: _score(email, key) for key in roles}
+            else:
+                entry.update(score=_score(email), reason="Synthetic benchmark score")
+            ranked.append(entry)
+        if not roles:
+            ranked.sort(key=lambda c: c["score"], reverse=True)
+        return SimpleNamespace(content=json.dumps(ranked))
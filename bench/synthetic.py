@@ -0,0 +1,134 @@
+"""
+Synthetic PDF resumes for benchmarks and load tests.
+
+Writes small, valid text PDFs (Helvetica, one content stream per page)
+without any PDF library, so generation cost stays out of the measurements.
+
+    python -m bench.synthetic --count 50 --pages 2 --out /tmp/resumes
+"""
+import argparse
+import os
+import random
+
+FIRST_NAMES = ["Aarav", "Maya", "Liam", "Sofia", "Noah", "Priya", "Ethan", "Zara", "Lucas", "Amara", "Kenji", "Elena"]
+LAST_NAMES = ["Sharma", "Okafor", "Nguyen", "Garcia", "Muller", "Kowalski", "Haddad", "Silva", "Tanaka", "Brown"]
+SKILLS = [
+    "Python", "FastAPI", "Django", "MongoDB", "PostgreSQL", "Redis", "Kafka", "Docker", "Kubernetes",
+    "AWS", "GCP", "Terraform", "React", "TypeScript", "Go", "Rust", "Spark", "Airflow", "PyTorch",
+    "LangChain", "CI/CD", "GraphQL", "gRPC", "Linux", "Pandas", "NumPy", "scikit-learn",
+]
+VERBS = ["Built", "Designed", "Led", "Scaled", "Migrated", "Optimized", "Shipped", "Automated", "Maintained"]
+OBJECTS = [
+    "a payments API", "the data ingestion pipeline", "an internal search service", "real-time dashboards",
+    "the recommendation engine", "a multi-tenant SaaS backend", "ETL jobs", "the mobile checkout flow",
+]
+OUTCOMES = [
+    "cutting p95 latency by 40%", "serving 2M requests per day", "reducing cloud spend by 25%",
+    "with 99.95% uptime", "for 30 enterprise customers", "ahead of schedule", "across 4 regions",
+]
+
+LINE_CHARS = 95
+LINES_PER_PAGE = 58
+
+
+def resume_lines(rng, name, email, words):
+    """Plain-text resume of roughly `words` words"""
+    skills = rng.sample(SKILLS, 8)
+    lines = [
+        name,
+        f"Email: {email} | Phone: +1 555 {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+        "",
+        "SUMMARY",
+        f"Software engineer with {rng.randint(1, 15)} years of experience in {', '.join(skills[:3])}.",
+        "",
+        "SKILLS",
+        ", ".join(skills),
+        "",
+        "EXPERIENCE",
+    ]
+    count = sum(len(line.split()) for line in lines)
+    while count < words:
+        sentence = (f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} using {rng.choice(skills)} "
+                    f"and {rng.choice(skills)}, {rng.choice(OUTCOMES)}.")
+        lines.extend(_wrap(sentence))
+        count += len(sentence.split())
+    return lines
+
+
+def _wrap(text, width=LINE_CHARS):
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    lines.append(current)
+    return lines
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages):
+    """PDF bytes for a list of pages, each a list of text lines"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_refs = []
+    for lines in pages:
+        text = "".join(f"({_escape(line)}) Tj T*\n" for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 750 Td\n{text}ET".encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects))
+        )
+        page_refs.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(page_refs), len(page_refs))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def generate_resumes(out_dir, count=20, pages=1, seed=42):
+    """
+    Write `count` resumes of `pages` pages each into out_dir.
+    Returns [(path, email)] so callers can check email extraction.
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    words = pages * LINES_PER_PAGE * LINE_CHARS // 7
+    resumes = []
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        email = f"{first}.{last}{i}@example.com".lower()
+        lines = resume_lines(rng, f"{first} {last}", email, words)
+        chunks = [lines[start:start + LINES_PER_PAGE] for start in range(0, len(lines), LINES_PER_PAGE)]
+        path = os.path.join(out_dir, f"resume_{i:04d}.pdf")
+        with open(path, "wb") as f:
+            f.write(build_pdf(chunks[:pages] or [[]]))
+        resumes.append((path, email))
+    return resumes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic PDF resumes")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="bench_resumes")
+    args = parser.parse_args()
+    generated = generate_resumes(args.out, args.count, args.pages, args.seed)
+    print(f"📄 Wrote {len(generated)} resumes to {args.out}")
@@ -13,8 +13,9 @@ if PROJECT_ROOT not in sys.path:
 
 # ---------- STANDARD IMPORTS ----------
 import streamlit as st
-import pdfplumber
-import copy
+import streamlit.components.v1 as components
+import json
+import html
 
 # ---------- PROJECT IMPORTS ----------
 import app.llm_layer
@@ -23,44 +24,255 @@ import importlib
 importlib.reload(app.llm_layer)
 importlib.reload(app.backend_layer)
 
-from app.llm_layer import rank_resumes
 from app.backend_layer import (
-    process_uploaded_resumes,
-    select_top_candidates,
-    store_shortlisted_candidates
+    save_uploaded_files,
+    get_candidate_by_token,
+    get_candidate_credentials,
+    record_quiz_result,
+    list_selected_candidates,
+    list_shortlisted_candidates,
+    get_recruiter,
+    register_recruiter
 )
-from app.frontend_layer import show_second_round_email, generate_offer_letter
-from app.email_service import send_email
-from app.db import candidates_collection, assets_collection, recruiters_collection
-import base64
+from app.frontend_layer import render_second_round_emails, render_offer_letter, candidate_views, compact_records
+from app.email_service import get_email_stats
+from app.metrics import deep_sizeof, record_session_size, session_size_summary
+from app.outbox import (
+    enqueue_email,
+    enqueue_shortlist_invites,
+    get_email_statuses,
+    get_outbox_counts,
+    get_dead_emails,
+    get_outbox,
+    replay_dead_emails
+)
+from app.db import get_db_stats, ping
+from app.repository import get_repository, DB_BACKEND, CANDIDATE_STATUSES
+from app.assets import export_assets, asset_urls
+from app.questions import get_question_bank
+from app.jobs import (
+    MAX_ROLES_PER_RUN,
+    get_ranking_job,
+    get_ranking_runner,
+    get_run_timings,
+    latest_ranking_job,
+    normalize_roles
+)
+from app.workers import PoolSaturated
+from app.auth import hash_password, issue_session_token, verify_session_token
 import hashlib
+import secrets
+import time
+
+# Assets missing from the DB (or a failed export) are retried this often
+ASSET_EXPORT_TTL_SECONDS = 300
+
+@st.cache_resource(show_spinner=False, ttl=ASSET_EXPORT_TTL_SECONDS)
+def get_asset_urls():
+    """
+    Export DB images to hashed static files and return their URLs, at most once
+    per ASSET_EXPORT_TTL_SECONDS per process. Once every asset is on disk a
+    refresh only checks the files; missing ones are looked up in the DB again.
+    """
+    return asset_urls(export_assets())
+
+@st.cache_resource(show_spinner=False)
+def ranking_runner():
+    """Ranking worker pool shared by every session in this server process"""
+    return get_ranking_runner()
+
+@st.cache_resource(show_spinner=False)
+def init_database():
+    """Create indexes once per server process"""
+    get_repository().ensure_indexes()
+
+@st.cache_resource(show_spinner=False)
+def outbox_workers():
+    """Email outbox workers, started with the server process so pending mail drains after a restart"""
+    return get_outbox()
+
+@st.cache_resource(show_spinner=False)
+def load_theme():
+    """Theme stylesheet read once per process; its content hash is the version"""
+    with open(THEME_CSS_PATH, encoding="utf-8") as f:
+        css = f.read()
+    return hashlib.sha256(css.encode()).hexdigest()[:12], css
+
+def inject_theme():
+    """
+    Add the stylesheet to the page <head> once per session instead of pushing
+    it through st.markdown on every rerun. The <style> tag lives outside
+    Streamlit's element tree, so it survives reruns; later reruns send nothing.
+    A run cut short by rerun() drops the component before the browser runs it,
+    so the injection only counts once the next run starts without that happening.
+    """
+    version, css = load_theme()
+    if st.session_state.get("theme_version") == version:
+        return
+    if st.session_state.get("theme_pending") == version:
+        st.session_state["theme_version"] = version
+        return
+    st.session_state["theme_pending"] = version
+    components.html(f"""<script>
+(function () {{
+    const doc = window.parent.document;
+    const id = "ai-recruiter-theme-{version}";
+    if (doc.getElementById(id)) return;
+    doc.querySelectorAll("style[data-ai-recruiter-theme]").forEach((el) => el.remove());
+    if (!doc.getElementById("ai-recruiter-fonts")) {{
+        const fonts = doc.createElement("link");
+        fonts.id = "ai-recruiter-fonts";
+        fonts.rel = "stylesheet";
+        fonts.href = {json.dumps(GOOGLE_FONTS_URL)};
+        doc.head.appendChild(fonts);
+    }}
+    const style = doc.createElement("style");
+    style.id = id;
+    style.dataset.aiRecruiterTheme = "{version}";
+    style.textContent = {json.dumps(css)};
+    doc.head.appendChild(style);
+}})();
+</script>""", height=0)
+
+def rerun():
+    """st.rerun() for the whole app; a theme injected earlier in this run is re-sent next run"""
+    st.session_state.pop("theme_pending", None)
+    st.rerun()
 
-@st.cache_data(show_spinner=False)
-def get_image_from_db(image_name):
-    """Fetch image binary from MongoDB and return base64 string"""
-    asset = assets_collection.find_one({"name": image_name})
-    if asset:
-        return base64.b64encode(asset["data"]).decode()
-    return ""
-
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def extract_text_from_pdf(file_path: str) -> str:
-    text = ""
-    with pdfplumber.open(file_path) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-    return text
+def session_state_sizes():
+    """Approximate bytes held by each session_state key, largest first"""
+    sizes = {key: deep_sizeof(value) for key, value in st.session_state.to_dict().items()}
+    return dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True))
+
+def track_session_memory():
+    """Report this session's state size to the process-wide summary, at most every SESSION_MEMORY_SAMPLE_SECONDS"""
+    now = time.monotonic()
+    if now - st.session_state.get("memory_sampled_at", 0.0) < SESSION_MEMORY_SAMPLE_SECONDS:
+        return
+    st.session_state["memory_sampled_at"] = now
+    session_id = st.session_state.setdefault("memory_session_id", secrets.token_hex(8))
+    record_session_size(session_id, sum(session_state_sizes().values()))
+
+def page_marker(*classes):
+    """Invisible element that page-scoped theme rules match with .stApp:has(.page-*)"""
+    st.markdown(f'<div class="page-marker {" ".join(classes)}"></div>', unsafe_allow_html=True)
+
+def render_pager(state_key, next_cursor):
+    """Previous/Next controls over a stack of keyset cursors kept in session_state"""
+    cursors = st.session_state[state_key]
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("← Previous", key=f"{state_key}_prev", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            return True
+    with col_page:
+        st.markdown(f'<p style="text-align: center; color: #94a3b8; margin-top: 8px;">Page {len(cursors)}</p>', unsafe_allow_html=True)
+    with col_next:
+        if st.button("Next →", key=f"{state_key}_next", disabled=next_cursor is None, use_container_width=True):
+            cursors.append(next_cursor)
+            return True
+    return False
+
+def listing_filters(state_key, score_label, statuses=None):
+    """
+    Search / status / minimum score / sort controls for a paginated listing.
+    Returns the filter kwargs for the list_* calls and resets the cursor
+    stack in `state_key` whenever they change.
+    """
+    col_search, col_score, col_sort = st.columns([2, 1, 1])
+    with col_search:
+        search = st.text_input("🔎 Search name or email", key=f"{state_key}_search")
+    with col_score:
+        min_score = st.number_input(score_label, min_value=0, max_value=100, value=0, step=5, key=f"{state_key}_min_score")
+    with col_sort:
+        order = st.selectbox("Sort", ["Highest first", "Lowest first"], key=f"{state_key}_sort")
+
+    filters = {
+        "search": search.strip() or None,
+        "min_score": min_score or None,
+        "descending": order == "Highest first",
+    }
+    if statuses is not None:
+        filters["statuses"] = tuple(st.multiselect(
+            "Status", statuses, default=statuses[:1], key=f"{state_key}_statuses"
+        )) or statuses[:1]
+
+    if st.session_state.get(f"{state_key}_filters") != filters:
+        st.session_state[f"{state_key}_filters"] = filters
+        st.session_state[state_key] = [None]
+    return filters
+
+def render_run_timings(run):
+    """Collapsible per-stage timing breakdown of one ranking run"""
+    with st.expander(f"⏱️ Run took {run['total_ms'] / 1000:.1f}s · {run['files']} files · {run['pages']} pages"):
+        total_ms = run["total_ms"] or 1
+        st.dataframe(
+            [
+                {"Stage": name, "Calls": stage["calls"], "Total (ms)": round(stage["total_ms"]),
+                 "Share": f"{stage['total_ms'] / total_ms:.0%}", "Slowest (ms)": round(stage["max_ms"])}
+                for name, stage in run["stages"].items()
+            ],
+            hide_index=True,
+            use_container_width=True
+        )
+        slowest = sorted(run["extraction"], key=lambda item: item["ms"], reverse=True)[:5]
+        if slowest:
+            st.caption("Slowest files to read: " + ", ".join(
+                f"{item['file']} ({item.get('pages', '?')} p, {item['ms']:.0f} ms)" for item in slowest
+            ))
+        if run.get("profile"):
+            st.caption("cProfile, top functions by cumulative time")
+            st.code(run["profile"], language=None)
+        elif run.get("profile_skipped"):
+            st.caption("cProfile was skipped: another profiled run was in progress")
+
+def render_score_matrix(job):
+    """Candidate x role scores and per-role shortlists of a multi-role run"""
+    titles = [role["title"] for role in job["roles"]]
+    with st.expander(f"🧮 Candidate × role scores · {len(job['matrix'])} candidates · {len(titles)} roles", expanded=True):
+        st.dataframe(
+            [
+                {"Candidate": row["candidate"], "Email": row["email"], **{t: row["scores"].get(t, 0) for t in titles}}
+                for row in sorted(job["matrix"], key=lambda row: max(row["scores"].values(), default=0), reverse=True)
+            ],
+            hide_index=True,
+            use_container_width=True
+        )
+        for title in titles:
+            picked = [c for c in job.get("shortlist", []) if c.get("role") == title]
+            st.caption(f"**{title}** shortlist: " + (", ".join(
+                f"{c['candidate']} ({c['score']})" for c in picked
+            ) or "nobody"))
 
 # ============================================
 # GLOBAL CONFIG
 # ============================================
-UPLOAD_DIR = os.path.join(PROJECT_ROOT, "uploads", "resumes")
+THEME_CSS_PATH = os.path.join(PROJECT_ROOT, "ui", "styles", "theme.css")
+GOOGLE_FONTS_URL = "https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&family=Poppins:wght@400;500;600;700&display=swap"
+TALENT_PAGE_SIZE = 12
+# Recruiters who see server internals (worker pool) in the sidebar
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+SHORTLIST_PAGE_SIZE = 25
+# Expanders shown per batch before "Show more" when a fresh shortlist is large
+SHORTLIST_ROW_BATCH = 10
+RANKING_POLL_SECONDS = 2
+RANKING_STAGE_LABELS = {
+    "queued": "🕒 Waiting for a worker...",
+    "extracting": "📄 Reading resumes...",
+    "ranking": "🧠 AI ranking...",
+    "selecting": "🎯 Selecting top candidates...",
+    "storing": "💾 Saving...",
+}
+EMAIL_STATUS_TTL_SECONDS = 15
+SESSION_MEMORY_SAMPLE_SECONDS = 30
+EMAIL_STATUS_LABELS = {
+    "queued": "🕒 Queued",
+    "sending": "📤 Sending",
+    "sent": "✅ Sent",
+    "failed": "🔁 Retrying",
+    "dead": "☠️ Undeliverable",
+}
 
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 # ============================================
 # TOKEN-BASED ROUTING & PAGE CONFIG
@@ -71,17 +283,15 @@ token = raw_token[0] if isinstance(raw_token, list) else raw_token
 page = st.query_params.get("page", "home")
 
 # ---------- Persistence Helper ----------
-def compute_auth_token(email):
-    """Simple hash-based token for session persistence across refreshes"""
-    return hashlib.md5((email + "RECRUITER_SECRET_2024").encode()).hexdigest()
-
-# Recovery: If session_state is lost but query_params have auth, restore session
-user_q = st.query_params.get("user")
-auth_q = st.query_params.get("auth")
-if user_q and auth_q:
-    if compute_auth_token(user_q) == auth_q:
+# Recovery: if session_state is lost but the URL carries a signed session token,
+# restore the session. Checked once per session, in memory, without a DB read.
+session_q = st.query_params.get("session")
+if session_q and not st.session_state.get("recruiter_logged_in") and st.session_state.get("session_token") != session_q:
+    restored_email = verify_session_token(session_q)
+    if restored_email:
         st.session_state["recruiter_logged_in"] = True
-        st.session_state["recruiter_email"] = user_q
+        st.session_state["recruiter_email"] = restored_email
+    st.session_state["session_token"] = session_q
 
 st.set_page_config(
     page_title="AI Recruiter System",
@@ -90,696 +300,29 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Custom CSS for Premium 'Touchy Dark' Theme
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&family=Poppins:wght@400;500;600;700&display=swap');
-    
-    /* ========================================
-       THEME CONFIGURATION (Change colors here!)
-    ======================================== */
-    :root {
-        --input-bg: #10101a;           /* Background of search box */
-        --input-text: #ffffff;         /* Text color inside search box */
-        --input-border: #6366f166;    /* Border color (66 is transparency) */
-        --input-focus-bg: #10101a;     /* Background when clicking */
-        --accent-glow: #6366f14d;     /* Shadow/Glow color */
-        
-        /* File Uploader Colors */
-        --uploader-bg: rgba(10, 10, 15, 0.4);
-        --uploader-border: rgba(99, 102, 241, 0.2);
-        --uploader-btn-bg: #6366f1;
-        --uploader-btn-text: #10101a;
-        --uploader-file-text: white; /* Color for uploaded file names */
-        
-        /* Shortlisted Candidate Cards */
-        --result-bg: #10101a;
-        --result-hover-bg: rgba(99, 102, 241, 0.1);
-    }
-    
-    /* ========================================
-       NAVBAR STYLES
-    ======================================== */
-    .navbar {
-        position: fixed;
-        top: 0;
-        left: 0;
-        right: 0;
-        z-index: 9999;
-        background: rgba(5, 5, 5, 0.85);
-        backdrop-filter: blur(20px);
-        border-bottom: 1px solid rgba(255, 255, 255, 0.08);
-        padding: 15px 5%;
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.3);
-    }
-    
-    .navbar-logo {
-        display: flex;
-        align-items: center;
-        gap: 12px;
-        text-decoration: none;
-        z-index: 10001;
-    }
-    
-    .navbar-logo img {
-        width: 45px;
-        height: 45px;
-        border-radius: 10px;
-    }
-    
-    .navbar-logo-text {
-        font-family: 'Poppins', sans-serif;
-        font-size: 1.4rem;
-        font-weight: 700;
-        background: linear-gradient(135deg, #6366f1 0%, #a855f7 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        letter-spacing: -0.5px;
-    }
-    
-    .navbar-menu {
-        display: flex;
-        gap: 40px;
-        align-items: center;
-        list-style: none;
-        margin: 0;
-        padding: 0;
-    }
-    
-    .navbar-menu a {
-        color: #94a3b8;
-        text-decoration: none;
-        font-weight: 600;
-        font-size: 0.95rem;
-        letter-spacing: 0.5px;
-        transition: all 0.3s ease;
-        position: relative;
-        padding: 8px 0;
-    }
-    
-    .navbar-menu a:hover {
-        color: #ffffff;
-    }
-    
-    .navbar-menu a::after {
-        content: '';
-        position: absolute;
-        bottom: 0;
-        left: 0;
-        width: 0;
-        height: 2px;
-        background: linear-gradient(135deg, #6366f1 0%, #a855f7 100%);
-        transition: width 0.3s ease;
-    }
-    
-    .navbar-menu a:hover::after {
-        width: 100%;
-    }
-    
-    .navbar-login-btn {
-        background: linear-gradient(135deg, #6366f1 0%, #4f46e5 100%) !important;
-        color: white !important;
-        padding: 10px 28px !important;
-        border-radius: 50px !important;
-        font-weight: 700 !important;
-        font-size: 0.9rem !important;
-        letter-spacing: 0.5px !important;
-        transition: all 0.3s ease !important;
-        box-shadow: 0 4px 15px rgba(99, 102, 241, 0.3) !important;
-        border: none !important;
-        display: inline-block !important;
-    }
-    
-    .navbar-login-btn:hover {
-        transform: translateY(-2px) !important;
-        box-shadow: 0 6px 25px rgba(99, 102, 241, 0.5) !important;
-        filter: brightness(1.1);
-    }
-
-    /* Mobile Menu Toggle */
-    .nav-toggle {
-        display: none;
-    }
-    
-    .nav-toggle-label {
-        display: none;
-        position: relative;
-        height: 20px;
-        width: 30px;
-        cursor: pointer;
-        z-index: 10001;
-    }
-    
-    .nav-toggle-label span,
-    .nav-toggle-label span::before,
-    .nav-toggle-label span::after {
-        display: block;
-        background: #ffffff;
-        height: 2px;
-        width: 100%;
-        border-radius: 10px;
-        position: absolute;
-        transition: all 0.3s ease;
-    }
-    
-    .nav-toggle-label span::before {
-        content: '';
-        top: -8px;
-    }
-    
-    .nav-toggle-label span::after {
-        content: '';
-        bottom: -8px;
-    }
-
-    /* Mobile Responsiveness */
-    @media (max-width: 992px) {
-        .navbar {
-            padding: 15px 20px;
-        }
-        
-        .nav-toggle-label {
-            display: block;
-        }
-        
-        .navbar-menu {
-            position: absolute;
-            top: 0;
-            right: 0;
-            width: 280px;
-            height: 100vh;
-            background: rgba(5, 5, 5, 0.98);
-            backdrop-filter: blur(25px);
-            flex-direction: column;
-            justify-content: center;
-            align-items: center;
-            gap: 30px;
-            transform: translateX(100%);
-            transition: transform 0.4s cubic-bezier(0.77,0.2,0.05,1.0);
-            box-shadow: -10px 0 30px rgba(0,0,0,0.5);
-            z-index: 10000;
-        }
-        
-        .nav-toggle:checked ~ .navbar-menu {
-            transform: translateX(0);
-        }
-        
-        .nav-toggle:checked + .nav-toggle-label span {
-            background: transparent;
-        }
-        
-        .nav-toggle:checked + .nav-toggle-label span::before {
-            transform: rotate(45deg);
-            top: 0;
-        }
-        
-        .nav-toggle:checked + .nav-toggle-label span::after {
-            transform: rotate(-45deg);
-            bottom: 0;
-        }
-        
-        .navbar-menu li {
-            width: 100%;
-            text-align: center;
-        }
-        
-        .navbar-menu a {
-            font-size: 1.1rem;
-            display: block;
-            width: 100%;
-        }
-        
-        .navbar-login-btn {
-            width: 80% !important;
-            margin: 0 auto !important;
-            font-size: 0.9rem !important;
-        }
-
-        .navbar-logo-text {
-            font-size: 1.2rem;
-        }
-    }
-
-    @media (max-width: 480px) {
-        .navbar-logo-text {
-            display: none;
-        }
-    }
-
-    
-    /* Global Styles */
-    html, body, [class*="css"] {
-        font-family: 'Inter', sans-serif;
-        background-color: #050505 !important;
-        color: #e2e8f0;
-        scroll-behavior: smooth;
-    }
-    
-    /* Remove default padding and borders */
-    .block-container {
-        padding: 0 !important;
-        max-width: 100% !important;
-        background-color: #050505 !important;
-    }
-
-    [data-testid="stAppViewContainer"] {
-        background-color: #050505 !important;
-    }
-
-    /* Remove horizontal lines/dividers */
-    hr {
-        display: none !important;
-    }
-
-    [data-testid="stHorizontalBlock"] {
-        border: none !important;
-    }
-
-    /* Remove any default Streamlit borders */
-    .element-container {
-        border: none !important;
-    }
-
-    /* Remove all dividers between sections */
-    div[data-testid="stVerticalBlock"] > div {
-        border: none !important;
-    }
-
-    /* Remove container borders */
-    section[data-testid="stSidebar"] ~ div {
-        border-top: none !important;
-    }
-
-    /* Force remove all top borders globally */
-    * {
-        border-top-color: transparent !important;
-    }
-    
-    /* ========================================
-       HERO SECTION - ENTERPRISE
-    ======================================== */
-    .hero-section {
-        width: 100%;
-        height: 85vh; /* 25% Increase in Landing Page Height */
-        position: relative;
-        overflow: hidden;
-        display: flex;
-        flex-direction: column;
-        justify-content: center;
-        align-items: center; /* Centered Alignment */
-        padding: 0 5%;
-        background-color: #000000;
-        border-bottom: 1px solid rgba(255, 255, 255, 0.05);
-        text-align: center;
-    }
-
-    .hero-bg-overlay {
-        position: absolute;
-        top: 0;
-        left: 0;
-        width: 100%;
-        height: 100%;
-        background: radial-gradient(circle at center, rgba(99, 102, 241, 0.15) 0%, transparent 70%);
-        z-index: 2;
-    }
-
-    .hero-content {
-        position: relative;
-        z-index: 3;
-        max-width: 900px;
-    }
-
-    .hero-tagline {
-        color: #6366f1;
-        font-weight: 700;
-        text-transform: uppercase;
-        letter-spacing: 4px;
-        font-size: 0.85rem;
-        margin-bottom: 24px;
-        display: block;
-    }
-
-    .hero-title {
-        font-family: 'Poppins', sans-serif;
-        font-size: 4rem;
-        font-weight: 900;
-        line-height: 1.1;
-        margin-bottom: 20px;
-        color: #ffffff;
-        letter-spacing: -2px;
-    }
-
-    .hero-title span {
-        background: linear-gradient(135deg, #6366f1 0%, #a855f7 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-    }
-
-    .hero-description {
-        font-size: 1.3rem;
-        color: #94a3b8;
-        line-height: 1.7;
-        margin-bottom: 40px;
-        max-width: 750px;
-        margin-left: auto;
-        margin-right: auto;
-    }
-    .form-section {
-        background: #050505;
-        padding: 0px 20px 80px 20px; /* Fully removed top padding */
-        display: flex;
-        flex-direction: column;
-        align-items: center;
-        border-top: none !important;
-        margin-top: 0 !important;
-    }
-    
-    .form-card {
-        background: rgba(15, 15, 20, 0.8);
-        border-radius: 32px;
-        padding: 40px 60px;
-        box-shadow: 0 40px 100px rgba(0, 0, 0, 0.6), 0 0 0 1px rgba(255, 255, 255, 0.05);
-        border: 1px solid rgba(255, 255, 255, 0.08);
-        border-top: none !important; /* Remove top border line */
-        max-width: 1100px;
-        width: 100%;
-        backdrop-filter: blur(20px);
-        margin: 0 auto;
-        margin-top: 0 !important;
-    }
-    
-    .form-step-label {
-        background: linear-gradient(135deg, #6366f1 0%, #a855f7 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        font-weight: 800;
-        text-transform: uppercase;
-        letter-spacing: 4px;
-        font-size: 3rem;
-        line-height: 1.5;
-        margin-bottom: 30px;
-        padding: 15px 0;
-        display: block;
-        text-align: center;
-        filter: drop-shadow(0 0 20px rgba(99, 102, 241, 0.3));
-    }
-    
-    .form-title {
-        font-family: 'Poppins', sans-serif;
-        background: linear-gradient(135deg, #ffffff 0%, #94a3b8 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        font-size: 3rem;
-        font-weight: 800;
-        margin-bottom: 30px;
-        letter-spacing: -1.5px;
-        text-align: center;
-    }
-    
-    /* Input Overrides for Dark Mode - Premium Re-fit */
-    [data-testid="stTextArea"] label, [data-testid="stNumberInput"] label, [data-testid="stFileUploader"] label, [data-testid="stTextInput"] label {
-        color: #94a3b8 !important;
-        font-weight: 600 !important;
-        letter-spacing: 0.5px !important;
-        margin-bottom: 12px !important;
-    }
-
-    /* Style Text Areas and Text Inputs */
-    .stTextArea textarea, .stTextInput input {
-        background: var(--input-bg) !important;
-        border: 1px solid var(--input-border) !important;
-        border-radius: 16px !important;
-        padding: 15px 20px !important;
-        color: var(--input-text) !important;
-        transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-        font-size: 1rem !important;
-        line-height: 1.6 !important;
-    }
-    
-    .stTextArea textarea:focus, .stTextInput input:focus {
-        border-color: #6366f1 !important;
-        box-shadow: 0 0 25px var(--accent-glow) !important;
-        background: var(--input-focus-bg) !important;
-    }
-
-    /* Selection Limit (Number Input) Style */
-    [data-testid="stNumberInput"] {
-        background-color: var(--input-bg) !important;
-        border-radius: 16px !important;
-        border: 1px solid var(--input-border) !important;
-        padding: 5px 15px !important;
-        transition: all 0.3s ease !important;
-    }
-
-    /* Target the white background specifically */
-    [data-testid="stNumberInput"] div[data-baseweb="input"],
-    [data-testid="stNumberInput"] input {
-        background-color: #10101a !important;
-        border: none !important;
-    }
-
-    [data-testid="stNumberInput"]:focus-within,
-    [data-testid="stNumberInput"]:hover {
-        border-color: #6366f1 !important;
-        box-shadow: 0 0 25px var(--accent-glow) !important;
-        background: var(--input-focus-bg) !important;
-    }
-
-    .stNumberInput input {
-        color: var(--input-text) !important;
-        font-weight: 600 !important;
-    }
-
-    /* File Uploader Premium Look */
-    [data-testid="stFileUploader"] section {
-        background: var(--uploader-bg) !important;
-        border: 2px dashed var(--uploader-border) !important;
-        border-radius: 20px !important;
-        padding: 30px !important;
-        transition: all 0.3s ease;
-    }
-
-    /* Style the 'Browse files' button specifically */
-    [data-testid="stFileUploader"] button {
-        background-color: var(--uploader-btn-bg) !important;
-        color: var(--uploader-btn-text) !important;
-        border: none !important;
-        border-radius: 10px !important;
-        transition: all 0.3s ease !important;
-    }
-    
-    [data-testid="stFileUploader"] button:hover {
-        background-color: #4f46e5 !important; /* Slightly darker purple on hover */
-        transform: scale(1.02);
-    }
-
-    [data-testid="stFileUploader"] section:hover {
-        border-color: #6366f1 !important;
-        background: rgba(99, 102, 241, 0.05) !important;
-    }
-
-    /* Style the list of uploaded files */
-    [data-testid="stFileUploaderFile"] {
-        color: var(--uploader-file-text) !important;
-        background: rgba(255, 255, 255, 0.03) !important;
-        border-radius: 10px !important;
-        margin-top: 10px !important;
-        padding: 8px 15px !important;
-    }
-
-    [data-testid="stFileUploaderFileName"], 
-    [data-testid="stFileUploaderFile"] small {
-        color: var(--uploader-file-text) !important;
-        opacity: 0.9 !important;
-    }
-
-    /* Centered Submit Button Container */
-    .submit-container {
-        display: flex;
-        justify-content: center;
-        margin-top: 40px;
-        width: 100%;
-    }
-
-    .stButton > button {
-        background: linear-gradient(135deg, #6366f1 0%, #4f46e5 100%) !important;
-        color: white !important;
-        border: none !important;
-        border-radius: 100px !important;
-        padding: 18px 45px !important;
-        font-size: 1.1rem !important;
-        font-weight: 700 !important;
-        text-transform: uppercase !important;
-        letter-spacing: 1.5px !important;
-        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1) !important;
-        box-shadow: 0 15px 35px rgba(99, 102, 241, 0.3) !important;
-        width: auto !important;
-        min-width: 320px !important;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-4px) !important;
-        box-shadow: 0 20px 50px rgba(99, 102, 241, 0.5) !important;
-        filter: brightness(1.2);
-    }
-
-    /* Expander styling for results */
-    .streamlit-expanderHeader {
-        background: rgba(255, 255, 255, 0.03) !important;
-        border: 1px solid rgba(255, 255, 255, 0.05) !important;
-        border-radius: 12px !important;
-        color: #ffffff !important;
-    }
-
-    /* Sidebar Styling */
-    [data-testid="stSidebar"] {
-        background-color: #0a0a0c !important;
-        border-right: 1px solid rgba(255, 255, 255, 0.05);
-    }
-    
-    /* ========================================
-       SPLIT CONTENT LAYOUT
-    ======================================== */
-    .main-content {
-        padding: 0px 40px 40px 40px; /* Removed top padding to eliminate gap */
-        max-width: 1300px;
-        margin: 0 auto;
-    }
-    
-    .section-title {
-        font-family: 'Poppins', sans-serif;
-        background: linear-gradient(to right, #818cf8, #c084fc);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        font-size: 3.2rem;
-        font-weight: 800;
-        margin-top: 0 !important; /* Force remove top space */
-        margin-bottom: 50px;
-        letter-spacing: -1.5px;
-        text-align: center;
-    }
-    
-    .process-step {
-        display: flex;
-        align-items: flex-start;
-        gap: 20px;
-        margin-bottom: 24px;
-        padding: 24px;
-        background: rgba(255, 255, 255, 0.04); /* Permanent active background */
-        border-radius: 18px;
-        border: 1px solid rgba(99, 102, 241, 0.3); /* Permanent active border */
-        transform: translateX(10px); /* Permanent active transform */
-        transition: all 0.3s ease;
-    }
-    
-    .process-step:hover {
-        background: rgba(255, 255, 255, 0.06);
-        border-color: #6366f1;
-        box-shadow: 0 10px 30px rgba(0, 0, 0, 0.3);
-    }
-    
-    .step-number {
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        min-width: 44px;
-        height: 44px;
-        background: rgba(99, 102, 241, 0.1);
-        color: #818cf8;
-        border-radius: 12px;
-        font-weight: 700;
-        font-size: 1.1rem;
-    }
-    
-    .step-content h3 {
-        font-size: 1.1rem;
-        font-weight: 700;
-        color: #ffffff;
-        margin: 0 0 6px 0 !important;
-    }
-    
-    .step-content p {
-        font-size: 0.95rem;
-        color: #94a3b8;
-        margin: 0 !important;
-    }
-    
-    .visual-container {
-        position: sticky;
-        top: 20px;
-    }
-    
-    .illustration-card {
-        background: rgba(255, 255, 255, 0.01);
-        border-radius: 30px;
-        padding: 40px;
-        border: 1px solid rgba(255, 255, 255, 0.05);
-        border-bottom: none !important; /* Remove bottom border */
-        box-shadow: 0 50px 100px rgba(0, 0, 0, 0.5);
-    }
-
-    .main-content {
-        border-bottom: none !important;
-    }
-
-    /* Text colors */
-    h1, h2, h3, h4, p, span, label {
-        color: #f1f5f9 !important;
-    }
-    
-    /* Paragraph and List Styling */
-    p, ol, ul, dl {
-        margin: 0px 0px -2rem;
-        padding: 0px;
-        font-size: 1rem;
-        font-weight: 400;
-    }
-
-    /* FORCE style for form submit button */
-div[data-testid="stFormSubmitButton"] button {
-    background: linear-gradient(135deg, #6366f1 0%, #4f46e5 100%) !important;
-    color: white !important;
-    border: none !important;
-    border-radius: 100px !important;
-    padding: 18px 45px !important;
-    font-size: 1.1rem !important;
-    font-weight: 700 !important;
-    text-transform: uppercase !important;
-    letter-spacing: 1.5px !important;
-    box-shadow: 0 15px 35px rgba(99, 102, 241, 0.3) !important;
-}
-
-/* Hover */
-div[data-testid="stFormSubmitButton"] button:hover {
-    background: linear-gradient(135deg, #4f46e5 0%, #6366f1 100%) !important;
-    filter: brightness(1.15);
-}
-
-    
-    /* Hide Streamlit elements */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-</style>
-""", unsafe_allow_html=True)
+# Premium 'Touchy Dark' theme, injected once per session from ui/styles/theme.css
+inject_theme()
 
 # ============================================
 # NAVBAR
 # ============================================
-# Fetch images from DB
-logo_b64 = get_image_from_db("logo")
-login_avatar_b64 = get_image_from_db("login_avatar")
-dashboard_b64 = get_image_from_db("dashboard_illustration")
+# Static image URLs (browser-cacheable, exported once from DB)
+ASSET_URLS = get_asset_urls()
+logo_url = ASSET_URLS.get("logo", "")
+login_avatar_url = ASSET_URLS.get("login_avatar", "")
+dashboard_url = ASSET_URLS.get("dashboard_illustration", "")
 
 # Handle Logout
 if st.query_params.get("action") == "logout":
     st.session_state["recruiter_logged_in"] = False
     st.session_state["recruiter_email"] = None
+    st.session_state.pop("session_token", None)
     st.query_params.clear()
-    st.rerun()
+    rerun()
+
+init_database()
+outbox_workers()
+track_session_memory()
 
 is_recruiter = st.session_state.get("recruiter_logged_in", False)
 is_candidate = st.session_state.get("candidate_logged_in", False)
@@ -788,9 +331,8 @@ recruiter_email = st.session_state.get("recruiter_email", "Recruiter")
 
 # Build shared auth string for internal links
 auth_suffix = ""
-if is_recruiter:
-    token_val = compute_auth_token(recruiter_email)
-    auth_suffix = f"&user={recruiter_email}&auth={token_val}"
+if is_recruiter and st.session_state.get("session_token"):
+    auth_suffix = f"&session={st.session_state['session_token']}"
 
 navbar_right_items = ""
 if is_recruiter:
@@ -806,7 +348,7 @@ if is_authenticated:
 st.markdown(f"""
 <nav class="navbar">
 <div class="navbar-logo">
-<img src="data:image/png;base64,{logo_b64}" alt="Logo">
+<img src="{logo_url}" alt="Logo">
 <span class="navbar-logo-text">AI Recruiter</span>
 </div>
 <input type="checkbox" id="nav-toggle" class="nav-toggle">
@@ -829,96 +371,9 @@ if token:
     is_logged_in = st.session_state.get("candidate_logged_in", False)
     current_subpage = st.query_params.get("subpage", "login")
 
-    # Common Premium Styles for Token-based pages
-    st.markdown("""
-        <style>
-            /* Global Overrides for Page */
-            .main { background-color: #050505 !important; }
-            
-            /* Typography & Font Sizes */
-            h1 { font-size: 3.5rem !important; }
-            h2 { font-size: 2.2rem !important; margin-bottom: 20px !important; }
-            .stMarkdown p { font-size: 1.1rem !important; line-height: 1.6 !important; }
-            
-            /* Glassmorphism Card Style */
-            .premium-card {
-                background: rgba(255, 255, 255, 0.03);
-                backdrop-filter: blur(15px);
-                border: 1px solid rgba(255, 255, 255, 0.08);
-                border-radius: 24px;
-                padding: 40px;
-                margin-bottom: 30px;
-                box-shadow: 0 20px 40px rgba(0, 0, 0, 0.4);
-                transition: transform 0.3s ease, border-color 0.3s ease;
-            }
-            .premium-card:hover {
-                border-color: rgba(99, 102, 241, 0.4);
-            }
-            
-            /* Quiz Question Card */
-            .quiz-question-container {
-                background: rgba(255, 255, 255, 0.02);
-                border-left: 4px solid #6366f1;
-                border-radius: 12px;
-                margin-bottom: 25px;
-                transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-                padding: 20px;
-                cursor: pointer;
-            }
-            .quiz-question-container:hover {
-                background: rgba(255, 255, 255, 0.05);
-                border-left-color: #a855f7;
-                transform: translateX(8px);
-                box-shadow: 0 8px 30px rgba(99, 102, 241, 0.2);
-            }
-            
-            /* Question Text Styling with Gradient Text Color */
-            .quiz-question-container strong,
-            .quiz-question-container p strong {
-                background: linear-gradient(135deg, #6366f1 0%, #4f46e5 100%);
-                -webkit-background-clip: text;
-                -webkit-text-fill-color: transparent;
-                display: inline-block;
-                font-size: 1.3rem !important;
-                font-weight: 800 !important;
-                transition: all 0.3s ease;
-            }
-            
-            .quiz-question-container:hover strong,
-            .quiz-question-container:hover p strong {
-                filter: brightness(1.2);
-                transform: scale(1.01);
-            }
-            
-            /* Radio Button Tweak - Hide the "Select answer" label */
-            div[data-testid="stRadio"] > label {
-                display: none !important;
-            }
-            
-            /* Add spacing between question text and radio options */
-            div[data-testid="stRadio"] div[role="radiogroup"] {
-                gap: 20px !important;
-                margin-top: 32px !important;
-            }
-
-            /* Custom Radio Item Styling (Streamlit target) */
-            div[data-testid="stMarkdownContainer"] strong {
-                font-size: 1.2rem !important;
-                color: #e2e8f0 !important;
-            }
-        </style>
-    """, unsafe_allow_html=True)
-
     if not is_logged_in or current_subpage == "login":
         # LOGIN PAGE LAYOUT
-        st.markdown("""
-            <style>
-                .block-container {
-                    padding-top: 120px !important;
-                    max-width: 1250px !important;
-                }
-            </style>
-        """, unsafe_allow_html=True)
+        page_marker("page-candidate", "page-candidate-login")
 
         col1, col2 = st.columns([1.1, 0.9], gap="large")
 
@@ -934,7 +389,7 @@ if token:
             
             st.markdown('<div style="margin-top: 30px;">', unsafe_allow_html=True)
             if st.button("Enter Dashboard", use_container_width=True):
-                candidate = candidates_collection.find_one({"quiz_token": token})
+                candidate = get_candidate_by_token(token)
                 if candidate:
                     stored_email = candidate["email"].lower()
                     stored_password = candidate["password"]
@@ -944,8 +399,9 @@ if token:
                             st.error(f"❌ Assessment complete. Your previous status is: {candidate.get('status')}. You cannot retake the evaluation.")
                         else:
                             st.session_state["candidate_logged_in"] = True
+                            st.session_state["candidate_job_id"] = candidate.get("job_id")
                             st.query_params["subpage"] = "quiz"
-                            st.rerun()
+                            rerun()
                     else:
                         st.error("❌ Identification failed. Please check your credentials.")
                 else:
@@ -954,8 +410,8 @@ if token:
             st.markdown('</div>', unsafe_allow_html=True)
 
         with col2:
-            if login_avatar_b64:
-                st.markdown(f'<img src="data:image/png;base64,{login_avatar_b64}" style="width: 100%; border-radius: 20px; box-shadow: 0 20px 50px rgba(0,0,0,0.5);">', unsafe_allow_html=True)
+            if login_avatar_url:
+                st.markdown(f'<img src="{login_avatar_url}" style="width: 100%; border-radius: 20px; box-shadow: 0 20px 50px rgba(0,0,0,0.5);">', unsafe_allow_html=True)
             st.markdown("""<div style="text-align: center; margin-top: 25px; padding: 20px; border-top: 1px solid rgba(255,255,255,0.05);">
 <h3 style="color: #ffffff; font-size: 1.4rem; font-weight: 700;">AI-Match Intelligence</h3>
 <p style="color: #6366f1; font-weight: 600; font-size: 0.9rem; text-transform: uppercase; letter-spacing: 2px;">Verification Layer Active</p>
@@ -963,14 +419,7 @@ if token:
 
     else:
         # QUIZ PAGE LAYOUT (AFTER REDIRECT)
-        st.markdown("""
-            <style>
-                .block-container {
-                    padding-top: 100px !important;
-                    max-width: 900px !important;
-                }
-            </style>
-        """, unsafe_allow_html=True)
+        page_marker("page-candidate", "page-candidate-quiz")
 
         st.markdown("""<div style="text-align: center; margin-bottom: 50px;">
 <h1 style="font-family: 'Poppins', sans-serif; font-weight: 900; letter-spacing: -2px;">
@@ -979,13 +428,19 @@ if token:
 <p style="color: #94a3b8; font-size: 1.2rem;">Demonstrate your expertise in core concepts.</p>
 </div>""", unsafe_allow_html=True)
 
+        # One registry lookup per session; the bank itself is shared by all sessions
+        quiz_bank = st.session_state.get("quiz_bank")
+        if quiz_bank is None:
+            quiz_bank = get_question_bank(st.session_state.get("candidate_job_id"))
+            st.session_state["quiz_bank"] = quiz_bank
+
         if "quiz_submitted" not in st.session_state:
             with st.form("quiz_form", border=False):
                 # Instruction Box
-                st.markdown("""
+                st.markdown(f"""
                     <div style="background: rgba(99, 102, 241, 0.1); border: 1px solid rgba(99, 102, 241, 0.2); padding: 20px; border-radius: 12px; margin-bottom: 40px;">
                         <p style="color: #e2e8f0; margin: 0; font-size: 1rem;">
-                            <strong>Note:</strong> Select the correct option for each question. You need <strong>70%</strong> to qualify for the next round.
+                            <strong>Note:</strong> Select the correct option for each question. You need <strong>{quiz_bank.pass_mark}%</strong> to qualify for the next round.
                         </p>
                     </div>
                 """, unsafe_allow_html=True)
@@ -993,8 +448,7 @@ if token:
                 answers = {}
                 
                 # Question UI Helper
-                def render_question(num, q_text, key, options):
-                    # st.markdown(f'<div class="quiz-question-container">', unsafe_allow_html=True)
+                def render_question(num, question):
                     st.markdown(f"""
                         <div style="background: linear-gradient(135deg, #6366f1 0%, #4f46e5 100%); 
                                     -webkit-background-clip: text; 
@@ -1003,34 +457,29 @@ if token:
                                     font-weight: 800; 
                                     margin-bottom: 5px;
                                     display: inline-block;">
-                            {num}. {q_text}
+                            {num}. {question["text"]}
                         </div>
                     """, unsafe_allow_html=True)
-                    ans = st.radio(f"Select answer for Q{num}", options, key=key, label_visibility="collapsed")
-                    st.markdown('</div>', unsafe_allow_html=True)
-                    return ans
+                    options = question["options"]
+                    # Radio values are option indexes so grading compares against the packed key
+                    return st.radio(
+                        f"Select answer for Q{num}",
+                        range(len(options)),
+                        format_func=options.__getitem__,
+                        key=f"q_{question['id']}",
+                        label_visibility="collapsed"
+                    )
 
-                answers["q1"] = render_question(1, "What is the output of `2 ** 3` in Python?", "q1_key", ["6", "8", "9", "Error"])
-                answers["q2"] = render_question(2, "Which keyword is used to define a function?", "q2_key", ["func", "define", "def", "function"])
-                answers["q3"] = render_question(3, "Which of these is a mutable data type?", "q3_key", ["Tuple", "String", "List", "Integer"])
-                answers["q4"] = render_question(4, "What is the correct file extension for Python files?", "q4_key", [".py", ".python", ".pt", ".txt"])
-                answers["q5"] = render_question(5, "What does `len('Hello')` return?", "q5_key", ["4", "5", "0", "1"])
+                for num, question in enumerate(quiz_bank.for_candidate(token), start=1):
+                    answers[question["id"]] = render_question(num, question)
 
                 st.markdown('<div style="height: 30px;"></div>', unsafe_allow_html=True)
                 submitted = st.form_submit_button("Complete & Submit Assessment", use_container_width=True)
 
                 if submitted:
-                    score = 0
-                    if answers["q1"] == "8": score += 1
-                    if answers["q2"] == "def": score += 1
-                    if answers["q3"] == "List": score += 1
-                    if answers["q4"] == ".py": score += 1
-                    if answers["q5"] == "5": score += 1
-                    
-                    final_score = (score / 5) * 100
-                    st.session_state["quiz_score"] = final_score
+                    st.session_state["quiz_score"] = quiz_bank.grade(answers)
                     st.session_state["quiz_submitted"] = True
-                    st.rerun()
+                    rerun()
         else:
             # RESULT SCREEN
             final_score = st.session_state["quiz_score"]
@@ -1041,42 +490,40 @@ if token:
                 <div style="font-size: 4rem; font-weight: 900; color: #6366f1; margin: 20px 0;">{final_score}%</div>
             """, unsafe_allow_html=True)
 
-            if final_score >= 70:
+            if quiz_bank.passed(final_score):
                 st.balloons()
                 st.success("🎉 Outstanding! You have successfully passed the technical evaluation.")
                 
-                if "offer_sent" not in st.session_state:
+                if "quiz_result_recorded" not in st.session_state:
                     with st.spinner("Compiling final offer package..."):
-                        current_user = candidates_collection.find_one({"quiz_token": token})
-                        if current_user:
-                            # Update status in MongoDB
-                            candidates_collection.update_one(
-                                {"quiz_token": token},
-                                {"$set": {"status": "SELECTED", "quiz_score": final_score}}
-                            )
+                        # Records the score and returns the candidate in one atomic call;
+                        # only the submission that wins the transition sends the offer
+                        current_user, won = record_quiz_result(token, final_score, passed=True)
+                        st.session_state["quiz_result_recorded"] = True
+                        if won:
                             user_email = current_user["email"]
                             user_name = current_user["candidate"]
-                            subject, body = generate_offer_letter(user_name)
-                            success, msg = send_email(user_email, subject, body)
-                            if success:
-                                st.session_state["offer_sent"] = True
-                                st.markdown(f"""
-                                    <div style="margin-top: 20px; padding: 15px; background: rgba(16, 185, 129, 0.1); border: 1px solid #10b981; border-radius: 8px; color: #10b981;">
-                                        ✅ Offer Letter successfully dispatched to <strong>{user_email}</strong>.
-                                    </div>
-                                """, unsafe_allow_html=True)
-                            else:
-                                st.error(f"❌ Dispatch error: {msg}")
+                            offer = render_offer_letter(user_name, quiz_bank.pass_mark, current_user.get("recruiter_email"))
+                            # Idempotent per candidate; retried in the background if SMTP fails
+                            enqueue_email(
+                                current_user, "offer", offer.subject, offer.text,
+                                current_user.get("recruiter_email"), html=offer.html
+                            )
+                            st.session_state["offer_sent"] = True
+                            st.markdown(f"""
+                                <div style="margin-top: 20px; padding: 15px; background: rgba(16, 185, 129, 0.1); border: 1px solid #10b981; border-radius: 8px; color: #10b981;">
+                                    ✅ Offer Letter is on its way to <strong>{user_email}</strong>.
+                                </div>
+                            """, unsafe_allow_html=True)
+                        else:
+                            st.session_state["offer_sent"] = True
                 if st.session_state.get("offer_sent"):
                     st.info("Please check your primary inbox and spam folder for the next steps.")
             else:
-                # Update status to FAILED in MongoDB
-                current_user = candidates_collection.find_one({"quiz_token": token})
-                if current_user and current_user.get("status") == "SHORTLISTED":
-                    candidates_collection.update_one(
-                        {"quiz_token": token},
-                        {"$set": {"status": "REJECTED", "quiz_score": final_score}}
-                    )
+                # Update status to REJECTED (guarded: only from SHORTLISTED)
+                if "quiz_result_recorded" not in st.session_state:
+                    record_quiz_result(token, final_score, passed=False)
+                    st.session_state["quiz_result_recorded"] = True
 
                 st.markdown("""
                     <div style="margin-top: 20px; padding: 15px; background: rgba(239, 68, 68, 0.1); border: 1px solid #ef4444; border-radius: 8px; color: #ef4444;">
@@ -1117,15 +564,15 @@ if page == "login":
                 if not email or not password:
                     st.error("Please fill in all fields.")
                 else:
-                    user = recruiters_collection.find_one({"email": email})
+                    user = get_recruiter(email)
                     if user and user["password"] == hash_password(password):
                         st.session_state["recruiter_logged_in"] = True
                         st.session_state["recruiter_email"] = email
                         st.success("✅ Login successful!")
+                        st.session_state["session_token"] = issue_session_token(email)
                         st.query_params["page"] = "home"
-                        st.query_params["user"] = email
-                        st.query_params["auth"] = compute_auth_token(email)
-                        st.rerun()
+                        st.query_params["session"] = st.session_state["session_token"]
+                        rerun()
                     else:
                         st.error("❌ Invalid email or password.")
         
@@ -1179,18 +626,13 @@ elif page == "signup":
                     st.error("Please fill in all fields.")
                 elif password != confirm_password:
                     st.error("Passwords do not match.")
-                elif recruiters_collection.find_one({"email": email}):
+                elif get_recruiter(email):
                     st.error("An account with this email already exists.")
                 else:
-                    recruiters_collection.insert_one({
-                        "name": name,
-                        "email": email,
-                        "password": hash_password(password),
-                        "role": "recruiter"
-                    })
+                    register_recruiter(name, email, hash_password(password))
                     st.success("✅ Registration successful!")
                     st.query_params["page"] = "login"
-                    st.rerun()
+                    rerun()
 
         st.markdown('<p style="text-align: center; color: #94a3b8; margin-top: 30px;">Already have an account? <a href="/?page=login" style="color: #6366f1; text-decoration: none; font-weight: 600;">Login</a></p>', unsafe_allow_html=True)
         
@@ -1247,8 +689,8 @@ elif page == "about":
 
     with col_split2:
         st.markdown('<div class="visual-container">', unsafe_allow_html=True)
-        if dashboard_b64:
-            st.markdown(f'<img src="data:image/png;base64,{dashboard_b64}" style="width: 100%; border-radius: 30px; box-shadow: 0 50px 100px rgba(0,0,0,0.5);">', unsafe_allow_html=True)
+        if dashboard_url:
+            st.markdown(f'<img src="{dashboard_url}" style="width: 100%; border-radius: 30px; box-shadow: 0 50px 100px rgba(0,0,0,0.5);">', unsafe_allow_html=True)
         
         st.markdown("""
         <div style="margin-top: 25px; text-align: center;">
@@ -1282,106 +724,44 @@ elif page == "selected":
     st.markdown('<div class="main-content">', unsafe_allow_html=True)
     st.markdown('<h2 class="section-title">Hired Talent</h2>', unsafe_allow_html=True)
     st.markdown('<p style="text-align: center; color: #94a3b8; margin-bottom: 60px; font-size: 1.1rem;">The elite pool of candidates who cleared the AI Technical Assessment with exceptional scores.</p>', unsafe_allow_html=True)
-    
-    # CSS for premium grid cards
-    st.markdown("""
-    <style>
-        .talents-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(280px, 1fr));
-            gap: 25px;
-            padding: 20px 0;
-            width: 100%;
-        }
-        .talent-card {
-            background: rgba(255, 255, 255, 0.03);
-            border: 1px solid rgba(255, 255, 255, 0.08);
-            border-radius: 24px;
-            padding: 30px;
-            transition: all 0.4s cubic-bezier(0.175, 0.885, 0.32, 1.275);
-            position: relative;
-            overflow: hidden;
-            backdrop-filter: blur(10px);
-            aspect-ratio: 1 / 1; /* Force square shape */
-            display: flex;
-            flex-direction: column;
-            justify-content: center;
-        }
-        .talent-card:hover {
-            transform: translateY(-10px) scale(1.02);
-            border-color: #6366f1;
-            background: rgba(99, 102, 241, 0.05);
-            box-shadow: 0 30px 60px rgba(0, 0, 0, 0.4), 0 0 20px rgba(99, 102, 241, 0.1);
-        }
-        .talent-card::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            width: 4px;
-            height: 100%;
-            background: linear-gradient(to bottom, #10b981, #6366f1);
-            opacity: 0.6;
-        }
-        .talent-avatar {
-            width: 60px;
-            height: 60px;
-            background: linear-gradient(135deg, #6366f1, #10b981);
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 1.5rem;
-            color: white;
-            font-weight: 700;
-            margin-bottom: 20px;
-        }
-        .score-badge {
-            position: absolute;
-            top: 30px;
-            right: 30px;
-            background: rgba(16, 185, 129, 0.1);
-            color: #10b981;
-            padding: 6px 14px;
-            border-radius: 50px;
-            font-weight: 800;
-            font-size: 0.85rem;
-            border: 1px solid rgba(16, 185, 129, 0.2);
-        }
-        .talent-info h3 { margin: 0; font-size: 1.4rem; color: #ffffff; }
-        .talent-info p { margin: 5px 0 0 0; color: #94a3b8; font-size: 0.95rem; }
-        .talent-footer { margin-top: 25px; display: flex; align-items: center; gap: 10px; color: #10b981; font-weight: 700; font-size: 0.8rem; text-transform: uppercase; letter-spacing: 1px; }
-    </style>
-    """, unsafe_allow_html=True)
-    
-    # Fetch from DB
-    selected_list = list(candidates_collection.find({"status": "SELECTED"}).sort("quiz_score", -1))
+
+    # Filtering, sorting and search run in the DB; only one keyset page is fetched
+    talent_filters = listing_filters("talent_cursors", "Min quiz score")
+    talent_cursors = st.session_state.setdefault("talent_cursors", [None])
+    selected_list, talent_next_cursor = list_selected_candidates(
+        page_size=TALENT_PAGE_SIZE, after=talent_cursors[-1], **talent_filters
+    )
     
     if not selected_list:
-        st.markdown("""
+        filtered = talent_filters["search"] or talent_filters["min_score"]
+        st.markdown(f"""
             <div style="text-align: center; padding: 100px 20px; background: rgba(255,255,255,0.02); border-radius: 30px; border: 1px dashed rgba(255,255,255,0.1);">
-                <h3 style="color: #6366f1;">No Selection Data Yet</h3>
-                <p style="color: #94a3b8;">Candidates will appear here once they complete and excel in the technical quiz.</p>
+                <h3 style="color: #6366f1;">{"No Matching Talent" if filtered else "No Selection Data Yet"}</h3>
+                <p style="color: #94a3b8;">{"Try a different search or a lower minimum score." if filtered else "Candidates will appear here once they complete and excel in the technical quiz."}</p>
             </div>
         """, unsafe_allow_html=True)
     else:
         # Build the entire grid as a single HTML string to prevent Streamlit's layout engine from breaking the grid
-        grid_html = '<div class="talents-grid">'
+        cards = []
         for c in selected_list:
-            initial = c['candidate'][0].upper() if c['candidate'] else "C"
-            grid_html += f"""<div class="talent-card">
+            name = html.escape(c['candidate'] or "")
+            initial = name[0].upper() if name else "C"
+            cards.append(f"""<div class="talent-card">
 <div class="score-badge">{c.get('quiz_score', 0)}% MATCH</div>
 <div class="talent-avatar">{initial}</div>
 <div class="talent-info">
-<h3>{c['candidate']}</h3>
-<p>📧 {c['email']}</p>
+<h3>{name}</h3>
+<p>📧 {html.escape(c['email'] or "")}</p>
 </div>
 <div class="talent-footer">
 <span>✓ VERIFIED TECHNICAL ELITE</span>
 </div>
-</div>"""
-        grid_html += '</div>'
-        st.markdown(grid_html, unsafe_allow_html=True)
+</div>""")
+        st.markdown(f'<div class="talents-grid">{"".join(cards)}</div>', unsafe_allow_html=True)
+
+        st.markdown('<div style="margin-top: 40px;"></div>', unsafe_allow_html=True)
+        if render_pager("talent_cursors", talent_next_cursor):
+            rerun()
             
     st.markdown('</div>', unsafe_allow_html=True) # Close main-content
     st.stop()
@@ -1389,6 +769,7 @@ else:
     # ============================================
     # HOME PAGE: HERO SECTION + FORM
     # ============================================
+    page_marker("page-home")
     st.markdown(f"""<div class="hero-section">
 <div class="hero-bg-overlay"></div>
 <div class="hero-content">
@@ -1401,15 +782,6 @@ Automate the lifecycle of high-volume hiring with elite pinpoint accuracy.
 </div>
 </div>""", unsafe_allow_html=True)
 
-    # CSS for Hero Image
-    st.markdown(f"""<style>
-.hero-section {{
-background-image: linear-gradient(90deg, #050505 0%, rgba(5, 5, 5, 0.7) 50%, transparent 100%), url('https://images.unsplash.com/photo-1451187580459-43490279c0fa?q=80&w=2072&auto=format&fit=crop');
-            background-size: cover;
-            background-position: center;
-        }}
-    </style>
-    """, unsafe_allow_html=True)
 
     # --------------------------------------------
     # RECRUITMENT FORM SECTION (RESTRICTED)
@@ -1441,16 +813,90 @@ background-image: linear-gradient(90deg, #050505 0%, rgba(5, 5, 5, 0.7) 50%, tra
             target_email = st.text_input("Override email (testing)", key="debug_email_override")
             override = st.checkbox("Enable override", key="debug_override_checkbox")
 
+            # Expander bodies run even when collapsed, so the diagnostics below are
+            # admin-only and only query anything while their toggle is on
+            if recruiter_email in ADMIN_EMAILS:
+                with st.expander("📊 Database Health"):
+                    if DB_BACKEND == "memory":
+                        st.caption("🧪 In-memory store (DB_BACKEND=memory)")
+                    elif st.toggle("Check now", key="show_db_health"):
+                        ok, latency_ms, error = ping()
+                        if ok:
+                            st.caption(f"🟢 Ping {latency_ms} ms")
+                        else:
+                            st.caption(f"🔴 Ping failed after {latency_ms} ms: {error}")
+                        st.json(get_db_stats(), expanded=False)
+
+            # The outbox is shared by every recruiter: counts, recipients and replay are admin-only
+            if recruiter_email in ADMIN_EMAILS:
+                with st.expander("📬 Email Outbox"):
+                    if st.toggle("Load outbox", key="show_outbox"):
+                        st.json(get_outbox_counts())
+                        dead_emails = get_dead_emails(limit=20)
+                        if dead_emails:
+                            st.caption(f"☠️ {len(dead_emails)} most recent dead letters")
+                            for dead in dead_emails:
+                                st.caption(f"{dead['kind']} → {dead['to_email']}: {dead.get('error')}")
+                            if st.button("🔁 Replay All Dead Letters", key="replay_all_dead"):
+                                st.success(f"✅ {replay_dead_emails()} messages requeued")
+                        st.caption("SMTP timings (ms) and outcomes")
+                        st.json(get_email_stats(), expanded=False)
+
+            if recruiter_email in ADMIN_EMAILS:
+                with st.expander("🧠 Session Memory"):
+                    if st.toggle("Measure now", key="show_session_memory"):
+                        state_sizes = session_state_sizes()
+                        st.caption(f"This session holds ~{sum(state_sizes.values()) / 1024:.1f} KiB of state")
+                        st.json(
+                            {key: f"{size / 1024:.1f} KiB" for key, size in list(state_sizes.items())[:8]},
+                            expanded=False
+                        )
+                        st.caption("All sessions in this server process")
+                        st.json(session_size_summary())
+
+            if recruiter_email in ADMIN_EMAILS:
+                with st.expander("🧵 Worker Pool"):
+                    pool_stats = ranking_runner().pool.stats()
+                    col_depth, col_util = st.columns(2)
+                    col_depth.metric("Queued", pool_stats["queued"])
+                    col_util.metric("Utilization", f"{pool_stats['utilization']:.0%}")
+                    st.caption(f"Estimated wait for a new run: ~{pool_stats['estimated_wait_seconds']:.0f}s")
+                    st.json(pool_stats, expanded=False)
+
         # Define the Engine Fragment to prevent full-page blinking on widget interaction
         @st.fragment
         def recruiter_engine():
             # Form inside the card
-            job_description = st.text_area(
-                "1. Define Target Role & Requirements",
-                height=180,
-                placeholder="e.g. Senior Backend Engineer with Expertise in Python, MongoDB and AI...",
-                label_visibility="visible"
+            multi_role = st.toggle(
+                "🧮 Rank against several roles",
+                key="multi_role_mode",
+                help="Read the resumes once and score them against every role in a single run"
             )
+            roles = None
+            if multi_role:
+                role_count = st.number_input("1. Number of Roles", min_value=2, max_value=MAX_ROLES_PER_RUN, value=2, step=1)
+                roles = []
+                for i, role_tab in enumerate(st.tabs([f"Role {i}" for i in range(1, role_count + 1)]), start=1):
+                    with role_tab:
+                        roles.append({
+                            "title": st.text_input("Role title", key=f"role_title_{i}", placeholder=f"Role {i}"),
+                            "job_description": st.text_area(
+                                "Requirements", height=150, key=f"role_jd_{i}",
+                                placeholder="e.g. Senior Backend Engineer with Expertise in Python, MongoDB and AI..."
+                            ),
+                            "job_id": st.text_input(
+                                "Job ID (optional)", key=f"role_job_id_{i}",
+                                help="Selects the question bank used for this role's quiz"
+                            ),
+                        })
+                job_description = None
+            else:
+                job_description = st.text_area(
+                    "1. Define Target Role & Requirements",
+                    height=180,
+                    placeholder="e.g. Senior Backend Engineer with Expertise in Python, MongoDB and AI...",
+                    label_visibility="visible"
+                )
 
             st.markdown('<div style="margin: 30px 0;"></div>', unsafe_allow_html=True) 
 
@@ -1469,70 +915,131 @@ background-image: linear-gradient(90deg, #050505 0%, rgba(5, 5, 5, 0.7) 50%, tra
                     max_value=50,
                     value=3,
                     step=1,
-                    help="How many top candidates to extract?"
+                    help="How many top candidates to extract? (per role when ranking several roles)"
+                )
+                quiz_job_id = None if multi_role else st.text_input(
+                    "4. Job ID (optional)",
+                    placeholder="e.g. backend-2024",
+                    help="Selects the question bank used for these candidates' quiz. Also keeps a resume pool "
+                         "for the job: later runs only read and score new resumes, and the pool can be re-ranked."
+                ).strip() or None
+                capture_profile = recruiter_email in ADMIN_EMAILS and st.checkbox(
+                    "🔬 Capture cProfile",
+                    help="Profile this run on the server and show the hottest functions with its timings"
                 )
 
             st.markdown('<div class="submit-container">', unsafe_allow_html=True)
             process_clicked = st.button("🚀 Analyze & Match Talent", key="form_process_btn", use_container_width=False)
+            rerank_clicked = not multi_role and st.button(
+                "♻️ Re-rank Pool",
+                key="form_rerank_btn",
+                disabled=not quiz_job_id,
+                help="Score every resume already pooled for this Job ID against the requirements above, without re-reading any PDF"
+            )
             st.markdown('</div>', unsafe_allow_html=True)
 
-            if process_clicked:
-                if not job_description.strip():
+            if process_clicked or rerank_clicked:
+                try:
+                    roles = normalize_roles(roles, min_candidates) if multi_role else None
+                except ValueError as e:
+                    roles_error = str(e)
+                else:
+                    roles_error = None
+
+                if roles_error:
+                    st.error(f"❌ {roles_error}.")
+                elif not multi_role and not job_description.strip():
                     st.error("❌ Job description is required.")
-                elif not uploaded_files:
+                elif process_clicked and not uploaded_files:
                     st.error("❌ Please upload at least one resume.")
                 else:
-                    resume_texts = []
-                    with st.spinner("📄 Reading resumes..."):
-                        for file in uploaded_files:
-                            file_path = os.path.join(UPLOAD_DIR, file.name)
-                            with open(file_path, "wb") as f:
-                                f.write(file.read())
-                            resume_texts.append(extract_text_from_pdf(file_path))
-
-                    with st.spinner("📧 Extracting emails..."):
-                        processed_resumes = process_uploaded_resumes(resume_texts)
-
-                    with st.spinner("🧠 AI ranking..."):
-                        ai_output = rank_resumes(job_description=job_description, candidates=processed_resumes)
-
-                    with st.spinner("🎯 Selecting top candidates..."):
-                        shortlisted = select_top_candidates(ai_output=ai_output, min_candidates=min_candidates)
-
-                    with st.spinner("💾 Saving..."):
-                        stored_candidates = store_shortlisted_candidates(shortlisted, st.session_state.get("recruiter_email"))
-                        st.session_state["stored_candidates"] = stored_candidates
-                    
-                    st.success("✅ Candidates shortlisted!")
-                    st.rerun()
+                    try:
+                        # Refuse before writing any files when the shared pool is full
+                        ranking_runner().check_capacity(st.session_state.get("recruiter_email"))
+
+                        file_paths, upload_ms = [], None
+                        if process_clicked:
+                            upload_started = time.perf_counter()
+                            _, file_paths = save_uploaded_files((file.name, file.getbuffer()) for file in uploaded_files)
+                            upload_ms = (time.perf_counter() - upload_started) * 1000
+
+                        # Ranking runs on a background worker; ranking_progress() polls it
+                        st.session_state["ranking_job_id"] = ranking_runner().submit(
+                            st.session_state.get("recruiter_email"),
+                            job_description,
+                            file_paths,
+                            min_candidates,
+                            job_id=quiz_job_id,
+                            upload_ms=upload_ms,
+                            profile=capture_profile,
+                            roles=roles,
+                            rerank=bool(rerank_clicked)
+                        )
+                    except PoolSaturated as e:
+                        st.warning(f"⏳ {e}")
+                    except ValueError as e:
+                        st.error(f"❌ {e}.")
+                    else:
+                        rerun()
+
+            # Timings (and, for multi-role runs, the score matrix) of this session's last finished run, fetched once
+            if "last_run_job_id" in st.session_state:
+                if "last_run_timings" not in st.session_state:
+                    st.session_state["last_run_timings"] = get_run_timings(st.session_state["last_run_job_id"])
+                    last_job = get_ranking_job(st.session_state["last_run_job_id"])
+                    st.session_state["last_run_matrix"] = (
+                        {key: last_job[key] for key in ("roles", "matrix", "shortlist")}
+                        if last_job and last_job.get("matrix") else None
+                    )
+                if st.session_state.get("last_run_matrix"):
+                    render_score_matrix(st.session_state["last_run_matrix"])
+                if st.session_state["last_run_timings"]:
+                    render_run_timings(st.session_state["last_run_timings"])
 
             # ============================================
             # DISPLAY SHORTLISTED CANDIDATES (Moved inside Fragment for persistent state)
             # ============================================
+            # The current page is cached in session state and only re-read from the
+            # DB when the page, the filters or the shortlist itself change
+            with st.expander("🔎 Filter & sort candidates", expanded=False):
+                shortlist_filters = listing_filters("shortlist_cursors", "Min match score", statuses=CANDIDATE_STATUSES)
+            if st.session_state.get("stored_candidates_filters") != shortlist_filters:
+                st.session_state["stored_candidates_filters"] = shortlist_filters
+                st.session_state.pop("stored_candidates", None)
+                st.session_state.pop("shortlist_visible_rows", None)
+
             if "stored_candidates" not in st.session_state:
-                # Recovery: Try to fetch latest shortlisted candidates for this recruiter
+                # Recovery: fetch one page of this recruiter's candidates
                 # Note: is_recruiter is implicitly True here as we are in the else block
                 current_rec_email = st.session_state.get("recruiter_email")
-                db_candidates = list(candidates_collection.find({"recruiter_email": current_rec_email, "status": "SHORTLISTED"}))
-                if db_candidates:
-                    st.session_state["stored_candidates"] = db_candidates
-
-            if "stored_candidates" in st.session_state:
+                shortlist_cursors = st.session_state.setdefault("shortlist_cursors", [None])
+                db_candidates, next_cursor = list_shortlisted_candidates(
+                    current_rec_email, page_size=SHORTLIST_PAGE_SIZE, after=shortlist_cursors[-1], **shortlist_filters
+                )
+                # Slotted records with just the rendered fields; credentials are hydrated below.
+                # An empty page is cached too, so a recruiter with no candidates is not re-queried every tick
+                st.session_state["stored_candidates"] = compact_records(db_candidates)
+                st.session_state["shortlist_next_cursor"] = next_cursor
+
+            # Nothing is shown until there is a shortlist, unless a filter or later page is what came back empty
+            if (st.session_state["stored_candidates"] or len(st.session_state.get("shortlist_cursors", [None])) > 1
+                    or shortlist_filters["search"] or shortlist_filters["min_score"]):
                 st.write("")  # Spacer
                 
                 candidates = st.session_state["stored_candidates"]
 
-                # Note: Sidebar elements inside a fragment might behave oddly if not managed carefully.
-                # We have moved them outside to avoid DuplicateWidgetID errors.
+                # Rows are revealed in batches so a long shortlist does not render in one pass
+                visible_rows = st.session_state.setdefault("shortlist_visible_rows", SHORTLIST_ROW_BATCH)
 
-                display_candidates = []
+                # Passwords are fetched once per candidate, when their row is first shown
+                credentials = st.session_state.setdefault("candidate_credentials", {})
+                missing = [c["quiz_token"] for c in candidates[:visible_rows] if c["quiz_token"] not in credentials]
+                if missing:
+                    credentials.update(get_candidate_credentials(missing))
 
-                for c in candidates:
-                    c_copy = copy.deepcopy(c)
-                    if override and target_email:
-                        c_copy["original_email"] = c_copy["email"]
-                        c_copy["email"] = target_email
-                    display_candidates.append(c_copy)
+                # Views apply the debug override on read; stored records are never copied
+                override_email = target_email if override and target_email else None
+                display_candidates = candidate_views(candidates[:visible_rows], override_email, credentials)
 
                 st.markdown("""
                 <div style="text-align: center; margin-bottom: 40px;">
@@ -1540,77 +1047,55 @@ background-image: linear-gradient(90deg, #050505 0%, rgba(5, 5, 5, 0.7) 50%, tra
                         📋 <span style="background: linear-gradient(135deg, #6366f1 0%, #a855f7 100%); -webkit-background-clip: text; -webkit-text-fill-color: transparent;">Shortlisted Candidates</span>
                     </h2>
                 </div>
-                <style>
-                    /* Custom Styling for Results Expanders */
-                    [data-testid="stExpander"], [data-testid="stExpander"] > div, [data-testid="stExpander"] details {
-                        background-color: transparent !important;
-                        background: transparent !important;
-                        border: none !important;
-                    }
-
-                    /* Target the clickable header (summary) */
-                    .streamlit-expanderHeader, 
-                    [data-testid="stExpander"] summary {
-                        background: var(--result-bg) !important;
-                        border: 1px solid rgba(99, 102, 241, 0.3) !important;
-                        border-radius: 12px !important;
-                        padding: 18px 24px !important;
-                        margin-bottom: 12px !important;
-                        transition: all 0.3s ease !important;
-                        color: #ffffff !important;
-                    }
-
-                    .streamlit-expanderHeader p {
-                        background: linear-gradient(135deg, #818cf8 0%, #c084fc 100%) !important;
-                        -webkit-background-clip: text !important;
-                        -webkit-text-fill-color: transparent !important;
-                        font-weight: 700 !important;
-                        font-size: 1.1rem !important;
-                    }
-                    
-                    /* Active/Hover/Open State */
-                    .streamlit-expanderHeader:hover, 
-                    [data-testid="stExpander"] summary:hover,
-                    [data-testid="stExpander"] details[open] > summary {
-                        border-color: #6366f1 !important;
-                        background: var(--result-hover-bg) !important;
-                        box-shadow: 0 5px 20px rgba(0, 0, 0, 0.4) !important;
-                    }
-                    
-                    /* Remove the background from the expanded content area */
-                    .streamlit-expanderContent {
-                        background: transparent !important;
-                        border: none !important;
-                        color: #94a3b8 !important;
-                        padding: 20px 25px !important;
-                    }
-
-                    /* Email Preview Box - Ultra Professional Spacing */
-                    .email-preview-box {
-                        background: #0a0a0f !important;
-                        border: 1px solid rgba(255, 255, 255, 0.05) !important;
-                        border-radius: 16px !important;
-                        padding: 30px !important;
-                        color: #e2e8f0 !important; /* Brighter white-grey for clarity */
-                        font-family: 'Inter', -apple-system, sans-serif !important;
-                        font-size: 1rem !important;
-                        line-height: 1.8 !important;   /* Professional line spacing */
-                        letter-spacing: 0.3px !important; /* Professional character spacing */
-                        margin: 20px 0 !important;
-                        white-space: pre-wrap;
-                        box-shadow: inset 0 2px 10px rgba(0,0,0,0.5) !important;
-                    }
-                </style>
                 """, unsafe_allow_html=True)
 
+                # Previews are rendered on first request and cached for the session
+                email_previews = st.session_state.setdefault("email_previews", {})
+
+                def email_preview(candidate):
+                    if candidate.preview_key not in email_previews:
+                        email_previews[candidate.preview_key] = render_second_round_emails(
+                            [candidate], st.session_state.get("recruiter_email")
+                        )[0]
+                    return email_previews[candidate.preview_key]
+
+                col_bulk, col_refresh, _ = st.columns([1.5, 1, 1.5])
+                with col_bulk:
+                    if st.button("📨 Send to All Shortlisted", key="send_all_shortlisted", use_container_width=True):
+                        queued = enqueue_shortlist_invites(
+                            st.session_state.get("recruiter_email"),
+                            override_email=override_email
+                        )
+                        st.success(f"✅ {queued} invites queued for delivery")
+                        st.session_state.pop("email_status_cache", None)
+                with col_refresh:
+                    if st.button("🔄 Refresh Status", key="refresh_email_status", use_container_width=True):
+                        st.session_state.pop("email_status_cache", None)
+
+                # Outbox statuses for the visible rows, re-read on refresh or after EMAIL_STATUS_TTL_SECONDS
+                visible_tokens = tuple(c["quiz_token"] for c in display_candidates)
+                status_cache = st.session_state.get("email_status_cache")
+                if (status_cache is None or status_cache[1] != visible_tokens
+                        or time.monotonic() - status_cache[0] > EMAIL_STATUS_TTL_SECONDS):
+                    status_cache = (time.monotonic(), visible_tokens, get_email_statuses(visible_tokens))
+                    st.session_state["email_status_cache"] = status_cache
+                email_statuses = status_cache[2]
+
+                if not display_candidates:
+                    st.info("No candidates match these filters.")
+
                 for candidate in display_candidates:
-                    with st.expander(f"👤 {candidate['candidate']} | Score: {candidate['score']}"):
+                    email_status = email_statuses.get(candidate["quiz_token"])
+                    status_label = f" | {EMAIL_STATUS_LABELS.get(email_status['status'], email_status['status'])}" if email_status else ""
+                    if candidate.get("status", "SHORTLISTED") != "SHORTLISTED":
+                        status_label += f" | {candidate['status']}"
+                    with st.expander(f"👤 {candidate['candidate']} | Score: {candidate['score']}{status_label}"):
 
                         quiz_url = f"https://ai-recruiter-859z6bd6jfqfxufktu79e9.streamlit.app/?token={candidate['quiz_token']}"
                         
                         email_display = candidate['email']
-                        if override and target_email:
-                            email_display = f"{target_email} <span style='color: #64748b; font-size: 0.8rem;'>(Original: {candidate.get('original_email')})</span>"
+                        if override_email:
+                            email_display = f"{override_email} <span style='color: #64748b; font-size: 0.8rem;'>(Original: {candidate.original_email})</span>"
 
                         st.markdown(f"""<div style="background: rgba(255,255,255,0.02); border-radius: 12px; padding: 20px; border: 1px solid rgba(255,255,255,0.05); margin-bottom: 20px;">
     <div style="margin-bottom: 12px; display: flex; align-items: center; gap: 10px;">
@@ -1630,15 +1115,15 @@ background-image: linear-gradient(90deg, #050505 0%, rgba(5, 5, 5, 0.7) 50%, tra
     </div>
     </div>""", unsafe_allow_html=True)
 
-                        subject, body = show_second_round_email(candidate)
+                        # Expander bodies run even when collapsed, so the preview sits behind a toggle
+                        if st.toggle("📨 Show email preview", key=f"preview_{candidate['quiz_token']}"):
+                            st.markdown("""
+                            <h3 style="color: #ffffff; font-size: 1.2rem; margin-top: 30px; font-weight: 700; display: flex; align-items: center; gap: 10px;">
+                                📨 <span style="letter-spacing: 0.5px;">Email Preview</span>
+                            </h3>
+                            """, unsafe_allow_html=True)
 
-                        st.markdown("""
-                        <h3 style="color: #ffffff; font-size: 1.2rem; margin-top: 30px; font-weight: 700; display: flex; align-items: center; gap: 10px;">
-                            📨 <span style="letter-spacing: 0.5px;">Email Preview</span>
-                        </h3>
-                        """, unsafe_allow_html=True)
-                        
-                        st.markdown(f'<div class="email-preview-box">{body}</div>', unsafe_allow_html=True)
+                            st.markdown(f'<div class="email-preview-box">{email_preview(candidate).text}</div>', unsafe_allow_html=True)
 
                         # Custom styled button for sending email
                         col_btn, _ = st.columns([1.5, 2])
@@ -1648,21 +1133,99 @@ background-image: linear-gradient(90deg, #050505 0%, rgba(5, 5, 5, 0.7) 50%, tra
                                 key=f"send_{candidate['quiz_token']}",
                                 use_container_width=True
                             ):
-                                with st.spinner("Dispatching email..."):
-                                    success, message = send_email(
-                                        to_email=candidate["email"],
-                                        subject=subject,
-                                        body=body
-                                    )
-
-                                    if success:
-                                        st.success("✅ Email sent successfully")
-                                    else:
-                                        st.error(f"❌ {message}")
+                                preview = email_preview(candidate)
+                                if enqueue_email(
+                                    candidate,
+                                    "shortlist_invite",
+                                    preview.subject,
+                                    preview.text,
+                                    recruiter_email=st.session_state.get("recruiter_email"),
+                                    html=preview.html,
+                                    override_email=override_email
+                                ):
+                                    st.session_state.pop("email_status_cache", None)
+                                    st.success("✅ Email queued for delivery")
+                                else:
+                                    st.info("ℹ️ This invite is already queued or sent.")
+
+                        if email_status and email_status["status"] == "failed":
+                            st.warning(
+                                f"🔁 Attempt {email_status.get('attempts')} failed: {email_status.get('error')}. "
+                                f"Next retry at {email_status['next_attempt_at']:%H:%M:%S} UTC."
+                            )
+                        elif email_status and email_status["status"] == "dead":
+                            st.error(f"☠️ Delivery gave up: {email_status.get('error')}")
+                            if st.button("🔁 Replay", key=f"replay_{candidate['quiz_token']}"):
+                                replay_dead_emails([email_status["_id"]])
+                                st.session_state.pop("email_status_cache", None)
+                                st.rerun(scope="fragment")
+
+                if visible_rows < len(candidates):
+                    remaining = len(candidates) - visible_rows
+                    if st.button(f"⬇️ Show {min(remaining, SHORTLIST_ROW_BATCH)} more", key="shortlist_show_more"):
+                        st.session_state["shortlist_visible_rows"] = visible_rows + SHORTLIST_ROW_BATCH
+                        st.rerun(scope="fragment")
+
+                if "shortlist_cursors" in st.session_state:
+                    if render_pager("shortlist_cursors", st.session_state.get("shortlist_next_cursor")):
+                        st.session_state.pop("stored_candidates", None)
+                        st.session_state.pop("shortlist_visible_rows", None)
+                        st.rerun(scope="fragment")
+
+        @st.fragment(run_every=RANKING_POLL_SECONDS)
+        def ranking_progress():
+            """Polls the active ranking job; reruns the whole page once its results are stored"""
+            job = get_ranking_job(st.session_state["ranking_job_id"])
+            if job is None:
+                st.session_state.pop("ranking_job_id", None)
+                rerun()
+
+            if job["status"] in ("done", "failed") and st.session_state.get("last_run_job_id") != job["_id"]:
+                st.session_state["last_run_job_id"] = job["_id"]
+                st.session_state.pop("last_run_timings", None)
+
+            if job["status"] == "done":
+                st.session_state.pop("ranking_job_id", None)
+                # The shortlist below re-reads its first page, which now includes this run
+                st.session_state["shortlist_cursors"] = [None]
+                st.session_state.pop("stored_candidates", None)
+                st.session_state.pop("shortlist_visible_rows", None)
+                pool = job.get("pool")
+                if pool:
+                    st.toast(
+                        f"✅ {job.get('shortlisted', 0)} newly shortlisted from the top {job['min_candidates']} "
+                        f"of a pool of {pool['size']} ({pool['extracted']} resumes read, "
+                        f"{pool['reused']} already pooled, {pool['scored']} scored)"
+                    )
+                else:
+                    st.toast(f"✅ {job.get('shortlisted', 0)} candidates shortlisted!")
+                rerun()
+            elif job["status"] == "failed":
+                st.error(f"❌ Ranking failed: {job.get('error')}")
+                if st.button("Dismiss", key="dismiss_ranking_job"):
+                    st.session_state.pop("ranking_job_id", None)
+                    rerun()
+            else:
+                stage = RANKING_STAGE_LABELS.get(job.get("stage"), job.get("stage"))
+                if job["status"] == "queued":
+                    ahead = ranking_runner().queue_position(job["recruiter_email"], job["_id"])
+                    stage = f"{stage} ({ahead} jobs ahead)" if ahead else stage
+                st.progress(job.get("progress", 0.0), text=stage)
+                st.caption("You can leave this page; the run continues on the server.")
 
         # Run the fragment
         recruiter_engine()
 
+        # Pick up a run started in an earlier session (e.g. after a refresh or dropped connection)
+        if "ranking_job_checked" not in st.session_state:
+            st.session_state["ranking_job_checked"] = True
+            latest_job = latest_ranking_job(st.session_state.get("recruiter_email"))
+            if latest_job and latest_job["status"] in ("queued", "running"):
+                st.session_state["ranking_job_id"] = latest_job["_id"]
+
+        if "ranking_job_id" in st.session_state:
+            ranking_progress()
+
         st.markdown('</div>', unsafe_allow_html=True) # Close form-section
 
 # # End of Streamlit App